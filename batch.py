@@ -0,0 +1,396 @@
+"""
+Batch API mode for offline deck generation.
+
+Instead of one chat completion per prompt, every prompt a build needs is
+written to a JSONL file and submitted to the OpenAI Batch API, which is
+cheaper and not subject to the per-minute limits. Once the batch completes
+we resume assembling notes from its results.
+
+Conjugated forms come from the rule engine where possible; verbs it doesn't
+know need a first batch round, since the sentence prompts depend on them.
+"""
+
+import json
+import os
+import time
+from random import shuffle
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+from cascade import from_sentence_cache
+from constants import EXPENSIVE_MODEL, get_client
+from checkpoint import card_key
+from conjugator import conjugate
+from conjugation_store import get_conjugation_store
+from create_content import (
+    SENTENCES_MAX_TOKENS,
+    SENTENCES_RESPONSE_FORMAT,
+    apply_italian_sentences,
+    build_italian_sentences_prompt,
+    create_flashcard_extras,
+    create_italian_sentences,
+    group_forms,
+    validate_italian_sentences,
+)
+from create_deck import create_note, iter_verb_package_groups
+from data_types import NoteList, VerbPackage, VerbPackageList
+from llm import build_messages
+from manifest import Manifest, is_current
+from sentence_cache import get_sentence_cache
+from utils import (
+    CONJUGATED_MAX_TOKENS,
+    CONJUGATED_RESPONSE_FORMAT,
+    CONJUGATION_MAX_TOKENS,
+    CONJUGATION_RESPONSE_FORMAT,
+    build_conjugated_prompt,
+    build_conjugation_prompt,
+    derive_conjugation,
+    get_conjugated_from_llm,
+    parse_conjugated,
+    parse_conjugation,
+)
+
+BATCH_DIR = "batches"
+POLL_INTERVAL = 60
+
+
+class BatchEndpoint(Protocol):
+    """
+    Somewhere to submit batch input files and collect their output.
+    """
+
+    def submit(self, path: str) -> str: ...
+
+    def poll(self, batch_id: str) -> Optional[str]: ...
+
+
+class OpenAIBatchEndpoint:
+    """
+    Submits batches to the OpenAI Batch API.
+    """
+
+    def submit(self, path: str) -> str:
+        """
+        Upload a batch input file and start the batch.
+
+        Args:
+            path (str): The JSONL file of requests.
+
+        Returns:
+            str: The batch id.
+        """
+        with open(path, "rb") as input_file:
+            uploaded = get_client().files.create(file=input_file, purpose="batch")
+        batch = get_client().batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> Optional[str]:
+        """
+        Check on a batch.
+
+        Args:
+            batch_id (str): The batch id.
+
+        Returns:
+            Optional[str]: The JSONL output once the batch has completed, else None.
+        """
+        batch = get_client().batches.retrieve(batch_id)
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"Batch {batch_id} {batch.status}")
+        if batch.status != "completed" or batch.output_file_id is None:
+            return None
+        return get_client().files.content(batch.output_file_id).text
+
+
+class FakeBatchEndpoint:
+    """
+    A local stand-in for the Batch API, for tests. Batches complete
+    immediately, with each reply produced by `responder(model, prompt)`.
+    """
+
+    def __init__(self, responder: Callable[[str, str], str]) -> None:
+        self.responder = responder
+        self.batches: Dict[str, str] = {}
+
+    def submit(self, path: str) -> str:
+        output_lines = []
+        with open(path, "r", encoding="utf-8") as input_file:
+            for line in input_file:
+                request = json.loads(line)
+                body = request["body"]
+                content = self.responder(
+                    body["model"], body["messages"][-1]["content"]
+                )
+                message = {"role": "assistant", "content": content}
+                result = {
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "body": {"choices": [{"message": message}]},
+                    },
+                    "error": None,
+                }
+                output_lines.append(json.dumps(result))
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = "\n".join(output_lines) + "\n"
+        return batch_id
+
+    def poll(self, batch_id: str) -> Optional[str]:
+        return self.batches[batch_id]
+
+
+def run_batch(
+    prompts: Dict[str, str],
+    endpoint: BatchEndpoint,
+    name: str,
+    model: str = EXPENSIVE_MODEL,
+    poll_interval: float = POLL_INTERVAL,
+    response_formats: Optional[Dict[str, Dict[str, Any]]] = None,
+    max_tokens: Optional[Dict[str, int]] = None,
+) -> Dict[str, str]:
+    """
+    Write prompts to a batch input file, submit it and wait for the results.
+
+    Args:
+        prompts (Dict[str, str]): Prompts keyed by custom id.
+        endpoint (BatchEndpoint): Where to submit the batch.
+        name (str): Used to name the batch input file.
+        model (str, optional): The model to use. Defaults to EXPENSIVE_MODEL.
+        poll_interval (float, optional): Seconds between polls. Defaults to POLL_INTERVAL.
+        response_formats (Optional[Dict[str, Dict[str, Any]]], optional): The
+            response format for requests that need one, keyed by custom id.
+        max_tokens (Optional[Dict[str, int]], optional): The output budget of
+            requests that have one, keyed by custom id.
+
+    Returns:
+        Dict[str, str]: Replies keyed by custom id. Requests that failed are missing.
+    """
+    if not prompts:
+        return {}
+
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    response_formats = response_formats or {}
+    max_tokens = max_tokens or {}
+    path = os.path.join(BATCH_DIR, f"{name}.jsonl")
+    with open(path, "w", encoding="utf-8") as input_file:
+        for custom_id, prompt in prompts.items():
+            body: Dict[str, Any] = {"model": model, "messages": build_messages(prompt)}
+            if custom_id in response_formats:
+                body["response_format"] = response_formats[custom_id]
+            if custom_id in max_tokens:
+                body["max_tokens"] = max_tokens[custom_id]
+            request = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }
+            input_file.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+    batch_id = endpoint.submit(path)
+    print(f"Submitted batch {batch_id} with {len(prompts)} requests")
+    output = endpoint.poll(batch_id)
+    while output is None:
+        time.sleep(poll_interval)
+        output = endpoint.poll(batch_id)
+
+    replies = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            continue
+        replies[result["custom_id"]] = str(
+            response["body"]["choices"][0]["message"]["content"]
+        )
+    return replies
+
+
+def build_note_lists_batch(
+    verb_package_lists: List[VerbPackageList],
+    endpoint: BatchEndpoint,
+    poll_interval: float = POLL_INTERVAL,
+    incremental: bool = False,
+) -> List[NoteList]:
+    """
+    Build note lists for several decks, sending their prompts through the
+    Batch API. Anything the batch fails to answer falls back to a regular
+    request, so one bad line doesn't sink the build.
+
+    Args:
+        verb_package_lists (List[VerbPackageList]): The decks to build.
+        endpoint (BatchEndpoint): Where to submit the batch.
+        poll_interval (float, optional): Seconds between polls. Defaults to POLL_INTERVAL.
+        incremental (bool, optional): Only generate cards missing from the last build. Defaults to False.
+
+    Returns:
+        List[NoteList]: The note lists, in the same order.
+    """
+    # The whole build goes into one batch, so every deck's cards are listed.
+    # Cards are grouped per deck by verb and tense as in a regular build, so
+    # the prompts and their cached replies are the same; when updating, a
+    # group is only generated again if any of its cards is missing or stale
+    deck_packages: List[List[VerbPackage]] = []
+    verb_package_groups: List[List[VerbPackage]] = []
+    for verb_package_list in verb_package_lists:
+        built = Manifest(verb_package_list.name).load() if incremental else {}
+        verb_package_deck: List[VerbPackage] = []
+        for verb_package_group in iter_verb_package_groups(
+            verb_package_list.verb_packages
+        ):
+            reused = []
+            for verb_package in verb_package_group:
+                entry = built.get(card_key(verb_package))
+                if entry is None or not is_current(entry, verb_package):
+                    break
+                reused.append(entry.verb_package)
+            if len(reused) == len(verb_package_group):
+                verb_package_group = reused
+            else:
+                verb_package_groups.append(verb_package_group)
+            verb_package_deck.extend(verb_package_group)
+        deck_packages.append(verb_package_deck)
+    verb_packages = [
+        verb_package
+        for verb_package_group in verb_package_groups
+        for verb_package in verb_package_group
+    ]
+
+    # Round 1: conjugated forms the rule engine doesn't know. Decks sharing a
+    # verb send the same prompt, which is requested once.
+    sentence_cache = get_sentence_cache()
+    conjugated_prompts: Dict[str, str] = {}
+    conjugated_ids: Dict[str, str] = {}
+    conjugated_packages: Dict[str, List[VerbPackage]] = {}
+    for verb_package in verb_packages:
+        verb_conjugated = conjugate(
+            verb_package.verb, verb_package.tense, verb_package.person
+        )
+        if verb_conjugated is None:
+            prompt = build_conjugated_prompt(verb_package)
+            cached = sentence_cache.get(EXPENSIVE_MODEL, prompt)
+            if cached is None:
+                custom_id = conjugated_ids.setdefault(
+                    prompt, f"conjugated-{len(conjugated_ids)}"
+                )
+                conjugated_prompts[custom_id] = prompt
+                conjugated_packages.setdefault(custom_id, []).append(verb_package)
+                continue
+            verb_conjugated = parse_conjugated(cached)
+        verb_package.verb_conjugated = verb_conjugated
+
+    replies = run_batch(
+        conjugated_prompts,
+        endpoint,
+        "conjugated",
+        poll_interval=poll_interval,
+        response_formats={
+            custom_id: CONJUGATED_RESPONSE_FORMAT for custom_id in conjugated_prompts
+        },
+        max_tokens={
+            custom_id: CONJUGATED_MAX_TOKENS for custom_id in conjugated_prompts
+        },
+    )
+    for custom_id, waiting in conjugated_packages.items():
+        # Missing or malformed replies fall back to a regular request
+        reply = replies.get(custom_id, "")
+        try:
+            verb_conjugated = parse_conjugated(reply)
+        except (KeyError, TypeError, ValueError):
+            for verb_package in waiting:
+                get_conjugated_from_llm(verb_package)
+            continue
+        for verb_package in waiting:
+            verb_package.verb_conjugated = verb_conjugated
+        sentence_cache.put(EXPENSIVE_MODEL, conjugated_prompts[custom_id], reply)
+
+    # Round 2: sentences (one request per verb and tense, and per prompt) that
+    # aren't cached, plus any conjugation tables not yet in the store
+    store = get_conjugation_store()
+    prompts: Dict[str, str] = {}
+    sentence_ids: Dict[str, str] = {}
+    sentence_groups: Dict[str, List[List[VerbPackage]]] = {}
+    missing_conjugations: Dict[str, Tuple[str, str]] = {}
+    for verb_package_group in verb_package_groups:
+        prompt = build_italian_sentences_prompt(verb_package_group)
+        applied = from_sentence_cache(
+            prompt,
+            lambda content: apply_italian_sentences(verb_package_group, content),
+        )
+        if applied is None:
+            custom_id = sentence_ids.setdefault(
+                prompt, f"sentences-{len(sentence_ids)}"
+            )
+            prompts[custom_id] = prompt
+            sentence_groups.setdefault(custom_id, []).append(verb_package_group)
+        verb_package = verb_package_group[0]
+        verb_tense = (verb_package.verb, verb_package.tense)
+        if verb_tense not in store and verb_tense not in missing_conjugations.values():
+            # Assembled from the group's forms when they cover every person
+            conjugation = derive_conjugation(
+                verb_package, group_forms(verb_package_group)[verb_tense]
+            )
+            if conjugation is not None:
+                store.put(verb_package.verb, verb_package.tense, conjugation)
+            else:
+                custom_id = f"conjugation-{len(missing_conjugations)}"
+                missing_conjugations[custom_id] = verb_tense
+                prompts[custom_id] = build_conjugation_prompt(verb_package)
+
+    replies = run_batch(
+        prompts,
+        endpoint,
+        "content",
+        poll_interval=poll_interval,
+        response_formats={
+            **{custom_id: SENTENCES_RESPONSE_FORMAT for custom_id in sentence_groups},
+            **{
+                custom_id: CONJUGATION_RESPONSE_FORMAT
+                for custom_id in missing_conjugations
+            },
+        },
+        max_tokens={
+            **{custom_id: SENTENCES_MAX_TOKENS for custom_id in sentence_groups},
+            **{custom_id: CONJUGATION_MAX_TOKENS for custom_id in missing_conjugations},
+        },
+    )
+    # Tables missing or malformed in the batch are looked up again when the
+    # extra fields are built
+    for custom_id, (verb, tense) in missing_conjugations.items():
+        try:
+            store.put(verb, tense, parse_conjugation(replies[custom_id]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    for custom_id, groups in sentence_groups.items():
+        for verb_package_group in groups:
+            try:
+                apply_italian_sentences(verb_package_group, replies[custom_id])
+            except (KeyError, TypeError, ValueError):
+                create_italian_sentences(verb_package_group)
+                continue
+            sentence_cache.put(EXPENSIVE_MODEL, prompts[custom_id], replies[custom_id])
+
+    # Sentences that fail validation are regenerated with regular requests
+    validate_italian_sentences(verb_packages)
+
+    # Translations (batched across every deck) and the extra field, then the
+    # notes themselves
+    create_flashcard_extras(verb_packages)
+
+    note_lists = []
+    for verb_package_list, verb_package_deck in zip(verb_package_lists, deck_packages):
+        manifest = Manifest(verb_package_list.name)
+        manifest.begin()
+        manifest.record(verb_package_deck)
+        manifest.commit()
+        notes = [
+            create_note(verb_package, verb_package_list.name)
+            for verb_package in verb_package_deck
+        ]
+        shuffle(notes)
+        note_lists.append(NoteList(name=verb_package_list.name, notes=notes))
+    return note_lists
@@ -0,0 +1,452 @@
+"""
+Offline throughput benchmark for the card pipeline.
+
+Runs `build_note_list` (or `build_note_list_async`, on the async OpenAI
+client) and `write_deck` against local stand-ins for the OpenAI chat API and
+AWS Translate, so the pipeline can be measured without
+spending money. The fake OpenAI server is a real HTTP server the openai
+client is pointed at through OPENAI_BASE_URL; it answers every prompt the
+pipeline sends with plausible content, after a latency drawn from a
+log-normal distribution, and can fail requests with 500s and 429s, the
+latter also when a requests-per-minute limit is exceeded.
+
+Each deck size runs in each mode in a fresh process, with empty caches in a temporary
+directory, and reports cards per second, p50/p99 per-card latency (the time
+from a card's verb/tense group starting to its notes being ready) and peak
+memory.
+
+Usage:
+    python benchmark.py --sizes 24 240 2400 10000 --latency 0.8 --error-rate 0.01
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import SUPPRESS, ArgumentParser
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from conjugator import PERSONS
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = [24, 240, 2400, 10_000]
+# Both pipelines run by default, so neither client path can break unnoticed
+MODES = ["sync", "async"]
+
+
+@dataclass
+class ServiceProfile:
+    """
+    How the fake services behave.
+    """
+
+    # Median seconds per chat completion, and the spread of the log-normal
+    latency: float = 0.8
+    latency_sigma: float = 0.5
+    # Share of chat completions failing with a 500, or with a 429 at random
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # Requests per minute before the server answers 429; 0 for no limit
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 1_000_000
+    # Seconds per Translate request, and the share that fail
+    translate_latency: float = 0.1
+    translate_error_rate: float = 0.0
+
+
+def fake_reply(prompt: str) -> str:
+    """
+    A plausible reply to any prompt the pipeline sends, in the JSON shape its
+    response format asks for.
+
+    Args:
+        prompt (str): The user prompt.
+
+    Returns:
+        str: The reply.
+    """
+    if "Create one sentence for each" in prompt:
+        forms = re.findall(r"- ([^:\n]+): (\{\{c1::[^}]*\}\})", prompt)
+        sentences = [
+            {"person": person, "sentence": f"Oggi {cloze} con gli amici."}
+            for person, cloze in forms
+        ]
+        return json.dumps({"sentences": sentences})
+    cloze = re.search(r"\{\{c1::[^}]*\}\}", prompt)
+    if cloze is not None:
+        return json.dumps({"sentence": f"Oggi {cloze.group(0)} con gli amici."})
+    if "Return the conjugation" in prompt:
+        return json.dumps({person: f"forma {i}" for i, person in enumerate(PERSONS)})
+    verb = re.search(r" of (\w+)\.", prompt)
+    return json.dumps({"form": verb.group(1) if verb is not None else "fatto"})
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """
+    A local HTTP server speaking enough of the OpenAI chat completions API
+    for the pipeline, with configurable latency and failures.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, profile: ServiceProfile) -> None:
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.profile = profile
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    @property
+    def base_url(self) -> str:
+        """
+        The URL to set as OPENAI_BASE_URL.
+        """
+        host, port = self.server_address[:2]
+        host = host.decode() if isinstance(host, bytes) else host
+        return f"http://{host}:{port}/v1"
+
+    def admit(self) -> Tuple[int, int]:
+        """
+        Count a request against the per-minute limit.
+
+        Returns:
+            Tuple[int, int]: The status to answer with, and the requests left.
+        """
+        profile = self.profile
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start = now
+                self.window_requests = 0
+            self.window_requests += 1
+            limit = profile.requests_per_minute
+            remaining = max(0, limit - self.window_requests) if limit else 1_000_000
+            if limit and self.window_requests > limit:
+                self.stats["rate_limited"] += 1
+                return 429, remaining
+            if random.random() < profile.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429, remaining
+            if random.random() < profile.error_rate:
+                self.stats["errors"] += 1
+                return 500, remaining
+        return 200, remaining
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /v1/chat/completions.
+    """
+
+    server: FakeOpenAIServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        profile = self.server.profile
+        time.sleep(
+            random.lognormvariate(math.log(profile.latency), profile.latency_sigma)
+            if profile.latency
+            else 0
+        )
+
+        status, remaining = self.server.admit()
+        headers = {
+            "x-ratelimit-limit-requests": str(profile.requests_per_minute or 1_000_000),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-limit-tokens": str(profile.tokens_per_minute),
+            "x-ratelimit-remaining-tokens": str(profile.tokens_per_minute),
+        }
+        if status == 429:
+            headers["retry-after"] = "1"
+            body: Dict[str, Any] = {
+                "error": {"message": "Rate limit reached", "type": "requests"}
+            }
+        elif status != 200:
+            body = {"error": {"message": "Simulated failure", "type": "server_error"}}
+        else:
+            prompt = request["messages"][-1]["content"]
+            content = fake_reply(prompt)
+            prompt_tokens = sum(
+                len(message["content"]) // 4 for message in request["messages"]
+            )
+            completion_tokens = len(content) // 4
+            body = {
+                "id": "chatcmpl-benchmark",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", ""),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeTranslateClient:
+    """
+    A local stand-in for the AWS Translate client. It "translates" each line
+    by tagging it, and counts the requests it receives. It can also be made
+    slow and unreliable: each request takes `latency` seconds and fails with
+    probability `error_rate`.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+
+    def translate_text(
+        self, Text: str, SourceLanguageCode: str, TargetLanguageCode: str
+    ) -> Dict[str, str]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("Simulated Translate failure")
+        lines = Text.split("\n")
+        return {
+            "TranslatedText": "\n".join(
+                f"[{TargetLanguageCode}] {line}" for line in lines
+            )
+        }
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    The value below which `share` of the sorted values fall.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def run_deck(cards: int, profile: ServiceProfile, mode: str) -> Dict[str, Any]:
+    """
+    Build and write one deck of `cards` cards. Meant to run in its own
+    process, with OPENAI_BASE_URL pointing at a fake server, from the repo
+    directory so the content lists can be read.
+
+    Args:
+        cards (int): The deck size.
+        profile (ServiceProfile): How the fake Translate client behaves.
+        mode (str): One of MODES.
+
+    Returns:
+        Dict[str, Any]: The measurements.
+    """
+    import resource
+    from constants import (
+        advanced_tenses,
+        all_persons,
+        basic_tenses,
+        irregular_verbs,
+        key_verbs,
+        regular_verbs,
+        subjects,
+    )
+    from create_deck import (
+        build_note_list,
+        build_note_list_async,
+        choose_subject,
+        write_deck,
+    )
+    from data_types import VerbPackage, VerbPackageList
+    from tracing import get_tracer
+    from translation import set_translate_client
+
+    # Every combination of verb, tense and person, repeated with new subjects
+    # (and so new prompts) for decks bigger than that
+    verbs = list(dict.fromkeys(key_verbs + regular_verbs + irregular_verbs))
+    tenses = basic_tenses + advanced_tenses
+    verb_packages: List[VerbPackage] = []
+    round_number = 0
+    while len(verb_packages) < cards:
+        for verb in verbs:
+            for tense in tenses:
+                for person in all_persons:
+                    subject = choose_subject(verb, tense, person, subjects)
+                    if round_number:
+                        subject = f"{subject} ({round_number})"
+                    verb_packages.append(
+                        VerbPackage(
+                            verb=verb, tense=tense, person=person, subject=subject
+                        )
+                    )
+        round_number += 1
+    verb_package_list = VerbPackageList(
+        name=f"Benchmark {cards}", verb_packages=verb_packages[:cards]
+    )
+
+    set_translate_client(
+        FakeTranslateClient(
+            latency=profile.translate_latency,
+            error_rate=profile.translate_error_rate,
+        )
+    )
+    os.chdir(tempfile.mkdtemp(prefix="benchmark-"))
+    try:
+        start = time.perf_counter()
+        if mode == "async":
+            note_list = asyncio.run(build_note_list_async(verb_package_list))
+        else:
+            note_list = build_note_list(verb_package_list)
+        write_deck(note_list)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(os.getcwd(), ignore_errors=True)
+
+    # A card is ready when its verb/tense group is
+    latencies = sorted(
+        span["dur"] / 1_000_000
+        for span in get_tracer().spans
+        if span["name"] == "card_group"
+    )
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {
+        "cards": cards,
+        "mode": mode,
+        "seconds": elapsed,
+        "cards_per_second": cards / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "peak_mb": peak_mb,
+        "retries": sum(
+            value
+            for name, value in get_tracer().counters.items()
+            if name.startswith("retries.")
+        ),
+    }
+
+
+def benchmark(cards: int, profile: ServiceProfile, mode: str) -> Dict[str, Any]:
+    """
+    Run one deck size in a fresh process against a fresh fake server.
+
+    Args:
+        cards (int): The deck size.
+        profile (ServiceProfile): How the fake services behave.
+        mode (str): One of MODES.
+
+    Returns:
+        Dict[str, Any]: The measurements, with the server's counts.
+    """
+    server = FakeOpenAIServer(profile)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    environment = dict(
+        os.environ,
+        OPENAI_BASE_URL=server.base_url,
+        OPENAI_API_KEY="benchmark",
+    )
+    try:
+        completed = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--worker",
+                str(cards),
+                json.dumps(asdict(profile)),
+                mode,
+            ],
+            cwd=REPO_DIR,
+            env=environment,
+            stdout=subprocess.PIPE,
+            check=True,
+            text=True,
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+    result: Dict[str, Any] = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(server.stats)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--latency", type=float, default=ServiceProfile.latency)
+    parser.add_argument(
+        "--latency-sigma", type=float, default=ServiceProfile.latency_sigma
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument(
+        "--translate-latency", type=float, default=ServiceProfile.translate_latency
+    )
+    parser.add_argument("--translate-error-rate", type=float, default=0.0)
+    parser.add_argument("--worker", nargs=3, help=SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        cards, profile, mode = args.worker
+        result = run_deck(int(cards), ServiceProfile(**json.loads(profile)), mode)
+        # The parent reads the last line; the pipeline prints above it
+        print(json.dumps(result))
+        return
+
+    profile = ServiceProfile(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        requests_per_minute=args.rpm,
+        translate_latency=args.translate_latency,
+        translate_error_rate=args.translate_error_rate,
+    )
+    rows = [
+        benchmark(cards, profile, mode) for cards in args.sizes for mode in args.modes
+    ]
+    print(
+        f"{'cards':>7} {'mode':>6} {'seconds':>9} {'cards/s':>8} {'p50 s':>7} "
+        f"{'p99 s':>7} {'peak MB':>8} {'requests':>9} {'429s':>6} {'500s':>6} "
+        f"{'retries':>8}"
+    )
+    for row in rows:
+        print(
+            f"{row['cards']:>7} {row['mode']:>6} {row['seconds']:>9.1f} "
+            f"{row['cards_per_second']:>8.1f} {row['p50']:>7.2f} {row['p99']:>7.2f} "
+            f"{row['peak_mb']:>8.1f} {row['requests']:>9} {row['rate_limited']:>6} "
+            f"{row['errors']:>6} {row['retries']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Model cascade: send a prompt to the cheap model first, check its reply, and
+only escalate to the expensive model when the check fails.
+
+The cascade is off by default, in which case every prompt goes straight to
+EXPENSIVE_MODEL as before. Replies are cached in the sentence cache under
+the model that produced them, and every reply the cascade accepts or
+escalates is counted on the tracer, e.g. "cascade.sentences.accepted.gpt-4o"
+or "cascade.sentences.escalated.form".
+"""
+
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from constants import CHEAP_MODEL, EXPENSIVE_MODEL
+from llm import chat_completion, chat_completion_async
+from sentence_cache import get_sentence_cache
+from tracing import count, get_tracer
+
+T = TypeVar("T")
+
+# Tried in order; the last model's reply is accepted without a check
+CASCADE_MODELS = [CHEAP_MODEL, EXPENSIVE_MODEL]
+
+_ENABLED = False
+
+
+def set_cascade(enabled: bool) -> None:
+    """
+    Turn the cascade on or off for the rest of the build.
+
+    Args:
+        enabled (bool): Try CHEAP_MODEL first.
+    """
+    global _ENABLED
+    _ENABLED = enabled
+
+
+def get_models() -> List[str]:
+    """
+    The models a prompt is tried on, in order.
+
+    Returns:
+        List[str]: CASCADE_MODELS, or just EXPENSIVE_MODEL when the cascade is off.
+    """
+    return list(CASCADE_MODELS) if _ENABLED else [EXPENSIVE_MODEL]
+
+
+def model_label() -> str:
+    """
+    The name a build's cards are recorded under in the manifest, so cards
+    built with and without the cascade aren't mistaken for each other.
+
+    Returns:
+        str: The models, comma-separated.
+    """
+    return ",".join(get_models())
+
+
+def from_sentence_cache(prompt: str, apply: Callable[[str], T]) -> Optional[T]:
+    """
+    Apply a cached reply to a prompt from any of the cascade's models, if
+    there is one. A cached reply that no longer parses is dropped, so it is
+    regenerated rather than retried.
+
+    Args:
+        prompt (str): The fully rendered prompt.
+        apply (Callable[[str], T]): Applies the reply to the VerbPackage(s).
+
+    Returns:
+        Optional[T]: The result of `apply`, or None on a cache miss.
+    """
+    cache = get_sentence_cache()
+    for model in get_models():
+        content = cache.get(model, prompt)
+        if content is None:
+            continue
+        try:
+            return apply(content)
+        except (KeyError, TypeError, ValueError):
+            cache.delete(model, prompt)
+    return None
+
+
+def settle_in_sentence_cache(prompt: str, content: str) -> None:
+    """
+    Cache the reply a prompt was finally settled on, under the last of the
+    cascade's models, whose replies are used without a check.
+
+    Args:
+        prompt (str): The fully rendered prompt.
+        content (str): The reply.
+    """
+    get_sentence_cache().put(get_models()[-1], prompt, content)
+
+
+def peek_sentence_cache(prompt: str) -> Optional[str]:
+    """
+    Like `from_sentence_cache`, without applying the reply or counting the
+    lookup.
+
+    Args:
+        prompt (str): The fully rendered prompt.
+
+    Returns:
+        Optional[str]: The cached reply, or None.
+    """
+    cache = get_sentence_cache()
+    for model in get_models():
+        content = cache.peek(model, prompt)
+        if content is not None:
+            return content
+    return None
+
+
+def _accept(
+    stage: str,
+    model: str,
+    is_last: bool,
+    content: str,
+    apply: Callable[[str], T],
+    check: Callable[[T], Optional[str]],
+) -> Optional[T]:
+    """
+    Apply a model's reply and check it. Returns None to escalate; the last
+    model's reply is only applied, and errors applying it are raised.
+    """
+    try:
+        result = apply(content)
+    except (KeyError, TypeError, ValueError):
+        if is_last:
+            raise
+        count(f"cascade.{stage}.escalated.parse")
+        return None
+    reason = None if is_last else check(result)
+    if reason is not None:
+        count(f"cascade.{stage}.escalated.{reason}")
+        return None
+    count(f"cascade.{stage}.accepted.{model}")
+    return result
+
+
+def complete(
+    prompt: str,
+    stage: str,
+    apply: Callable[[str], T],
+    check: Callable[[T], Optional[str]],
+    response_format: Optional[Dict[str, Any]] = None,
+    max_tokens: Optional[int] = None,
+) -> T:
+    """
+    Send a prompt down the cascade and cache the reply that's accepted.
+
+    Args:
+        prompt (str): The fully rendered prompt.
+        stage (str): The stage, for the counters, e.g. "sentences".
+        apply (Callable[[str], T]): Applies a reply to the VerbPackage(s).
+        check (Callable[[T], Optional[str]]): Returns why an applied reply
+            should be escalated, or None to accept it.
+        response_format (Optional[Dict[str, Any]], optional): Passed through to
+            the API. Defaults to None.
+        max_tokens (Optional[int], optional): The reply's output budget.
+            Defaults to None.
+
+    Returns:
+        T: The result of `apply` for the accepted reply.
+    """
+    models = get_models()
+    for index, model in enumerate(models):
+        content = chat_completion(
+            prompt, model=model, response_format=response_format, max_tokens=max_tokens
+        )
+        result = _accept(
+            stage, model, index == len(models) - 1, content, apply, check
+        )
+        if result is not None:
+            get_sentence_cache().put(model, prompt, content)
+            return result
+    raise AssertionError("The last model's reply is always accepted")
+
+
+async def complete_async(
+    prompt: str,
+    stage: str,
+    apply: Callable[[str], T],
+    check: Callable[[T], Optional[str]],
+    response_format: Optional[Dict[str, Any]] = None,
+    max_tokens: Optional[int] = None,
+) -> T:
+    """
+    Async variant of `complete`.
+
+    Args:
+        prompt (str): The fully rendered prompt.
+        stage (str): The stage, for the counters, e.g. "sentences".
+        apply (Callable[[str], T]): Applies a reply to the VerbPackage(s).
+        check (Callable[[T], Optional[str]]): Returns why an applied reply
+            should be escalated, or None to accept it.
+        response_format (Optional[Dict[str, Any]], optional): Passed through to
+            the API. Defaults to None.
+        max_tokens (Optional[int], optional): The reply's output budget.
+            Defaults to None.
+
+    Returns:
+        T: The result of `apply` for the accepted reply.
+    """
+    models = get_models()
+    for index, model in enumerate(models):
+        content = await chat_completion_async(
+            prompt, model=model, response_format=response_format, max_tokens=max_tokens
+        )
+        result = _accept(
+            stage, model, index == len(models) - 1, content, apply, check
+        )
+        if result is not None:
+            get_sentence_cache().put(model, prompt, content)
+            return result
+    raise AssertionError("The last model's reply is always accepted")
+
+
+def escalation_rates() -> Dict[str, float]:
+    """
+    The share of each stage's prompts that the first model's reply didn't
+    settle, from the tracer's counters.
+
+    Returns:
+        Dict[str, float]: Escalation rate by stage, for stages the cascade ran.
+    """
+    first_model = CASCADE_MODELS[0]
+    accepted: Dict[str, int] = {}
+    escalated: Dict[str, int] = {}
+    for name, value in dict(get_tracer().counters).items():
+        parts = name.split(".", 3)
+        if parts[0] != "cascade" or len(parts) < 4:
+            continue
+        stage, outcome, detail = parts[1], parts[2], parts[3]
+        if outcome == "accepted" and detail == first_model:
+            accepted[stage] = accepted.get(stage, 0) + value
+        elif outcome == "escalated":
+            escalated[stage] = escalated.get(stage, 0) + value
+    return {
+        stage: escalated.get(stage, 0)
+        / (accepted.get(stage, 0) + escalated.get(stage, 0))
+        for stage in set(accepted) | set(escalated)
+    }
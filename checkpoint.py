@@ -0,0 +1,115 @@
+"""
+Journal of finished VerbPackages, so an interrupted build can resume.
+
+Each deck gets a JSON-lines journal that finished packages are appended to
+as soon as they complete, with the model and prompt version they were
+generated with. Resuming a build reloads the journal and only generates the
+cards that are missing from it or no longer current. The journal is cleared
+once the deck's manifest is committed.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, fields
+from typing import Dict, Iterable, Tuple
+from data_types import ManifestEntry, VerbPackage
+
+CHECKPOINT_DIR = "checkpoints"
+
+VERB_PACKAGE_FIELDS = {field.name for field in fields(VerbPackage)}
+
+CardKey = Tuple[str, str, str]
+
+
+def card_key(verb_package: VerbPackage) -> CardKey:
+    """
+    The key identifying a card within a deck.
+
+    Args:
+        verb_package (VerbPackage): The card's VerbPackage.
+
+    Returns:
+        CardKey: (verb, tense, person)
+    """
+    return (verb_package.verb, verb_package.tense, verb_package.person)
+
+
+class Checkpoint:
+    """
+    The journal of finished VerbPackages for one deck.
+    """
+
+    def __init__(self, name: str, directory: str = CHECKPOINT_DIR) -> None:
+        slug = re.sub(r"[^\w-]+", "_", name).strip("_")
+        self.path = os.path.join(directory, f"{slug}.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self) -> Dict[CardKey, ManifestEntry]:
+        """
+        Read back every VerbPackage finished so far, with the model and prompt
+        version it was generated with.
+
+        Returns:
+            Dict[CardKey, ManifestEntry]: The finished packages, by card key.
+        """
+        completed: Dict[CardKey, ManifestEntry] = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                    verb_package = VerbPackage(
+                        **{
+                            key: value
+                            for key, value in record.items()
+                            if key in VERB_PACKAGE_FIELDS
+                        }
+                    )
+                except (json.JSONDecodeError, TypeError):
+                    # A torn final line from the crash we're resuming after
+                    continue
+                completed[card_key(verb_package)] = ManifestEntry(
+                    verb_package=verb_package,
+                    content_hash=record.get("content_hash", ""),
+                    model=record.get("model", ""),
+                    prompt_version=record.get("prompt_version", ""),
+                    created_at="",
+                    updated_at="",
+                )
+        return completed
+
+    def record(self, entries: Iterable[ManifestEntry]) -> None:
+        """
+        Append finished VerbPackages to the journal.
+
+        Args:
+            entries (Iterable[ManifestEntry]): The finished packages, with the
+                model and prompt version they were generated with.
+        """
+        lines = []
+        for entry in entries:
+            record = asdict(entry.verb_package)
+            record.update(
+                content_hash=entry.content_hash,
+                model=entry.model,
+                prompt_version=entry.prompt_version,
+            )
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        data = "".join(lines)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as journal:
+                journal.write(data)
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def clear(self) -> None:
+        """
+        Start the journal afresh.
+        """
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
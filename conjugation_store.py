@@ -0,0 +1,306 @@
+"""
+On-disk store of conjugation tables, keyed by (verb, tense).
+
+A table is stored as data, the conjugated form for each person, and only
+rendered as HTML when a note's extra field is built. The store is an
+append-only log of JSON lines, loaded once per process into an in-memory
+index. Lookups are dictionary reads and a miss costs a single appended line,
+written under a lock so concurrent workers can share it.
+
+Earlier versions stored pre-rendered HTML, first in `conjugations.txt` and
+then in `conjugations.jsonl`; `migrate_conjugations` parses those into the
+current log, and runs on its own the first time the store is used.
+"""
+
+import os
+import json
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from conjugator import PERSONS
+
+CONJUGATIONS_LOG = "conjugation_forms.jsonl"
+HTML_CONJUGATIONS_LOG = "conjugations.jsonl"
+LEGACY_CONJUGATIONS_FILE = "conjugations.txt"
+
+Forms = Dict[str, str]
+
+LIST_ITEM_PATTERN = re.compile(r"<li>(.*?)</li>", re.DOTALL)
+# A subject pronoun, possibly with variants or in brackets, e.g. "(lui/lei/Lei)"
+PRONOUN_PATTERN = re.compile(
+    r"\(?(io|tu|lui|lei|noi|voi|loro)(/\w+)*\)?", re.IGNORECASE
+)
+# A participle with its feminine spelled out, e.g. "stato/stata", "stati/state"
+GENDER_PAIR_PATTERN = re.compile(r"\b(\w+)([oi])/\1([ae])\b")
+
+
+def _strip_subject(form: str) -> str:
+    """
+    Drop a leading "che" (for the congiuntivo) and subject pronoun.
+    """
+    words = form.split(" ")
+    if words[0] == "che":
+        words = words[1:]
+    if len(words) > 1 and PRONOUN_PATTERN.fullmatch(words[0]):
+        words = words[1:]
+    return " ".join(words)
+
+
+def _parse_form(item: str) -> Optional[str]:
+    """
+    The form on one line of a table, without its subject, and with the
+    masculine and feminine of a participle written the one way, "stato/a".
+    A line giving them as two forms, e.g. "lui è stato / lei è stata", is
+    joined into one.
+
+    Args:
+        item (str): The line, with its whitespace normalised.
+
+    Returns:
+        Optional[str]: The form, or None if the line's variants differ by
+        more than the participle's ending.
+    """
+    form, *variants = [_strip_subject(variant) for variant in item.split(" / ")]
+    for variant in variants:
+        if variant[:-1] != form[:-1] or variant[-1:] not in ("a", "e"):
+            return None
+        form = f"{form}/{variant[-1]}"
+    return GENDER_PAIR_PATTERN.sub(r"\1\2/\3", form)
+
+
+def parse_conjugation_html(html: str) -> Tuple[Optional[Forms], List[str]]:
+    """
+    Parse a rendered conjugation table back into its forms. The subject
+    pronoun of each line ("io", "(tu)", "lui/lei/Lei", ...) and a leading
+    "che" for the congiuntivo are dropped, whitespace is normalised, and
+    feminine participles are written as in "stato/a".
+
+    Args:
+        html (str): The table, a <ul> with one <li> per person.
+
+    Returns:
+        Tuple[Optional[Forms], List[str]]: The form for each of PERSONS, or
+        None if the table doesn't have exactly one readable line per person;
+        and the lines that gave one person two forms, or the line that
+        couldn't be read.
+    """
+    items = [" ".join(item.split()) for item in LIST_ITEM_PATTERN.findall(html)]
+    if len(items) != len(PERSONS):
+        return None, []
+    forms: Forms = {}
+    odd_items = []
+    for person, item in zip(PERSONS, items):
+        form = _parse_form(item)
+        if form is None:
+            return None, [item]
+        if " / " in item:
+            odd_items.append(f"{item!r} as {form!r}")
+        forms[person] = form
+    return forms, odd_items
+
+
+def _read_html_conjugations(
+    legacy_path: Optional[str], html_log_path: Optional[str]
+) -> List[Tuple[str, str, str]]:
+    """
+    Read the (verb, tense, html) records of the legacy file ({"verb tense":
+    html}, plus the nested {"verb": {"tense": html}} shape) and of the HTML
+    log, in that order, so later records win.
+    """
+    records = []
+    if legacy_path and os.path.exists(legacy_path):
+        with open(legacy_path, "r", encoding="utf-8") as json_file:
+            conjugations = json.load(json_file)
+        for key, value in conjugations.items():
+            if isinstance(value, dict):
+                for tense, conjugation in value.items():
+                    records.append((key, tense, conjugation))
+                continue
+            verb, _, tense = key.partition(" ")
+            records.append((verb, tense, value))
+
+    if html_log_path and os.path.exists(html_log_path):
+        with open(html_log_path, "r", encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records.append(
+                    (record["verb"], record["tense"], record["conjugation"])
+                )
+    return records
+
+
+def migrate_conjugations(
+    path: str = CONJUGATIONS_LOG,
+    legacy_path: Optional[str] = LEGACY_CONJUGATIONS_FILE,
+    html_log_path: Optional[str] = HTML_CONJUGATIONS_LOG,
+) -> Tuple[int, int]:
+    """
+    Convert the HTML conjugation tables of earlier versions into a log of
+    forms. The log is written to a temporary file and renamed into place so
+    it is atomic; tables that don't parse are left out, to be looked up again.
+
+    Args:
+        path (str, optional): The log to write. Defaults to CONJUGATIONS_LOG.
+        legacy_path (Optional[str], optional): The legacy JSON file. Defaults to LEGACY_CONJUGATIONS_FILE.
+        html_log_path (Optional[str], optional): The HTML log. Defaults to HTML_CONJUGATIONS_LOG.
+
+    Returns:
+        Tuple[int, int]: The number of tables migrated and skipped.
+    """
+    tables: Dict[Tuple[str, str], Forms] = {}
+    skipped = set()
+    for verb, tense, html in _read_html_conjugations(legacy_path, html_log_path):
+        if (verb, tense) in tables or (verb, tense) in skipped:
+            print(f"{verb}, {tense}: stored more than once, keeping the last readable")
+        forms, odd_items = parse_conjugation_html(html)
+        if forms is None:
+            unread = f" at {odd_items[0]!r}" if odd_items else ""
+            print(f"{verb}, {tense}: skipped, the table doesn't parse{unread}")
+            if (verb, tense) not in tables:
+                skipped.add((verb, tense))
+            continue
+        for odd_item in odd_items:
+            print(f"{verb}, {tense}: read {odd_item}")
+        skipped.discard((verb, tense))
+        tables[(verb, tense)] = forms
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as log_file:
+        for (verb, tense), forms in tables.items():
+            log_file.write(_to_line(verb, tense, forms))
+        log_file.flush()
+        os.fsync(log_file.fileno())
+    os.replace(temp_path, path)
+    return len(tables), len(skipped)
+
+
+class ConjugationStore:
+    """
+    An append-only log of conjugation tables with an in-memory index.
+
+    Each line of the log is a JSON object with "verb", "tense" and "forms"
+    keys, "forms" listing the conjugated form of each of PERSONS in order.
+    If the same (verb, tense) appears more than once, the last line wins.
+    """
+
+    def __init__(
+        self,
+        path: str = CONJUGATIONS_LOG,
+        legacy_path: Optional[str] = LEGACY_CONJUGATIONS_FILE,
+        html_log_path: Optional[str] = HTML_CONJUGATIONS_LOG,
+    ) -> None:
+        self.path = path
+        self.legacy_path = legacy_path
+        self.html_log_path = html_log_path
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[str, str], Forms] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """
+        Build the index from the log, migrating the HTML tables of earlier
+        versions the first time the store is used.
+        """
+        if not os.path.exists(self.path):
+            if not any(
+                source and os.path.exists(source)
+                for source in (self.legacy_path, self.html_log_path)
+            ):
+                return
+            print(f"Migrating earlier versions' conjugation tables to {self.path}")
+            migrated, skipped = migrate_conjugations(
+                self.path, self.legacy_path, self.html_log_path
+            )
+            print(f"Migrated {migrated} conjugation tables, skipped {skipped}")
+
+        with open(self.path, "r", encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write; skip it
+                    continue
+                self._index[(record["verb"], record["tense"])] = dict(
+                    zip(PERSONS, record["forms"])
+                )
+
+    def get(self, verb: str, tense: str) -> Optional[Forms]:
+        """
+        Look up a conjugation table.
+
+        Args:
+            verb (str): The infinitive.
+            tense (str): The tense.
+
+        Returns:
+            Optional[Forms]: The form for each person, or None if it isn't stored.
+        """
+        return self._index.get((verb, tense))
+
+    def put(self, verb: str, tense: str, forms: Forms) -> None:
+        """
+        Store a conjugation table, appending it to the log.
+
+        Args:
+            verb (str): The infinitive.
+            tense (str): The tense.
+            forms (Forms): The form for each person.
+        """
+        data = _to_line(verb, tense, forms).encode("utf-8")
+        with self._lock:
+            # A single write to an O_APPEND descriptor, so lines from
+            # concurrent writers never interleave
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._index[(verb, tense)] = forms
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(list(self._index))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def _to_line(verb: str, tense: str, forms: Forms) -> str:
+    """
+    Serialise one record of the log.
+    """
+    return (
+        json.dumps(
+            {
+                "verb": verb,
+                "tense": tense,
+                "forms": [forms[person] for person in PERSONS],
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+
+
+_STORE: Optional[ConjugationStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_conjugation_store() -> ConjugationStore:
+    """
+    Return the process-wide conjugation store, loading it on first use.
+
+    Returns:
+        ConjugationStore: The shared store.
+    """
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ConjugationStore()
+        return _STORE
@@ -0,0 +1,755 @@
+"""
+Rule-based Italian conjugation engine.
+
+Regular -are/-ere/-ire verbs, reflexives and compound tenses are fully
+deterministic, so we conjugate them locally instead of asking the LLM. Verbs
+with irregular stems are described in `IRREGULAR_VERBS`; any verb we don't
+know about returns None so the caller can fall back to the LLM.
+"""
+
+from typing import Dict, List, Optional, Union
+import constants
+
+PERSONS = [
+    "1st person singular",
+    "2nd person singular",
+    "3rd person singular",
+    "1st person plural",
+    "2nd person plural",
+    "3rd person plural",
+]
+
+SUBJECT_PRONOUNS = ["io", "tu", "lui/lei", "noi", "voi", "loro"]
+
+REFLEXIVE_PRONOUNS = ["mi", "ti", "si", "ci", "vi", "si"]
+
+SIMPLE_TENSES = {
+    "Presente Indicativo",
+    "Imperfetto Indicativo",
+    "Passato Remoto Indicativo",
+    "Futuro Semplice Indicativo",
+    "Presente Condizionale",
+    "Presente Congiuntivo",
+    "Imperfetto Congiuntivo",
+}
+
+# Compound tense -> the simple tense its auxiliary is conjugated in
+COMPOUND_TENSES = {
+    "Passato Prossimo Indicativo": "Presente Indicativo",
+    "Trapassato Prossimo Indicativo": "Imperfetto Indicativo",
+    "Trapassato Remoto Indicativo": "Passato Remoto Indicativo",
+    "Futuro Anteriore Indicativo": "Futuro Semplice Indicativo",
+    "Passato Condizionale": "Presente Condizionale",
+    "Passato Congiuntivo": "Presente Congiuntivo",
+    "Trapassato Congiuntivo": "Imperfetto Congiuntivo",
+}
+
+ENDINGS = {
+    "are": {
+        "Presente Indicativo": ["o", "i", "a", "iamo", "ate", "ano"],
+        "Passato Remoto Indicativo": ["ai", "asti", "ò", "ammo", "aste", "arono"],
+        "Presente Congiuntivo": ["i", "i", "i", "iamo", "iate", "ino"],
+    },
+    "ere": {
+        "Presente Indicativo": ["o", "i", "e", "iamo", "ete", "ono"],
+        "Passato Remoto Indicativo": ["ei", "esti", "é", "emmo", "este", "erono"],
+        "Presente Congiuntivo": ["a", "a", "a", "iamo", "iate", "ano"],
+    },
+    "ire": {
+        "Presente Indicativo": ["o", "i", "e", "iamo", "ite", "ono"],
+        "Passato Remoto Indicativo": ["ii", "isti", "ì", "immo", "iste", "irono"],
+        "Presente Congiuntivo": ["a", "a", "a", "iamo", "iate", "ano"],
+    },
+}
+
+IMPERFETTO_ENDINGS = ["vo", "vi", "va", "vamo", "vate", "vano"]
+CONGIUNTIVO_IMPERFETTO_ENDINGS = ["ssi", "ssi", "sse", "ssimo", "ste", "ssero"]
+FUTURO_ENDINGS = ["ò", "ai", "à", "emo", "ete", "anno"]
+CONDIZIONALE_ENDINGS = ["ei", "esti", "ebbe", "emmo", "este", "ebbero"]
+
+PARTICIPLE_ENDINGS = {"are": "ato", "ere": "uto", "ire": "ito"}
+
+# -ire verbs that take -isc- in the singular and 3rd plural of the present
+ISC_VERBS = {
+    "capire",
+    "chiarire",
+    "colpire",
+    "costruire",
+    "definire",
+    "finire",
+    "fornire",
+    "garantire",
+    "gestire",
+    "impedire",
+    "preferire",
+    "pulire",
+    "restituire",
+    "spedire",
+    "sparire",
+    "suggerire",
+    "tradire",
+    "unire",
+}
+
+# Regular verbs that nonetheless take "essere" in compound tenses
+ESSERE_VERBS = {
+    "arrivare",
+    "cadere",
+    "diventare",
+    "entrare",
+    "partire",
+    "restare",
+    "ritornare",
+    "tornare",
+}
+
+# Each irregular verb only lists what deviates from the regular pattern.
+# "presente", "passato_remoto" and "congiuntivo" are full six-person lists;
+# the stems are combined with the shared endings above.
+IRREGULAR_VERBS: Dict[str, Dict[str, Union[str, List[str]]]] = {
+    "avere": {
+        "presente": ["ho", "hai", "ha", "abbiamo", "avete", "hanno"],
+        "passato_remoto": ["ebbi", "avesti", "ebbe", "avemmo", "aveste", "ebbero"],
+        "futuro_stem": "avr",
+        "congiuntivo": ["abbia", "abbia", "abbia", "abbiamo", "abbiate", "abbiano"],
+        "participio": "avuto",
+    },
+    "essere": {
+        "presente": ["sono", "sei", "è", "siamo", "siete", "sono"],
+        "imperfetto": ["ero", "eri", "era", "eravamo", "eravate", "erano"],
+        "passato_remoto": ["fui", "fosti", "fu", "fummo", "foste", "furono"],
+        "futuro_stem": "sar",
+        "congiuntivo": ["sia", "sia", "sia", "siamo", "siate", "siano"],
+        "congiuntivo_imperfetto_stem": "fo",
+        "participio": "stato",
+        "ausiliare": "essere",
+    },
+    "fare": {
+        "presente": ["faccio", "fai", "fa", "facciamo", "fate", "fanno"],
+        "imperfetto_stem": "face",
+        "passato_remoto": ["feci", "facesti", "fece", "facemmo", "faceste", "fecero"],
+        "futuro_stem": "far",
+        "congiuntivo": [
+            "faccia",
+            "faccia",
+            "faccia",
+            "facciamo",
+            "facciate",
+            "facciano",
+        ],
+        "participio": "fatto",
+    },
+    "stare": {
+        "presente": ["sto", "stai", "sta", "stiamo", "state", "stanno"],
+        "passato_remoto": [
+            "stetti",
+            "stesti",
+            "stette",
+            "stemmo",
+            "steste",
+            "stettero",
+        ],
+        "futuro_stem": "star",
+        "congiuntivo": ["stia", "stia", "stia", "stiamo", "stiate", "stiano"],
+        "congiuntivo_imperfetto_stem": "ste",
+        "participio": "stato",
+        "ausiliare": "essere",
+    },
+    "dire": {
+        "presente": ["dico", "dici", "dice", "diciamo", "dite", "dicono"],
+        "imperfetto_stem": "dice",
+        "passato_remoto": [
+            "dissi",
+            "dicesti",
+            "disse",
+            "dicemmo",
+            "diceste",
+            "dissero",
+        ],
+        "futuro_stem": "dir",
+        "congiuntivo": ["dica", "dica", "dica", "diciamo", "diciate", "dicano"],
+        "participio": "detto",
+    },
+    "potere": {
+        "presente": ["posso", "puoi", "può", "possiamo", "potete", "possono"],
+        "futuro_stem": "potr",
+        "congiuntivo": ["possa", "possa", "possa", "possiamo", "possiate", "possano"],
+    },
+    "venire": {
+        "presente": ["vengo", "vieni", "viene", "veniamo", "venite", "vengono"],
+        "passato_remoto": [
+            "venni",
+            "venisti",
+            "venne",
+            "venimmo",
+            "veniste",
+            "vennero",
+        ],
+        "futuro_stem": "verr",
+        "congiuntivo": ["venga", "venga", "venga", "veniamo", "veniate", "vengano"],
+        "participio": "venuto",
+        "ausiliare": "essere",
+    },
+    "andare": {
+        "presente": ["vado", "vai", "va", "andiamo", "andate", "vanno"],
+        "futuro_stem": "andr",
+        "congiuntivo": ["vada", "vada", "vada", "andiamo", "andiate", "vadano"],
+        "ausiliare": "essere",
+    },
+    "volere": {
+        "presente": ["voglio", "vuoi", "vuole", "vogliamo", "volete", "vogliono"],
+        "passato_remoto": [
+            "volli",
+            "volesti",
+            "volle",
+            "volemmo",
+            "voleste",
+            "vollero",
+        ],
+        "futuro_stem": "vorr",
+        "congiuntivo": [
+            "voglia",
+            "voglia",
+            "voglia",
+            "vogliamo",
+            "vogliate",
+            "vogliano",
+        ],
+    },
+    "sapere": {
+        "presente": ["so", "sai", "sa", "sappiamo", "sapete", "sanno"],
+        "passato_remoto": [
+            "seppi",
+            "sapesti",
+            "seppe",
+            "sapemmo",
+            "sapeste",
+            "seppero",
+        ],
+        "futuro_stem": "sapr",
+        "congiuntivo": [
+            "sappia",
+            "sappia",
+            "sappia",
+            "sappiamo",
+            "sappiate",
+            "sappiano",
+        ],
+    },
+    "dare": {
+        "presente": ["do", "dai", "dà", "diamo", "date", "danno"],
+        "passato_remoto": ["diedi", "desti", "diede", "demmo", "deste", "diedero"],
+        "futuro_stem": "dar",
+        "congiuntivo": ["dia", "dia", "dia", "diamo", "diate", "diano"],
+        "congiuntivo_imperfetto_stem": "de",
+    },
+    "vedere": {
+        "passato_remoto": ["vidi", "vedesti", "vide", "vedemmo", "vedeste", "videro"],
+        "futuro_stem": "vedr",
+        "participio": "visto",
+    },
+    "uscire": {
+        "presente": ["esco", "esci", "esce", "usciamo", "uscite", "escono"],
+        "congiuntivo": ["esca", "esca", "esca", "usciamo", "usciate", "escano"],
+        "ausiliare": "essere",
+    },
+    "bere": {
+        "presente": ["bevo", "bevi", "beve", "beviamo", "bevete", "bevono"],
+        "imperfetto_stem": "beve",
+        "passato_remoto": [
+            "bevvi",
+            "bevesti",
+            "bevve",
+            "bevemmo",
+            "beveste",
+            "bevvero",
+        ],
+        "futuro_stem": "berr",
+        "congiuntivo": ["beva", "beva", "beva", "beviamo", "beviate", "bevano"],
+        "participio": "bevuto",
+    },
+    "tenere": {
+        "presente": ["tengo", "tieni", "tiene", "teniamo", "tenete", "tengono"],
+        "passato_remoto": [
+            "tenni",
+            "tenesti",
+            "tenne",
+            "tenemmo",
+            "teneste",
+            "tennero",
+        ],
+        "futuro_stem": "terr",
+        "congiuntivo": ["tenga", "tenga", "tenga", "teniamo", "teniate", "tengano"],
+    },
+    "rimanere": {
+        "presente": [
+            "rimango",
+            "rimani",
+            "rimane",
+            "rimaniamo",
+            "rimanete",
+            "rimangono",
+        ],
+        "passato_remoto": [
+            "rimasi",
+            "rimanesti",
+            "rimase",
+            "rimanemmo",
+            "rimaneste",
+            "rimasero",
+        ],
+        "futuro_stem": "rimarr",
+        "congiuntivo": [
+            "rimanga",
+            "rimanga",
+            "rimanga",
+            "rimaniamo",
+            "rimaniate",
+            "rimangano",
+        ],
+        "participio": "rimasto",
+        "ausiliare": "essere",
+    },
+    "scegliere": {
+        "presente": [
+            "scelgo",
+            "scegli",
+            "sceglie",
+            "scegliamo",
+            "scegliete",
+            "scelgono",
+        ],
+        "passato_remoto": [
+            "scelsi",
+            "scegliesti",
+            "scelse",
+            "scegliemmo",
+            "sceglieste",
+            "scelsero",
+        ],
+        "congiuntivo": [
+            "scelga",
+            "scelga",
+            "scelga",
+            "scegliamo",
+            "scegliate",
+            "scelgano",
+        ],
+        "participio": "scelto",
+    },
+    # Intransitive "sedere" takes "essere" without a pronoun ("sono seduto");
+    # "mi sono seduto" is the reflexive "sedersi". The future and conditional
+    # use the diphthong, "siederò" and "siederei", over "sederò" and "sederei".
+    "sedere": {
+        "presente": ["siedo", "siedi", "siede", "sediamo", "sedete", "siedono"],
+        "futuro_stem": "sieder",
+        "congiuntivo": ["sieda", "sieda", "sieda", "sediamo", "sediate", "siedano"],
+        "ausiliare": "essere",
+    },
+    "salire": {
+        "presente": ["salgo", "sali", "sale", "saliamo", "salite", "salgono"],
+        "congiuntivo": ["salga", "salga", "salga", "saliamo", "saliate", "salgano"],
+        "ausiliare": "essere",
+    },
+    "spegnere": {
+        "presente": [
+            "spengo",
+            "spegni",
+            "spegne",
+            "spegniamo",
+            "spegnete",
+            "spengono",
+        ],
+        "passato_remoto": [
+            "spensi",
+            "spegnesti",
+            "spense",
+            "spegnemmo",
+            "spegneste",
+            "spensero",
+        ],
+        "congiuntivo": [
+            "spenga",
+            "spenga",
+            "spenga",
+            "spegniamo",
+            "spegniate",
+            "spengano",
+        ],
+        "participio": "spento",
+    },
+    "tradurre": {
+        "presente": [
+            "traduco",
+            "traduci",
+            "traduce",
+            "traduciamo",
+            "traducete",
+            "traducono",
+        ],
+        "imperfetto_stem": "traduce",
+        "passato_remoto": [
+            "tradussi",
+            "traducesti",
+            "tradusse",
+            "traducemmo",
+            "traduceste",
+            "tradussero",
+        ],
+        "futuro_stem": "tradurr",
+        "congiuntivo": [
+            "traduca",
+            "traduca",
+            "traduca",
+            "traduciamo",
+            "traduciate",
+            "traducano",
+        ],
+        "participio": "tradotto",
+    },
+    "produrre": {
+        "presente": [
+            "produco",
+            "produci",
+            "produce",
+            "produciamo",
+            "producete",
+            "producono",
+        ],
+        "imperfetto_stem": "produce",
+        "passato_remoto": [
+            "produssi",
+            "producesti",
+            "produsse",
+            "producemmo",
+            "produceste",
+            "produssero",
+        ],
+        "futuro_stem": "produrr",
+        "congiuntivo": [
+            "produca",
+            "produca",
+            "produca",
+            "produciamo",
+            "produciate",
+            "producano",
+        ],
+        "participio": "prodotto",
+    },
+    "morire": {
+        "presente": ["muoio", "muori", "muore", "moriamo", "morite", "muoiono"],
+        "congiuntivo": ["muoia", "muoia", "muoia", "moriamo", "moriate", "muoiano"],
+        "participio": "morto",
+        "ausiliare": "essere",
+    },
+    "piacere": {
+        "presente": [
+            "piaccio",
+            "piaci",
+            "piace",
+            "piacciamo",
+            "piacete",
+            "piacciono",
+        ],
+        "passato_remoto": [
+            "piacqui",
+            "piacesti",
+            "piacque",
+            "piacemmo",
+            "piaceste",
+            "piacquero",
+        ],
+        "congiuntivo": [
+            "piaccia",
+            "piaccia",
+            "piaccia",
+            "piacciamo",
+            "piacciate",
+            "piacciano",
+        ],
+        "participio": "piaciuto",
+        "ausiliare": "essere",
+    },
+    "trarre": {
+        "presente": ["traggo", "trai", "trae", "traiamo", "traete", "traggono"],
+        "imperfetto_stem": "trae",
+        "passato_remoto": [
+            "trassi",
+            "traesti",
+            "trasse",
+            "traemmo",
+            "traeste",
+            "trassero",
+        ],
+        "futuro_stem": "trarr",
+        "congiuntivo": ["tragga", "tragga", "tragga", "traiamo", "traiate", "traggano"],
+        "participio": "tratto",
+    },
+    "apparire": {
+        "presente": [
+            "appaio",
+            "appari",
+            "appare",
+            "appariamo",
+            "apparite",
+            "appaiono",
+        ],
+        "passato_remoto": [
+            "apparvi",
+            "apparisti",
+            "apparve",
+            "apparimmo",
+            "appariste",
+            "apparvero",
+        ],
+        "congiuntivo": [
+            "appaia",
+            "appaia",
+            "appaia",
+            "appariamo",
+            "appariate",
+            "appaiano",
+        ],
+        "participio": "apparso",
+        "ausiliare": "essere",
+    },
+    "vivere": {
+        "passato_remoto": [
+            "vissi",
+            "vivesti",
+            "visse",
+            "vivemmo",
+            "viveste",
+            "vissero",
+        ],
+        "futuro_stem": "vivr",
+        "participio": "vissuto",
+    },
+    "cogliere": {
+        "presente": ["colgo", "cogli", "coglie", "cogliamo", "cogliete", "colgono"],
+        "passato_remoto": [
+            "colsi",
+            "cogliesti",
+            "colse",
+            "cogliemmo",
+            "coglieste",
+            "colsero",
+        ],
+        "congiuntivo": ["colga", "colga", "colga", "cogliamo", "cogliate", "colgano"],
+        "participio": "colto",
+    },
+    "porre": {
+        "presente": ["pongo", "poni", "pone", "poniamo", "ponete", "pongono"],
+        "imperfetto_stem": "pone",
+        "passato_remoto": ["posi", "ponesti", "pose", "ponemmo", "poneste", "posero"],
+        "futuro_stem": "porr",
+        "congiuntivo": ["ponga", "ponga", "ponga", "poniamo", "poniate", "pongano"],
+        "participio": "posto",
+    },
+    # Listed as regular verbs, but with strong past forms
+    "prendere": {
+        "passato_remoto": [
+            "presi",
+            "prendesti",
+            "prese",
+            "prendemmo",
+            "prendeste",
+            "presero",
+        ],
+        "participio": "preso",
+    },
+    "scrivere": {
+        "passato_remoto": [
+            "scrissi",
+            "scrivesti",
+            "scrisse",
+            "scrivemmo",
+            "scriveste",
+            "scrissero",
+        ],
+        "participio": "scritto",
+    },
+    "leggere": {
+        "passato_remoto": [
+            "lessi",
+            "leggesti",
+            "lesse",
+            "leggemmo",
+            "leggeste",
+            "lessero",
+        ],
+        "participio": "letto",
+    },
+    "aprire": {
+        "participio": "aperto",
+    },
+}
+
+
+def _join(stem: str, ending: str, suffix: str) -> str:
+    """
+    Attach an ending to a stem, applying the -are spelling rules for
+    -care/-gare (cerchi) and -ciare/-giare/-iare (mangi, mangerò).
+
+    Args:
+        stem (str): The stem, e.g. "mangi" or "cerc".
+        ending (str): The ending to attach.
+        suffix (str): The infinitive ending: "are", "ere" or "ire".
+
+    Returns:
+        str: The combined form.
+    """
+    if suffix != "are":
+        return stem + ending
+    if stem.endswith(("c", "g")) and ending[:1] in ("e", "i"):
+        return stem + "h" + ending
+    if stem.endswith("i") and ending.startswith("i"):
+        return stem + ending[1:]
+    if stem.endswith(("ci", "gi")) and ending.startswith("e"):
+        return stem[:-1] + ending
+    return stem + ending
+
+
+def _simple_forms(verb: str, tense: str) -> List[str]:
+    """
+    Conjugate a (non-reflexive) infinitive in one of the simple tenses.
+
+    Args:
+        verb (str): The infinitive, e.g. "parlare".
+        tense (str): One of SIMPLE_TENSES.
+
+    Returns:
+        List[str]: The six forms, in the order of PERSONS.
+    """
+    irregular = IRREGULAR_VERBS.get(verb, {})
+    suffix = verb[-3:]
+    stem = verb[:-3]
+    # The "vowel stem" used by the imperfetto and imperfetto congiuntivo
+    vowel_stem = str(irregular.get("imperfetto_stem", verb[:-2]))
+
+    if tense == "Presente Indicativo":
+        if "presente" in irregular:
+            return list(irregular["presente"])
+        endings = ENDINGS[suffix][tense]
+        if verb in ISC_VERBS:
+            return [
+                stem + "isc" + ending if person in (0, 1, 2, 5) else stem + ending
+                for person, ending in enumerate(endings)
+            ]
+        return [_join(stem, ending, suffix) for ending in endings]
+
+    if tense == "Imperfetto Indicativo":
+        if "imperfetto" in irregular:
+            return list(irregular["imperfetto"])
+        return [vowel_stem + ending for ending in IMPERFETTO_ENDINGS]
+
+    if tense == "Passato Remoto Indicativo":
+        if "passato_remoto" in irregular:
+            return list(irregular["passato_remoto"])
+        return [_join(stem, ending, suffix) for ending in ENDINGS[suffix][tense]]
+
+    if tense in ("Futuro Semplice Indicativo", "Presente Condizionale"):
+        endings = (
+            FUTURO_ENDINGS
+            if tense == "Futuro Semplice Indicativo"
+            else CONDIZIONALE_ENDINGS
+        )
+        if "futuro_stem" in irregular:
+            return [str(irregular["futuro_stem"]) + ending for ending in endings]
+        if suffix == "are":
+            return [_join(stem, "er" + ending, suffix) for ending in endings]
+        return [verb[:-1] + ending for ending in endings]
+
+    if tense == "Presente Congiuntivo":
+        if "congiuntivo" in irregular:
+            return list(irregular["congiuntivo"])
+        endings = ENDINGS[suffix][tense]
+        if verb in ISC_VERBS:
+            return [
+                stem + "isc" + ending if person in (0, 1, 2, 5) else stem + ending
+                for person, ending in enumerate(endings)
+            ]
+        return [_join(stem, ending, suffix) for ending in endings]
+
+    if tense == "Imperfetto Congiuntivo":
+        congiuntivo_stem = str(irregular.get("congiuntivo_imperfetto_stem", vowel_stem))
+        return [congiuntivo_stem + ending for ending in CONGIUNTIVO_IMPERFETTO_ENDINGS]
+
+    raise ValueError(f"Unsupported tense: {tense}")
+
+
+def _participle(verb: str, person_index: int, agree: bool) -> str:
+    """
+    Return the past participle, agreeing in number with the subject when the
+    auxiliary is "essere". We default to the masculine form.
+
+    Args:
+        verb (str): The (non-reflexive) infinitive.
+        person_index (int): Index into PERSONS.
+        agree (bool): Whether the participle agrees with the subject.
+
+    Returns:
+        str: The participle.
+    """
+    irregular = IRREGULAR_VERBS.get(verb, {})
+    if "participio" in irregular:
+        participle = str(irregular["participio"])
+    else:
+        participle = verb[:-3] + PARTICIPLE_ENDINGS[verb[-3:]]
+    if agree and person_index >= 3:
+        participle = participle[:-1] + "i"
+    return participle
+
+
+def is_known_verb(verb: str) -> bool:
+    """
+    Whether the engine can conjugate a verb without help from the LLM.
+
+    Args:
+        verb (str): The infinitive, possibly reflexive (e.g. "alzarsi").
+
+    Returns:
+        bool: True if the verb is in the irregular table or the regular list.
+    """
+    return verb in IRREGULAR_VERBS or verb in constants.regular_verbs
+
+
+def conjugate(verb: str, tense: str, person: str) -> Optional[str]:
+    """
+    Conjugate a verb locally, given an infinitive, person and tense.
+
+    Args:
+        verb (str): The infinitive, e.g. "parlare" or "alzarsi".
+        tense (str): The tense, as named in the content files.
+        person (str): The person, as named in content/persons.txt.
+
+    Returns:
+        Optional[str]: The conjugated form (e.g. "avrei avuto", "mi sono alzato"),
+        or None if the verb, tense or person is unknown.
+    """
+    if not is_known_verb(verb) or person not in PERSONS:
+        return None
+    if tense not in SIMPLE_TENSES and tense not in COMPOUND_TENSES:
+        return None
+
+    person_index = PERSONS.index(person)
+    reflexive = verb.endswith("rsi")
+    infinitive = verb[:-2] + "e" if reflexive else verb
+    if infinitive not in IRREGULAR_VERBS and infinitive[-3:] not in ENDINGS:
+        return None
+
+    if tense in SIMPLE_TENSES:
+        form = _simple_forms(infinitive, tense)[person_index]
+    else:
+        auxiliary = (
+            "essere"
+            if reflexive or infinitive in ESSERE_VERBS
+            else str(IRREGULAR_VERBS.get(infinitive, {}).get("ausiliare", "avere"))
+        )
+        auxiliary_form = _simple_forms(auxiliary, COMPOUND_TENSES[tense])[person_index]
+        participle = _participle(infinitive, person_index, auxiliary == "essere")
+        form = auxiliary_form + " " + participle
+
+    if reflexive:
+        form = REFLEXIVE_PRONOUNS[person_index] + " " + form
+    return form
@@ -1,6 +1,6 @@
 import os
-from typing import List
-import openai
+import threading
+from typing import Any, List
 
 
 def read_data(file_name: str) -> List[str]:
@@ -21,20 +21,107 @@ def read_data(file_name: str) -> List[str]:
     return lines
 
 
-subjects = read_data("content/subjects.txt")
-key_verbs = read_data("content/key_verbs.txt")
-irregular_verbs = read_data("content/irregular_verbs.txt")
-regular_verbs = read_data("content/regular_verbs.txt")
-basic_tenses = read_data("content/basic_tenses.txt")
-advanced_tenses = read_data("content/advanced_tenses.txt")
-all_persons = read_data("content/persons.txt")
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+
+# The content lists, read from CONTENT_DIR the first time each is used
+CONTENT_FILES = {
+    "subjects": "subjects.txt",
+    "key_verbs": "key_verbs.txt",
+    "irregular_verbs": "irregular_verbs.txt",
+    "regular_verbs": "regular_verbs.txt",
+    "basic_tenses": "basic_tenses.txt",
+    "advanced_tenses": "advanced_tenses.txt",
+    "all_persons": "persons.txt",
+}
+
+
+def __getattr__(name: str) -> List[str]:
+    """
+    Load a content list on first access, so importing this module doesn't
+    touch the disk. The list is then cached as a module global. An entry
+    listed twice is kept once, as a deck can't hold the same card twice.
+    """
+    if name not in CONTENT_FILES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    lines = list(
+        dict.fromkeys(read_data(os.path.join(CONTENT_DIR, CONTENT_FILES[name])))
+    )
+    return globals().setdefault(name, lines)
+
 
 WAIT_MIN = 1
 WAIT_MAX = 120
 STOP_AFTER = 10
 
-CLIENT = openai.OpenAI()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+_CLIENT: Any = None
+_ASYNC_CLIENT: Any = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> Any:
+    """
+    Return the shared OpenAI client, constructing it on first use so that
+    importing this module neither imports openai nor needs an API key.
+
+    Returns:
+        Any: The openai.OpenAI client.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                import openai
+
+                _CLIENT = openai.OpenAI()
+    return _CLIENT
+
+
+def get_async_client() -> Any:
+    """
+    Return the shared async OpenAI client, constructing it on first use.
+
+    Returns:
+        Any: The openai.AsyncOpenAI client.
+    """
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None:
+        with _CLIENT_LOCK:
+            if _ASYNC_CLIENT is None:
+                import openai
+
+                _ASYNC_CLIENT = openai.AsyncOpenAI()
+    return _ASYNC_CLIENT
+
 
 EXPENSIVE_MODEL = "gpt-4o"
-CHEAP_MODEL = "gpt-3.5-turbo"
+CHEAP_MODEL = "gpt-4o-mini"
+
+# (requests per minute, tokens per minute) for each model. These are the
+# starting points; the real limits for the account are picked up from the
+# x-ratelimit-* headers of the first response.
+RATE_LIMITS = {
+    EXPENSIVE_MODEL: (500, 30_000),
+    CHEAP_MODEL: (500, 200_000),
+}
+DEFAULT_RATE_LIMIT = (500, 30_000)
+
+# A request's timeout in seconds is REQUEST_TIMEOUT, plus the time it takes to
+# write its max_tokens at MIN_TOKENS_PER_SECOND, so short replies fail fast
+REQUEST_TIMEOUT = 15
+MIN_TOKENS_PER_SECOND = 20
+
+# USD per million (prompt, completion) tokens for each model, for planning.
+# The Batch API charges half of these.
+MODEL_PRICES = {
+    EXPENSIVE_MODEL: (2.50, 10.00),
+    CHEAP_MODEL: (0.15, 0.60),
+}
+DEFAULT_MODEL_PRICE = (2.50, 10.00)
+BATCH_DISCOUNT = 0.5
+# USD per million characters sent to AWS Translate
+TRANSLATE_PRICE = 15.00
+
+SENTENCE_CACHE_DIR = "sentence_cache"
+SENTENCE_CACHE_MAX_BYTES = 50 * 1024 * 1024
+# Share of cached sentences to regenerate on each build; 0 reuses them all
+SENTENCE_CACHE_REFRESH_PERCENT = 0
@@ -2,46 +2,98 @@
 Code to send verb data to OpenAI and get back flashcard content.
 """
 
-import os
+import asyncio
+import json
 import re
-import boto3
-import openai
+from typing import Dict, List, Optional, Tuple
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_random_exponential,
 )
+from cascade import (
+    complete,
+    complete_async,
+    from_sentence_cache,
+    settle_in_sentence_cache,
+)
+from conjugator import PERSONS
+from llm import json_schema_format, parse_json_reply, reply_string
 from utils import (
     get_conjugated,
+    get_conjugated_async,
     get_conjugation_from_disk,
+    get_conjugation_from_disk_async,
     get_wikipedia_link_for_subject,
+    render_conjugation,
 )
+from conjugation_store import Forms
 from data_types import VerbPackage
+from translation import translate_many
+from tracing import count, record_retry, traced
+from validation import check_sentence, check_sentences
 from constants import (
     WAIT_MAX,
     WAIT_MIN,
     STOP_AFTER,
-    CLIENT,
-    EXPENSIVE_MODEL,
-    # CHEAP_MODEL,
 )
 
+SENTENCE_RESPONSE_FORMAT = json_schema_format(
+    "italian_sentence",
+    {
+        "type": "object",
+        "properties": {"sentence": {"type": "string"}},
+        "required": ["sentence"],
+        "additionalProperties": False,
+    },
+)
 
-@retry(
-    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
-    stop=stop_after_attempt(STOP_AFTER),
+SENTENCES_RESPONSE_FORMAT = json_schema_format(
+    "italian_sentences",
+    {
+        "type": "object",
+        "properties": {
+            "sentences": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "person": {"type": "string", "enum": PERSONS},
+                        "sentence": {"type": "string"},
+                    },
+                    "required": ["person", "sentence"],
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["sentences"],
+        "additionalProperties": False,
+    },
 )
-def create_italian_sentence(verb_package: VerbPackage) -> VerbPackage:
+
+# Output budgets: a sentence is a few dozen tokens, plus its JSON
+SENTENCE_MAX_TOKENS = 100
+SENTENCES_MAX_TOKENS = 500
+
+# Fresh requests for a sentence that fails validation before it ships as is
+REGENERATE_ATTEMPTS = 2
+
+# Marks a cached sentence as the verdict of a regeneration, with the requests
+# it took, so later builds use it as it is
+SETTLED_KEY = "settled_after"
+
+
+def get_subject_statement(verb_package: VerbPackage) -> str:
     """
-    Creates a sentence in Italian from the given VerbPackage.
+    Third-person sentences are steered towards the package's subject.
 
     Args:
         verb_package (VerbPackage): The VerbPackage to use to create a sentence.
 
     Returns:
-        str: The created sentence.
+        str: The instruction, or an empty string.
     """
-    subject_statement = (
+    return (
         f"The sentence will be on the topic of {verb_package.subject}."
         if verb_package.person
         in {
@@ -50,10 +102,20 @@ def create_italian_sentence(verb_package: VerbPackage) -> VerbPackage:
         }
         else ""
     )
-    print(
-        f"Requesting from OpenAI sentence for {verb_package.verb_conjugated}. {subject_statement}"
-    )
-    create_italian_sentence_prompt = f"""
+
+
+def build_italian_sentence_prompt(verb_package: VerbPackage) -> str:
+    """
+    Build the prompt asking the LLM for a cloze deletion sentence.
+
+    Args:
+        verb_package (VerbPackage): The VerbPackage to use to create a sentence.
+
+    Returns:
+        str: The prompt.
+    """
+    subject_statement = get_subject_statement(verb_package)
+    return f"""
         Create a sentence using this verb:
 
         {verb_package.verb_conjugated}
@@ -61,7 +123,7 @@ def create_italian_sentence(verb_package: VerbPackage) -> VerbPackage:
         This is the {verb_package.person} {verb_package.tense} of {verb_package.verb}.
 
         Wrap "{verb_package.verb_conjugated}" with cloze deletion syntax from Anki in a single cloze deletion. 
-        Only include the Italian sentence in your response.
+        Only include Italian in the sentence.
 
         In the context of the sentence, the cloze should look like this:
         {{{{c1::{verb_package.verb_conjugated}}}}}
@@ -71,21 +133,24 @@ def create_italian_sentence(verb_package: VerbPackage) -> VerbPackage:
         {subject_statement}
         
         Include all pronouns, do not skip them.
+
+        Respond with a JSON object like this:
+        {{"sentence": "..."}}
     """
-    response = CLIENT.chat.completions.create(
-        model=EXPENSIVE_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an Italian teacher.",
-            },
-            {
-                "role": "user",
-                "content": create_italian_sentence_prompt,
-            },
-        ],
-    )
-    verb_package.sentence = str(response.choices[0].message.content)
+
+
+def apply_italian_sentence(verb_package: VerbPackage, sentence: str) -> VerbPackage:
+    """
+    Store the generated sentence on the VerbPackage and build the cloze field.
+
+    Args:
+        verb_package (VerbPackage): The VerbPackage the sentence was made for.
+        sentence (str): The generated sentence.
+
+    Returns:
+        VerbPackage: The VerbPackage with sentence and cloze added.
+    """
+    verb_package.sentence = sentence
     cloze = f"""
         {verb_package.sentence}
         <p><strong>{verb_package.verb}</strong>
@@ -95,59 +160,534 @@ def create_italian_sentence(verb_package: VerbPackage) -> VerbPackage:
     return verb_package
 
 
+def apply_italian_sentence_reply(
+    verb_package: VerbPackage, content: str
+) -> VerbPackage:
+    """
+    Apply the reply to a `build_italian_sentence_prompt` prompt.
+
+    Args:
+        verb_package (VerbPackage): The VerbPackage the sentence was made for.
+        content (str): The JSON reply.
+
+    Returns:
+        VerbPackage: The VerbPackage with sentence and cloze added.
+    """
+    return apply_italian_sentence(
+        verb_package, reply_string(parse_json_reply(content), "sentence")
+    )
+
+
+def parse_settled_sentence_reply(content: str) -> Tuple[str, Optional[int]]:
+    """
+    Parse a cached reply to a `build_italian_sentence_prompt` prompt.
+
+    Args:
+        content (str): The JSON reply.
+
+    Returns:
+        Tuple[str, Optional[int]]: The sentence, and the requests an earlier
+        regeneration took to settle on it, or None if it hasn't been settled.
+    """
+    reply = parse_json_reply(content)
+    attempts = reply.get(SETTLED_KEY)
+    return reply_string(reply, "sentence"), (
+        attempts if isinstance(attempts, int) else None
+    )
+
+
+def settle_italian_sentence(
+    prompt: str, verb_package: VerbPackage, attempts: int
+) -> None:
+    """
+    Cache the sentence a regeneration ended with, passing or not, so later
+    builds neither check it again nor ask for another.
+
+    Args:
+        prompt (str): The `build_italian_sentence_prompt` prompt.
+        verb_package (VerbPackage): The VerbPackage with its final sentence.
+        attempts (int): The requests the regeneration took.
+    """
+    content = json.dumps(
+        {"sentence": verb_package.sentence, SETTLED_KEY: attempts}, ensure_ascii=False
+    )
+    settle_in_sentence_cache(prompt, content)
+
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+def regenerate_italian_sentence(verb_package: VerbPackage) -> VerbPackage:
+    """
+    Replace a sentence that failed validation with one requested on its own,
+    rather than regenerating the card's whole group. The outcome is cached,
+    so an unchanged rebuild reuses it without checking it or calling the API.
+
+    Args:
+        verb_package (VerbPackage): The VerbPackage whose sentence failed.
+
+    Returns:
+        VerbPackage: The VerbPackage with a new sentence, or the last one
+        requested if none passes within REGENERATE_ATTEMPTS.
+    """
+    prompt = build_italian_sentence_prompt(verb_package)
+    cached = from_sentence_cache(prompt, parse_settled_sentence_reply)
+    if cached is not None:
+        sentence, attempts = cached
+        apply_italian_sentence(verb_package, sentence)
+        if attempts is not None:
+            count("validation.settled")
+            return verb_package
+        if check_sentence(verb_package) is None:
+            return verb_package
+
+    attempts = 0
+    while attempts < REGENERATE_ATTEMPTS:
+        attempts += 1
+        print(f"Regenerating sentence for {verb_package.verb_conjugated}")
+        complete(
+            prompt,
+            "regenerated",
+            lambda content: apply_italian_sentence_reply(verb_package, content),
+            check_sentence,
+            response_format=SENTENCE_RESPONSE_FORMAT,
+            max_tokens=SENTENCE_MAX_TOKENS,
+        )
+        if check_sentence(verb_package) is None:
+            count("validation.regenerated")
+            break
+    else:
+        count("validation.unresolved")
+    settle_italian_sentence(prompt, verb_package, attempts)
+    return verb_package
+
+
 @retry(
     wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
     stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
 )
-def create_flashcard_extra(verb_package: VerbPackage) -> VerbPackage:
+async def regenerate_italian_sentence_async(verb_package: VerbPackage) -> VerbPackage:
     """
-    Creates text for an extra field in the Anki note.
-    Calls AWS to get a translation.
+    Async variant of `regenerate_italian_sentence`.
 
     Args:
-        verb_package (VerbPackage): The VerbPackage used to create a sentence.
+        verb_package (VerbPackage): The VerbPackage whose sentence failed.
+
+    Returns:
+        VerbPackage: The VerbPackage with a new sentence, or the last one
+        requested if none passes within REGENERATE_ATTEMPTS.
+    """
+    prompt = build_italian_sentence_prompt(verb_package)
+    cached = from_sentence_cache(prompt, parse_settled_sentence_reply)
+    if cached is not None:
+        sentence, attempts = cached
+        apply_italian_sentence(verb_package, sentence)
+        if attempts is not None:
+            count("validation.settled")
+            return verb_package
+        if await asyncio.to_thread(check_sentence, verb_package) is None:
+            return verb_package
+
+    attempts = 0
+    while attempts < REGENERATE_ATTEMPTS:
+        attempts += 1
+        print(f"Regenerating sentence for {verb_package.verb_conjugated}")
+        await complete_async(
+            prompt,
+            "regenerated",
+            lambda content: apply_italian_sentence_reply(verb_package, content),
+            check_sentence,
+            response_format=SENTENCE_RESPONSE_FORMAT,
+            max_tokens=SENTENCE_MAX_TOKENS,
+        )
+        if await asyncio.to_thread(check_sentence, verb_package) is None:
+            count("validation.regenerated")
+            break
+    else:
+        count("validation.unresolved")
+    settle_italian_sentence(prompt, verb_package, attempts)
+    return verb_package
+
+
+@traced("validate")
+def validate_italian_sentences(verb_packages: List[VerbPackage]) -> List[VerbPackage]:
+    """
+    Check every generated sentence and regenerate only the ones that fail,
+    so a bad card is caught before it ships.
+
+    Args:
+        verb_packages (List[VerbPackage]): The VerbPackages with sentences added.
 
     Returns:
-        str: The extra content
+        List[VerbPackage]: The same VerbPackages, with failed sentences replaced.
     """
+    for verb_package in verb_packages:
+        reason = check_sentence(verb_package)
+        count(f"validation.{'passed' if reason is None else 'failed.' + reason}")
+        if reason is not None:
+            regenerate_italian_sentence(verb_package)
+    return verb_packages
 
-    print(f"Requesting translation of sentence for {verb_package.verb_conjugated}")
 
-    client = boto3.client("translate")
+@traced("validate")
+async def validate_italian_sentences_async(
+    verb_packages: List[VerbPackage],
+) -> List[VerbPackage]:
+    """
+    Async variant of `validate_italian_sentences`. The checks, which may
+    parse the sentences with spaCy, run in the default executor.
+
+    Args:
+        verb_packages (List[VerbPackage]): The VerbPackages with sentences added.
+
+    Returns:
+        List[VerbPackage]: The same VerbPackages, with failed sentences replaced.
+    """
+    failed = []
+    for verb_package in verb_packages:
+        reason = await asyncio.to_thread(check_sentence, verb_package)
+        count(f"validation.{'passed' if reason is None else 'failed.' + reason}")
+        if reason is not None:
+            failed.append(verb_package)
+    await asyncio.gather(
+        *(regenerate_italian_sentence_async(verb_package) for verb_package in failed)
+    )
+    return verb_packages
 
+
+def build_italian_sentences_prompt(verb_packages: List[VerbPackage]) -> str:
+    """
+    Build one prompt asking for a sentence for each person of a verb and
+    tense, so the shared instructions are only sent once.
+
+    Args:
+        verb_packages (List[VerbPackage]): Packages sharing a verb and tense.
+
+    Returns:
+        str: The prompt.
+    """
+    verb = verb_packages[0].verb
+    tense = verb_packages[0].tense
+    forms = "\n".join(
+        f"        - {verb_package.person}: {{{{c1::{verb_package.verb_conjugated}}}}} "
+        f"{get_subject_statement(verb_package)}"
+        for verb_package in verb_packages
+    )
+    return f"""
+        Create one sentence for each of these forms of {verb} in the {tense}:
+
+{forms}
+
+        In each sentence, wrap the verb with cloze deletion syntax from Anki in a single
+        cloze deletion, exactly as shown above. Only include Italian in the sentences.
+
+        {"Do not combine the verb with a different past participle." if verb in ("avere", "essere", "stare") else ""}
+
+        Include all pronouns, do not skip them.
+
+        Respond with a JSON object like this, with one entry per form:
+        {{"sentences": [{{"person": "1st person singular", "sentence": "..."}}]}}
+    """
+
+
+def apply_italian_sentences(
+    verb_packages: List[VerbPackage], content: str
+) -> List[VerbPackage]:
+    """
+    Fan the sentences from a `build_italian_sentences_prompt` reply back out
+    to their VerbPackages.
+
+    Args:
+        verb_packages (List[VerbPackage]): Packages sharing a verb and tense.
+        content (str): The JSON reply.
+
+    Raises:
+        ValueError: If the reply is missing a person, so the request is retried.
+
+    Returns:
+        List[VerbPackage]: The VerbPackages with sentence and cloze added.
+    """
+    entries = parse_json_reply(content)["sentences"]
+    if not isinstance(entries, list):
+        raise TypeError(f"Expected a list of sentences, got {entries!r}")
+    sentences = {
+        reply_string(entry, "person"): reply_string(entry, "sentence")
+        for entry in entries
+    }
+    for verb_package in verb_packages:
+        if verb_package.person not in sentences:
+            raise ValueError(f"No sentence for {verb_package.person} in {content}")
+    for verb_package in verb_packages:
+        apply_italian_sentence(verb_package, sentences[verb_package.person])
+    return verb_packages
+
+
+@traced("sentence")
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+def create_italian_sentences(verb_packages: List[VerbPackage]) -> List[VerbPackage]:
+    """
+    Creates sentences in Italian for every person of one verb and tense in a
+    single request.
+
+    Args:
+        verb_packages (List[VerbPackage]): Packages sharing a verb and tense.
+
+    Returns:
+        List[VerbPackage]: The VerbPackages with sentence and cloze added.
+    """
+    prompt = build_italian_sentences_prompt(verb_packages)
+    cached = from_sentence_cache(
+        prompt, lambda content: apply_italian_sentences(verb_packages, content)
+    )
+    if cached is not None:
+        return cached
+
+    print(
+        f"Requesting from OpenAI sentences for {verb_packages[0].verb} {verb_packages[0].tense}"
+    )
+    return complete(
+        prompt,
+        "sentences",
+        lambda content: apply_italian_sentences(verb_packages, content),
+        check_sentences,
+        response_format=SENTENCES_RESPONSE_FORMAT,
+        max_tokens=SENTENCES_MAX_TOKENS,
+    )
+
+
+@traced("sentence")
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+async def create_italian_sentences_async(
+    verb_packages: List[VerbPackage],
+) -> List[VerbPackage]:
+    """
+    Async variant of `create_italian_sentences`.
+
+    Args:
+        verb_packages (List[VerbPackage]): Packages sharing a verb and tense.
+
+    Returns:
+        List[VerbPackage]: The VerbPackages with sentence and cloze added.
+    """
+    prompt = build_italian_sentences_prompt(verb_packages)
+    cached = from_sentence_cache(
+        prompt, lambda content: apply_italian_sentences(verb_packages, content)
+    )
+    if cached is not None:
+        return cached
+
+    print(
+        f"Requesting from OpenAI sentences for {verb_packages[0].verb} {verb_packages[0].tense}"
+    )
+    return await complete_async(
+        prompt,
+        "sentences",
+        lambda content: apply_italian_sentences(verb_packages, content),
+        check_sentences,
+        response_format=SENTENCES_RESPONSE_FORMAT,
+        max_tokens=SENTENCES_MAX_TOKENS,
+    )
+
+
+def clean_sentence(sentence: str) -> str:
+    """
+    Strip Anki cloze syntax from a sentence so it can be translated.
+
+    Args:
+        sentence (str): The sentence with cloze deletions.
+
+    Returns:
+        str: The plain sentence.
+    """
     # Remove Anki cloze deletion syntax
-    cleaned_sentence = re.sub(r"{{c\d+::|}}", "", verb_package.sentence)
+    cleaned_sentence = re.sub(r"{{c\d+::|}}", "", sentence)
     # Remove any double spaces
     cleaned_sentence = re.sub(r"\s{2,}", " ", cleaned_sentence)
+    return cleaned_sentence
+
+
+async def translate_many_async(sentences: List[str]) -> List[str]:
+    """
+    Async variant of `translate_many`.
+
+    Args:
+        sentences (List[str]): The Italian sentences, without cloze syntax.
+
+    Returns:
+        List[str]: The English translations, in the same order.
+    """
+    return await asyncio.to_thread(translate_many, sentences)
 
-    translation = client.translate_text(
-        Text=cleaned_sentence, SourceLanguageCode="it", TargetLanguageCode="en"
-    )["TranslatedText"]
 
+def format_flashcard_extra(
+    verb_package: VerbPackage, translation: str, conjugation: Forms
+) -> VerbPackage:
+    """
+    Build the extra field from the translation and conjugation table.
+
+    Args:
+        verb_package (VerbPackage): The VerbPackage used to create a sentence.
+        translation (str): The English translation of the sentence.
+        conjugation (Forms): The form for each person of the verb and tense.
+
+    Returns:
+        VerbPackage: The VerbPackage with the extra field added.
+    """
     final_output = f"""
             <p><strong>Traduzione in inglese:</strong> {translation}</p>
-            {get_conjugation_from_disk(verb_package)}
+            {render_conjugation(verb_package, conjugation)}
             {get_wikipedia_link_for_subject(verb_package)}
         """
     verb_package.flashcard_extra = final_output
     return verb_package
 
 
-def create_flashcard_pair(verb_package: VerbPackage) -> VerbPackage:
+def group_forms(
+    verb_packages: List[VerbPackage],
+) -> Dict[Tuple[str, str], Dict[str, str]]:
     """
-    Returns a finalized from a VerbPackage containing the cloze and extra,
-    ready for conversion into an Anki note.
+    Collect the conjugated forms of some VerbPackages by verb and tense, so
+    each conjugation table can be assembled from them.
 
     Args:
-        verb_package (VerbPackage): The VerbPackage being used to generate the note
+        verb_packages (List[VerbPackage]): VerbPackages with conjugated forms added.
 
     Returns:
-        FlashCardPair: The content ready for conversion into a Note.
+        Dict[Tuple[str, str], Dict[str, str]]: (verb, tense) -> person -> form.
     """
-    verb_package = get_conjugated(verb_package)
-    verb_package = create_italian_sentence(verb_package)
-    verb_package = create_flashcard_extra(verb_package)
-    return verb_package
+    forms: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for verb_package in verb_packages:
+        forms.setdefault((verb_package.verb, verb_package.tense), {})[
+            verb_package.person
+        ] = verb_package.verb_conjugated
+    return forms
+
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+def create_flashcard_extras(verb_packages: List[VerbPackage]) -> List[VerbPackage]:
+    """
+    Creates the extra field of several Anki notes. Their sentences are
+    translated by AWS in a single request.
+
+    Args:
+        verb_packages (List[VerbPackage]): The VerbPackages used to create sentences.
+
+    Returns:
+        List[VerbPackage]: The VerbPackages with the extra field added.
+    """
+    print(f"Requesting translation of {len(verb_packages)} sentences")
+
+    translations = translate_many(
+        [clean_sentence(verb_package.sentence) for verb_package in verb_packages]
+    )
+    forms = group_forms(verb_packages)
+    return [
+        format_flashcard_extra(
+            verb_package,
+            translation,
+            get_conjugation_from_disk(
+                verb_package, forms[(verb_package.verb, verb_package.tense)]
+            ),
+        )
+        for verb_package, translation in zip(verb_packages, translations)
+    ]
+
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+async def create_flashcard_extras_async(
+    verb_packages: List[VerbPackage],
+) -> List[VerbPackage]:
+    """
+    Async variant of `create_flashcard_extras`.
+
+    Args:
+        verb_packages (List[VerbPackage]): The VerbPackages used to create sentences.
+
+    Returns:
+        List[VerbPackage]: The VerbPackages with the extra field added.
+    """
+    print(f"Requesting translation of {len(verb_packages)} sentences")
+
+    forms = group_forms(verb_packages)
+    translations, conjugations = await asyncio.gather(
+        translate_many_async(
+            [clean_sentence(verb_package.sentence) for verb_package in verb_packages]
+        ),
+        asyncio.gather(
+            *(
+                get_conjugation_from_disk_async(
+                    verb_package, forms[(verb_package.verb, verb_package.tense)]
+                )
+                for verb_package in verb_packages
+            )
+        ),
+    )
+    return [
+        format_flashcard_extra(verb_package, translation, conjugation)
+        for verb_package, translation, conjugation in zip(
+            verb_packages, translations, conjugations
+        )
+    ]
+
+
+@traced("card_group")
+def create_flashcard_group(verb_packages: List[VerbPackage]) -> List[VerbPackage]:
+    """
+    Returns the finalized VerbPackages, with cloze and extra, for all the
+    persons of one verb and tense, whose sentences are requested together.
+
+    Args:
+        verb_packages (List[VerbPackage]): Packages sharing a verb and tense.
+
+    Returns:
+        List[VerbPackage]: The content ready for conversion into Notes.
+    """
+    verb_packages = [get_conjugated(verb_package) for verb_package in verb_packages]
+    verb_packages = create_italian_sentences(verb_packages)
+    verb_packages = validate_italian_sentences(verb_packages)
+    return create_flashcard_extras(verb_packages)
+
+
+@traced("card_group")
+async def create_flashcard_group_async(
+    verb_packages: List[VerbPackage],
+) -> List[VerbPackage]:
+    """
+    Async variant of `create_flashcard_group`.
+
+    Args:
+        verb_packages (List[VerbPackage]): Packages sharing a verb and tense.
+
+    Returns:
+        List[VerbPackage]: The content ready for conversion into Notes.
+    """
+    verb_packages = list(
+        await asyncio.gather(
+            *(get_conjugated_async(verb_package) for verb_package in verb_packages)
+        )
+    )
+    verb_packages = await create_italian_sentences_async(verb_packages)
+    verb_packages = await validate_italian_sentences_async(verb_packages)
+    return await create_flashcard_extras_async(verb_packages)
 
 
 if __name__ == "__main__":
@@ -2,28 +2,31 @@
 Module to take genai-created content and package it into Anki material.
 """
 
-from random import shuffle, choice
-import time
-from typing import List
-from concurrent.futures import ThreadPoolExecutor
-from genanki import Model, Note, Deck, Package
-from create_content import create_flashcard_pair
-from constants import (
-    key_verbs,
-    irregular_verbs,
-    regular_verbs,
-    basic_tenses,
-    advanced_tenses,
-    all_persons,
-    subjects,
-)
-from data_types import NoteList, VerbPackage, VerbPackageList
+import asyncio
+import hashlib
+from itertools import chain, groupby
+from random import shuffle
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from genanki import Model, Note, Deck, Package, guid_for
+from create_content import create_flashcard_group, create_flashcard_group_async
+import constants
+from checkpoint import CardKey, Checkpoint, card_key
+from data_types import ManifestEntry, NoteList, VerbPackage, VerbPackageList
+from manifest import Manifest, is_current, new_entry
+from tracing import traced
 
 
 OUTPUT_FILENAME = "output.apkg"
 
 MAX_WORKERS = 20
 
+# Verb/tense groups in flight at once in the asyncio pipeline
+MAX_CONCURRENCY = 100
+
+# Verb/tense groups in flight at once in the thread pool pipeline
+STREAM_WINDOW = MAX_WORKERS * 2
+
 CSS = """.card {
  font-family: arial;
  font-size: 20px;
@@ -60,12 +63,14 @@ MY_CLOZE_MODEL = Model(
 )
 
 
-def create_note(verb_package: VerbPackage) -> Note:
+@traced("note")
+def create_note(verb_package: VerbPackage, deck_name: str) -> Note:
     """
     Create an Anki note from a VerbPackage. Assumes we're creating cloze deletions.
 
     Args:
         verb_package (VerbPackage): The VerbPackage to convert to a note.
+        deck_name (str): The name of the deck the note goes in.
 
     Returns:
         Note: The Anki note.
@@ -73,71 +78,542 @@ def create_note(verb_package: VerbPackage) -> Note:
     my_note = Note(
         model=MY_CLOZE_MODEL,
         fields=[verb_package.flashcard_cloze, verb_package.flashcard_extra],
+        # Keyed on the deck and card rather than its content, so a rebuilt
+        # card updates the one already imported instead of duplicating it,
+        # and a verb in two decks gives each deck its own note
+        guid=guid_for(
+            deck_name, verb_package.verb, verb_package.tense, verb_package.person
+        ),
     )
     return my_note
 
 
+def deck_id(name: str) -> int:
+    """
+    A deck id derived from the deck's name, so every build of a deck is
+    imported into the same Anki deck.
+
+    Args:
+        name (str): The deck name.
+
+    Returns:
+        int: The deck id, in the range genanki recommends.
+    """
+    digest = hashlib.sha256(name.encode("utf-8")).digest()
+    return (1 << 30) + int.from_bytes(digest[:8], "big") % (1 << 30)
+
+
+@traced("package_write")
 def write_deck(note_list: NoteList) -> None:
     """
-    From a NoteList, write to disk an Anki deck package file.
+    From a NoteList, write to disk an Anki deck package file. genanki builds
+    the package from a whole Deck, so the deck's notes are all in memory here.
 
     Args:
-        notes (List[Note]): The list of notes
+        note_list (NoteList): The deck's name and notes.
     """
-    my_deck = Deck(int(time.time()), note_list.name)
+    my_deck = Deck(deck_id(note_list.name), note_list.name)
     for note in note_list.notes:
         my_deck.add_note(note)
     Package(my_deck).write_to_file(note_list.name + ".apkg")
 
 
-def build_note_list(verb_package_list: VerbPackageList) -> NoteList:
+def iter_verb_package_groups(
+    verb_packages: Iterable[VerbPackage],
+) -> Iterator[List[VerbPackage]]:
+    """
+    Lazily group consecutive verb packages sharing a verb and tense, which is
+    how `iter_verb_packages` produces them.
+
+    Args:
+        verb_packages (Iterable[VerbPackage]): The verb packages.
+
+    Returns:
+        Iterator[List[VerbPackage]]: The groups.
+    """
+    for _, verb_package_group in groupby(
+        verb_packages, key=lambda verb_package: (verb_package.verb, verb_package.tense)
+    ):
+        yield list(verb_package_group)
+
+
+def _load_completed(
+    name: str, resume: bool, incremental: bool
+) -> Tuple[Checkpoint, Dict[CardKey, ManifestEntry], Dict[CardKey, ManifestEntry]]:
+    """
+    Open a deck's checkpoint and gather the cards that may not need to be
+    generated again: those journaled by an interrupted run when resuming,
+    and those in the last build's manifest when building incrementally.
+
+    Args:
+        name (str): The deck name.
+        resume (bool): Reuse the journal of an earlier run rather than starting afresh.
+        incremental (bool): Reuse the cards of the last build that are still current.
+
+    Returns:
+        Tuple[Checkpoint, Dict[CardKey, ManifestEntry], Dict[CardKey, ManifestEntry]]:
+        The checkpoint, the journaled cards and the last build's cards.
+    """
+    checkpoint = Checkpoint(name)
+    if not resume:
+        checkpoint.clear()
+    completed = checkpoint.load()
+    if completed:
+        print(f"Resuming {name}: {len(completed)} cards already done")
+    built: Dict[CardKey, ManifestEntry] = {}
+    if incremental:
+        built = Manifest(name).load()
+        print(f"Updating {name}: {len(built)} cards in the last build")
+    return checkpoint, completed, built
+
+
+def _reuse(
+    verb_package: VerbPackage,
+    completed: Dict[CardKey, ManifestEntry],
+    built: Dict[CardKey, ManifestEntry],
+) -> Optional[VerbPackage]:
+    """
+    The finished card to use for a verb package, if it needn't be generated:
+    one journaled by an interrupted run, or one from the last build, whose
+    model and prompt are unchanged.
+
+    Args:
+        verb_package (VerbPackage): The card as this build would create it.
+        completed (Dict[CardKey, ManifestEntry]): The journaled cards.
+        built (Dict[CardKey, ManifestEntry]): The last build's cards.
+
+    Returns:
+        Optional[VerbPackage]: The finished card, or None to generate it.
+    """
+    key = card_key(verb_package)
+    for entries in (completed, built):
+        entry = entries.get(key)
+        if entry is not None and is_current(entry, verb_package):
+            return entry.verb_package
+    return None
+
+
+class DeckRun:
+    """
+    The state of one deck while its groups are in flight: its journal and
+    manifest, the cards that needn't be generated again, and its progress.
+    """
+
+    def __init__(
+        self,
+        verb_package_list: VerbPackageList,
+        resume: bool,
+        incremental: bool = False,
+    ) -> None:
+        self.name = verb_package_list.name
+        self.verb_packages = verb_package_list.verb_packages
+        self.checkpoint, self.completed, self.built = _load_completed(
+            self.name, resume, incremental
+        )
+        self.manifest = Manifest(self.name)
+        self.manifest.begin()
+        self.submitted = 0
+        self.finished = 0
+        self.cards = 0
+        self.exhausted = False
+
+    def iter_groups(self) -> Iterator[Tuple["DeckRun", List[VerbPackage]]]:
+        """
+        Lazily produce this deck's verb/tense groups, tagged with the deck.
+
+        Returns:
+            Iterator[Tuple[DeckRun, List[VerbPackage]]]: The tagged groups.
+        """
+        for verb_packages in iter_verb_package_groups(self.verb_packages):
+            self.submitted += 1
+            yield self, verb_packages
+        self.exhausted = True
+        if self.done:
+            self._commit()
+
+    def reuse_group(
+        self, verb_packages: List[VerbPackage]
+    ) -> Optional[List[VerbPackage]]:
+        """
+        The finished cards of a verb/tense group, if none of them needs to be
+        generated. A group with any card missing or stale is generated whole,
+        so its prompt, and its cached reply, are those of a full build.
+
+        Args:
+            verb_packages (List[VerbPackage]): The group as this build would create it.
+
+        Returns:
+            Optional[List[VerbPackage]]: The finished cards, or None to generate the group.
+        """
+        finished = []
+        for verb_package in verb_packages:
+            reused = _reuse(verb_package, self.completed, self.built)
+            if reused is None:
+                return None
+            finished.append(reused)
+        return finished
+
+    def journal(self, verb_packages: List[VerbPackage]) -> None:
+        """
+        Journal a newly generated group, so a failed run can resume from it.
+
+        Args:
+            verb_packages (List[VerbPackage]): The generated group.
+        """
+        self.checkpoint.record(
+            new_entry(verb_package) for verb_package in verb_packages
+        )
+
+    def finish(self, verb_packages: List[VerbPackage]) -> None:
+        """
+        Count a finished group and add it to the manifest, which is committed
+        once the deck is done.
+
+        Args:
+            verb_packages (List[VerbPackage]): The finished group.
+        """
+        self.finished += 1
+        self.cards += len(verb_packages)
+        self.manifest.record(verb_packages)
+        print(f"{self.name}: {self.cards} cards done")
+        if self.done:
+            self._commit()
+
+    def _commit(self) -> None:
+        """
+        Commit the manifest of the finished deck. Its journal is no longer
+        needed: the manifest now holds every card.
+        """
+        self.manifest.commit()
+        self.checkpoint.clear()
+
+    def abandon(self) -> None:
+        """
+        Drop the manifest being written if the deck didn't finish, so a failed
+        build leaves the last one in place and no temporary file behind.
+        """
+        if not self.done:
+            self.manifest.discard()
+
+    @property
+    def done(self) -> bool:
+        """
+        Whether every group of the deck has been produced and finished.
+        """
+        return self.exhausted and self.finished == self.submitted
+
+
+def _run_groups(
+    groups: Iterable[Tuple[DeckRun, List[VerbPackage]]],
+    window: int = STREAM_WINDOW,
+    max_workers: int = MAX_WORKERS,
+) -> Iterator[Tuple[DeckRun, List[VerbPackage]]]:
     """
-    From a list of verb packages, build a list of notes.
+    Create the flashcards for verb/tense groups on one thread pool, pulling
+    the groups lazily with at most `window` in flight, and yield each as it
+    finishes. Groups journaled by an earlier run are yielded straight away.
+    Each finished group is journaled; if any fail, the rest still run and
+    the first error is raised at the end.
+
+    Args:
+        groups (Iterable[Tuple[DeckRun, List[VerbPackage]]]): The groups, tagged with their deck.
+        window (int, optional): Groups in flight at once. Defaults to STREAM_WINDOW.
+        max_workers (int, optional): Threads in the pool. Defaults to MAX_WORKERS.
+
+    Returns:
+        Iterator[Tuple[DeckRun, List[VerbPackage]]]: The finished groups.
+    """
+    error: Optional[BaseException] = None
+    deck_runs: Dict["Future[List[VerbPackage]]", DeckRun] = {}
+
+    def finish(
+        deck_run: DeckRun, verb_packages: List[VerbPackage]
+    ) -> Tuple[DeckRun, List[VerbPackage]]:
+        deck_run.finish(verb_packages)
+        return deck_run, verb_packages
+
+    def collect(
+        done: Set["Future[List[VerbPackage]]"],
+    ) -> Iterator[Tuple[DeckRun, List[VerbPackage]]]:
+        nonlocal error
+        for future in done:
+            deck_run = deck_runs.pop(future)
+            # Keep journaling the groups that succeed even after one fails
+            try:
+                verb_packages = future.result()
+            except Exception as exception:
+                error = error or exception
+                continue
+            deck_run.journal(verb_packages)
+            yield finish(deck_run, verb_packages)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for deck_run, verb_packages in groups:
+            finished = deck_run.reuse_group(verb_packages)
+            if finished is not None:
+                yield finish(deck_run, finished)
+                continue
+
+            future = executor.submit(create_flashcard_group, verb_packages)
+            deck_runs[future] = deck_run
+            if len(deck_runs) >= window:
+                done, _ = wait(deck_runs, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+
+        while deck_runs:
+            done, _ = wait(deck_runs, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+    if error is not None:
+        raise error
+
+
+def iter_note_lists(
+    verb_package_lists: List[VerbPackageList],
+    resume: bool = False,
+    window: int = STREAM_WINDOW,
+    max_workers: int = MAX_WORKERS,
+    incremental: bool = False,
+) -> Iterator[NoteList]:
+    """
+    Build several decks through one shared thread pool, so the pool stays
+    busy across deck boundaries: the next deck's groups are submitted while
+    the last ones of the previous deck are still in flight. Each deck's
+    NoteList is yielded as soon as all of its cards are finished.
+
+    Memory is bounded in the verb packages, which are produced lazily with
+    at most `window` groups in flight and dropped once they are notes, but
+    not in the notes: a deck's notes are held until it finishes, so they can
+    be shuffled as a whole and handed to genanki, which writes a package
+    from a whole Deck.
+
+    Args:
+        verb_package_lists (List[VerbPackageList]): The decks to build.
+        resume (bool, optional): Skip cards finished by an earlier run. Defaults to False.
+        window (int, optional): Groups in flight at once, across all decks. Defaults to STREAM_WINDOW.
+        max_workers (int, optional): Threads shared by all decks. Defaults to MAX_WORKERS.
+        incremental (bool, optional): Only generate cards missing from the last build. Defaults to False.
+
+    Returns:
+        Iterator[NoteList]: The note lists, in order of completion.
+    """
+    deck_runs = [
+        DeckRun(verb_package_list, resume, incremental)
+        for verb_package_list in verb_package_lists
+    ]
+    notes: Dict[str, List[Note]] = {deck_run.name: [] for deck_run in deck_runs}
+    groups = chain.from_iterable(deck_run.iter_groups() for deck_run in deck_runs)
+
+    def finished_note_lists() -> Iterator[NoteList]:
+        for deck_run in deck_runs:
+            if deck_run.done and deck_run.name in notes:
+                deck_notes = notes.pop(deck_run.name)
+                shuffle(deck_notes)
+                print(f"{deck_run.name}: finished, {deck_run.cards} cards")
+                yield NoteList(name=deck_run.name, notes=deck_notes)
+
+    try:
+        for deck_run, verb_packages in _run_groups(groups, window, max_workers):
+            notes[deck_run.name].extend(
+                create_note(verb_package, deck_run.name)
+                for verb_package in verb_packages
+            )
+            yield from finished_note_lists()
+    except BaseException:
+        for deck_run in deck_runs:
+            deck_run.abandon()
+        raise
+    yield from finished_note_lists()
+
+
+def build_note_list(
+    verb_package_list: VerbPackageList,
+    resume: bool = False,
+    incremental: bool = False,
+) -> NoteList:
+    """
+    From a list of verb packages, build a list of notes. Each group of
+    finished packages is journaled as soon as it completes, so a failed
+    run can be resumed without redoing them.
+
+    Args:
+        verb_package_list (VerbPackageList): The verb packages.
+        resume (bool, optional): Skip cards finished by an earlier run. Defaults to False.
+        incremental (bool, optional): Only generate cards missing from the last build. Defaults to False.
+
+    Returns:
+        NoteList: The note list.
+    """
+    return next(
+        iter_note_lists([verb_package_list], resume=resume, incremental=incremental)
+    )
+
+
+async def build_note_list_async(
+    verb_package_list: VerbPackageList,
+    max_concurrency: int = MAX_CONCURRENCY,
+    resume: bool = False,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    incremental: bool = False,
+) -> NoteList:
+    """
+    Async variant of `build_note_list`. All cards run on one event loop, with
+    at most `max_concurrency` verb/tense groups in flight. If one group fails,
+    the others are cancelled and the error is raised; the groups finished by
+    then are journaled.
 
     Args:
         verb_package_list (VerbPackageList): The verb packages.
+        max_concurrency (int, optional): Groups in flight at once. Defaults to MAX_CONCURRENCY.
+        resume (bool, optional): Skip cards finished by an earlier run. Defaults to False.
+        semaphore (Optional[asyncio.Semaphore], optional): A semaphore shared with
+            other decks, used instead of one sized by `max_concurrency`.
+        incremental (bool, optional): Only generate cards missing from the last build. Defaults to False.
 
     Returns:
         NoteList: The note list.
     """
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        final_verb_packages = list(
-            executor.map(create_flashcard_pair, verb_package_list.verb_packages)
+    deck_run = DeckRun(verb_package_list, resume, incremental)
+    bound = semaphore or asyncio.Semaphore(max_concurrency)
+    notes: List[Note] = []
+
+    def finish(verb_packages: List[VerbPackage]) -> None:
+        deck_run.finish(verb_packages)
+        notes.extend(
+            create_note(verb_package, deck_run.name) for verb_package in verb_packages
         )
 
-    notes = []
-    for final_verb_package in final_verb_packages:
-        notes.append(create_note(final_verb_package))
+    async def create_bounded(verb_packages: List[VerbPackage]) -> None:
+        async with bound:
+            verb_packages = await create_flashcard_group_async(verb_packages)
+        deck_run.journal(verb_packages)
+        finish(verb_packages)
+
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            for _, verb_packages in deck_run.iter_groups():
+                finished = deck_run.reuse_group(verb_packages)
+                if finished is not None:
+                    finish(finished)
+                else:
+                    task_group.create_task(create_bounded(verb_packages))
+    except BaseException:
+        deck_run.abandon()
+        raise
 
     shuffle(notes)
-    return NoteList(name=verb_package_list.name, notes=notes)
+    print(f"{deck_run.name}: finished, {len(notes)} cards")
+    return NoteList(name=deck_run.name, notes=notes)
 
 
-def build_verb_package_list(
-    name,
-    verbs: List[str] = key_verbs,
-    tenses: List[str] = basic_tenses,
-    persons: List[str] = all_persons,
-    subjects: List[str] = subjects,
-) -> VerbPackageList:
+async def write_decks_async(
+    verb_package_lists: List[VerbPackageList],
+    max_concurrency: int = MAX_CONCURRENCY,
+    resume: bool = False,
+    incremental: bool = False,
+) -> None:
     """
-    Build a list of VerbPackage objects given the requested collection of verbs and tenses.
+    Build several decks on one event loop, with at most `max_concurrency`
+    verb/tense groups in flight across all of them, and write each deck's
+    package as soon as its cards are finished.
 
     Args:
-        verbs (List[str], optional): The verb set to use. Defaults to key_verbs.
-        tenses (List[str], optional): The tenses to use. Defaults to basic_tenses.
-        persons (List[str], optional): The persons to use. Defaults to persons.
+        verb_package_lists (List[VerbPackageList]): The decks to build.
+        max_concurrency (int, optional): Groups in flight at once, across all decks. Defaults to MAX_CONCURRENCY.
+        resume (bool, optional): Skip cards finished by an earlier run. Defaults to False.
+        incremental (bool, optional): Only generate cards missing from the last build. Defaults to False.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def build_and_write(verb_package_list: VerbPackageList) -> None:
+        note_list = await build_note_list_async(
+            verb_package_list,
+            resume=resume,
+            semaphore=semaphore,
+            incremental=incremental,
+        )
+        # Off the event loop, so the other decks' groups keep running
+        await asyncio.to_thread(write_deck, note_list)
+
+    async with asyncio.TaskGroup() as task_group:
+        for verb_package_list in verb_package_lists:
+            task_group.create_task(build_and_write(verb_package_list))
+
+
+def choose_subject(verb: str, tense: str, person: str, subjects: List[str]) -> str:
+    """
+    Pick the subject for a card. The pick is a hash of the card rather than a
+    random choice, so the card's prompt (and its cached sentence) stays the
+    same from one build to the next.
+
+    Args:
+        verb (str): The verb.
+        tense (str): The tense.
+        person (str): The person.
+        subjects (List[str]): The subjects to choose from.
 
     Returns:
-        List[VerbPackage]: VerbPackage objects for which we will make Anki notes.
+        str: The subject.
+    """
+    digest = hashlib.sha256(f"{verb}|{tense}|{person}".encode("utf-8")).digest()
+    return subjects[int.from_bytes(digest[:8], "big") % len(subjects)]
+
+
+def iter_verb_packages(
+    verbs: Optional[List[str]] = None,
+    tenses: Optional[List[str]] = None,
+    persons: Optional[List[str]] = None,
+    subjects: Optional[List[str]] = None,
+) -> Iterator[VerbPackage]:
     """
-    verb_packages = []
+    Lazily produce a VerbPackage for each combination of verb, tense and person.
+
+    Args:
+        verbs (Optional[List[str]], optional): The verb set to use. Defaults to key_verbs.
+        tenses (Optional[List[str]], optional): The tenses to use. Defaults to basic_tenses.
+        persons (Optional[List[str]], optional): The persons to use. Defaults to all_persons.
+        subjects (Optional[List[str]], optional): The subjects to use. Defaults to subjects.
+
+    Returns:
+        Iterator[VerbPackage]: VerbPackage objects for which we will make Anki notes.
+    """
+    verbs = constants.key_verbs if verbs is None else verbs
+    tenses = constants.basic_tenses if tenses is None else tenses
+    persons = constants.all_persons if persons is None else persons
+    subjects = constants.subjects if subjects is None else subjects
     for verb in verbs:
         for tense in tenses:
             for person in persons:
-                verb_package = VerbPackage(
-                    verb=verb, tense=tense, person=person, subject=choice(subjects)
+                yield VerbPackage(
+                    verb=verb,
+                    tense=tense,
+                    person=person,
+                    subject=choose_subject(verb, tense, person, subjects),
                 )
-                verb_packages.append(verb_package)
 
-    return VerbPackageList(name=name, verb_packages=verb_packages)
+
+def build_verb_package_list(
+    name,
+    verbs: Optional[List[str]] = None,
+    tenses: Optional[List[str]] = None,
+    persons: Optional[List[str]] = None,
+    subjects: Optional[List[str]] = None,
+    lazy: bool = False,
+) -> VerbPackageList:
+    """
+    Build a list of VerbPackage objects given the requested collection of verbs and tenses.
+
+    Args:
+        verbs (Optional[List[str]], optional): The verb set to use. Defaults to key_verbs.
+        tenses (Optional[List[str]], optional): The tenses to use. Defaults to basic_tenses.
+        persons (Optional[List[str]], optional): The persons to use. Defaults to all_persons.
+        subjects (Optional[List[str]], optional): The subjects to use. Defaults to subjects.
+        lazy (bool, optional): Produce the packages with a generator instead. Defaults to False.
+
+    Returns:
+        List[VerbPackage]: VerbPackage objects for which we will make Anki notes.
+    """
+    verb_packages = iter_verb_packages(verbs, tenses, persons, subjects)
+    return VerbPackageList(
+        name=name, verb_packages=verb_packages if lazy else list(verb_packages)
+    )
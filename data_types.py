@@ -1,8 +1,9 @@
 from dataclasses import dataclass
-from random import choice
-from typing import List
-from genanki import Note
-from constants import subjects
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations, so loading the data types doesn't import genanki
+    from genanki import Note
 
 
 @dataclass
@@ -33,11 +34,12 @@ class VerbPackage:
 @dataclass
 class VerbPackageList:
     """
-    Encapsulates a list of VerbPackages
+    Encapsulates a list of VerbPackages. The packages may also be a
+    generator, produced lazily and consumed once.
     """
 
     name: str
-    verb_packages: List[VerbPackage]
+    verb_packages: Iterable[VerbPackage]
 
 
 @dataclass
@@ -47,4 +49,64 @@ class NoteList:
     """
 
     name: str
-    notes: List[Note]
+    notes: List["Note"]
+
+
+@dataclass
+class ManifestEntry:
+    """
+    One card of a built deck as recorded in its manifest: the finished
+    VerbPackage, a hash of the note's content, and the model and prompt
+    version it was generated with.
+    """
+
+    verb_package: VerbPackage
+    content_hash: str
+    model: str
+    prompt_version: str
+    created_at: str
+    updated_at: str
+
+
+@dataclass
+class DeckDiff:
+    """
+    The cards of a deck that must be generated to bring its last build up
+    to date with the current content lists and prompt templates.
+    """
+
+    name: str
+    added: List[Tuple[str, str, str]]
+    changed: List[Tuple[str, str, str]]
+    removed: List[Tuple[str, str, str]]
+    unchanged: int
+
+
+@dataclass
+class StagePlan:
+    """
+    The requests one stage of the card pipeline is expected to make in a
+    planned build, after consulting the caches.
+    """
+
+    name: str
+    calls: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    characters: int = 0
+    seconds: float = 0.0
+    cost: float = 0.0
+
+
+@dataclass
+class BuildPlan:
+    """
+    The projected requests, cost and wall-clock time of a build.
+    """
+
+    cards: int
+    cards_reused: int
+    stages: Dict[str, StagePlan]
+    cost: float
+    seconds: Optional[float]
@@ -0,0 +1,231 @@
+"""
+The single place we send chat completions to OpenAI from. Every request is
+paced by the shared rate limiter for its model.
+
+Call sites give each request an output budget (max_tokens), which also sets
+its timeout.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+from constants import (
+    EXPENSIVE_MODEL,
+    MIN_TOKENS_PER_SECOND,
+    REQUEST_TIMEOUT,
+    get_async_client,
+    get_client,
+)
+from rate_limiter import ESTIMATED_COMPLETION_TOKENS, estimate_tokens, get_rate_limiter
+from tracing import count, span
+
+def build_messages(prompt: str) -> List[Dict[str, str]]:
+    """
+    Wrap a prompt in the chat messages we send for every request.
+
+    Args:
+        prompt (str): The user prompt.
+
+    Returns:
+        List[Dict[str, str]]: The system and user messages.
+    """
+    return [
+        {
+            "role": "system",
+            "content": "You are an Italian teacher.",
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        },
+    ]
+
+
+def json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A response format that makes the model reply with JSON matching a schema
+    (Structured Outputs).
+
+    Args:
+        name (str): A name for the schema.
+        schema (Dict[str, Any]): The JSON schema; objects must list every
+            property as required and disallow additional properties.
+
+    Returns:
+        Dict[str, Any]: The response_format to send.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+def parse_json_reply(content: str) -> Dict[str, Any]:
+    """
+    Parse a reply requested with a JSON object response format.
+
+    Args:
+        content (str): The reply.
+
+    Raises:
+        ValueError: If the reply isn't a JSON object.
+
+    Returns:
+        Dict[str, Any]: The object.
+    """
+    reply = json.loads(content)
+    if not isinstance(reply, dict):
+        raise ValueError(f"Expected a JSON object, got {content}")
+    return reply
+
+
+def reply_string(reply: Dict[str, Any], key: str) -> str:
+    """
+    Read a string field of a parsed JSON reply.
+
+    Args:
+        reply (Dict[str, Any]): The parsed reply.
+        key (str): The field.
+
+    Raises:
+        KeyError: If the field is missing.
+        TypeError: If it isn't a string.
+
+    Returns:
+        str: The field, stripped of surrounding whitespace.
+    """
+    value = reply[key]
+    if not isinstance(value, str):
+        raise TypeError(f"Expected a string for {key}, got {value!r}")
+    return value.strip()
+
+
+def _estimate_request_tokens(
+    messages: List[Dict[str, str]], max_tokens: Optional[int]
+) -> int:
+    """
+    Estimate the tokens a request will use, prompt and completion together.
+    """
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    if max_tokens is None:
+        return prompt_tokens + ESTIMATED_COMPLETION_TOKENS
+    return prompt_tokens + min(max_tokens, ESTIMATED_COMPLETION_TOKENS)
+
+
+def _request_options(
+    response_format: Optional[Dict[str, Any]], max_tokens: Optional[int]
+) -> Dict[str, Any]:
+    """
+    The optional arguments of a request: its response format, and its output
+    budget and the timeout that follows from it.
+    """
+    options: Dict[str, Any] = {}
+    if response_format is not None:
+        options["response_format"] = response_format
+    if max_tokens is not None:
+        options["max_tokens"] = max_tokens
+        options["timeout"] = REQUEST_TIMEOUT + max_tokens / MIN_TOKENS_PER_SECOND
+    return options
+
+
+def _record_finish(finish_reason: Optional[str]) -> None:
+    """
+    Count replies cut off by their max_tokens.
+    """
+    if finish_reason == "length":
+        count("llm.truncated")
+
+
+def chat_completion(
+    prompt: str,
+    model: str = EXPENSIVE_MODEL,
+    response_format: Optional[Dict[str, Any]] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Send a prompt to the LLM and return the text of its reply.
+
+    Args:
+        prompt (str): The user prompt.
+        model (str, optional): The model to use. Defaults to EXPENSIVE_MODEL.
+        response_format (Optional[Dict[str, Any]], optional): Passed through to
+            the API, e.g. from `json_schema_format`. Defaults to None.
+        max_tokens (Optional[int], optional): The reply's output budget, which
+            also bounds the request's timeout. Defaults to None, no limit.
+
+    Returns:
+        str: The reply.
+    """
+    import openai
+
+    client = get_client()
+    messages = build_messages(prompt)
+    options = _request_options(response_format, max_tokens)
+    limiter = get_rate_limiter(model)
+    estimated = _estimate_request_tokens(messages, max_tokens)
+    with span("rate_limit_wait", model=model):
+        limiter.acquire(estimated)
+
+    try:
+        with span("llm_request", model=model):
+            raw_response = client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, **options  # type: ignore[arg-type]
+            )
+            limiter.update_from_headers(raw_response.headers)
+            response = raw_response.parse()
+            _record_finish(response.choices[0].finish_reason)
+            if response.usage is not None:
+                limiter.record_usage(estimated, response.usage.total_tokens)
+            return str(response.choices[0].message.content)
+    except openai.APIStatusError as error:
+        # 429s carry the rate limit headers too
+        count(f"llm.status.{error.status_code}")
+        limiter.update_from_headers(error.response.headers)
+        raise
+
+
+async def chat_completion_async(
+    prompt: str,
+    model: str = EXPENSIVE_MODEL,
+    response_format: Optional[Dict[str, Any]] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    Async variant of `chat_completion`.
+
+    Args:
+        prompt (str): The user prompt.
+        model (str, optional): The model to use. Defaults to EXPENSIVE_MODEL.
+        response_format (Optional[Dict[str, Any]], optional): Passed through to
+            the API, e.g. from `json_schema_format`. Defaults to None.
+        max_tokens (Optional[int], optional): The reply's output budget, which
+            also bounds the request's timeout. Defaults to None, no limit.
+
+    Returns:
+        str: The reply.
+    """
+    import openai
+
+    client = get_async_client()
+    messages = build_messages(prompt)
+    options = _request_options(response_format, max_tokens)
+    limiter = get_rate_limiter(model)
+    estimated = _estimate_request_tokens(messages, max_tokens)
+    with span("rate_limit_wait", model=model):
+        await limiter.acquire_async(estimated)
+
+    try:
+        with span("llm_request", model=model):
+            raw_response = await client.chat.completions.with_raw_response.create(
+                model=model, messages=messages, **options  # type: ignore[arg-type]
+            )
+            limiter.update_from_headers(raw_response.headers)
+            # The async client's raw response is read already; parse() is sync
+            response = raw_response.parse()
+            _record_finish(response.choices[0].finish_reason)
+            if response.usage is not None:
+                limiter.record_usage(estimated, response.usage.total_tokens)
+            return str(response.choices[0].message.content)
+    except openai.APIStatusError as error:
+        count(f"llm.status.{error.status_code}")
+        limiter.update_from_headers(error.response.headers)
+        raise
@@ -3,55 +3,303 @@ Module to execute the commands to generate flash cards and write them to
 an Anki package file.
 """
 
-from random import choice, shuffle
-from typing import List
-from constants import (
-    key_verbs,
-    irregular_verbs,
-    regular_verbs,
-    basic_tenses,
-    advanced_tenses,
-    all_persons,
-)
-from create_deck import write_deck, build_note_list, build_verb_package_list
-
-
-def go() -> None:
-    # Main execution
-    verb_package_lists_to_build = [
+from argparse import ArgumentParser
+from typing import Dict, List, Optional, Tuple
+from data_types import VerbPackageList
+
+# The modules behind each command are imported by the command itself, so
+# starting one doesn't load the dependencies of the others (genanki, openai,
+# spaCy and tiktoken among them)
+
+
+def get_verb_package_lists_to_build() -> List[VerbPackageList]:
+    """
+    The decks to build, with their packages produced lazily.
+
+    Returns:
+        List[VerbPackageList]: The decks.
+    """
+    import constants
+    from create_deck import build_verb_package_list
+
+    return [
         build_verb_package_list(
-            verbs=key_verbs, tenses=basic_tenses, name="Italian key verbs, basic tenses"
+            verbs=constants.key_verbs,
+            tenses=constants.basic_tenses,
+            name="Italian key verbs, basic tenses",
+            lazy=True,
         ),
         build_verb_package_list(
-            verbs=key_verbs,
-            tenses=advanced_tenses,
+            verbs=constants.key_verbs,
+            tenses=constants.advanced_tenses,
             name="Italian key verbs, advanced tenses",
+            lazy=True,
         ),
         build_verb_package_list(
-            verbs=regular_verbs,
-            tenses=basic_tenses,
+            verbs=constants.regular_verbs,
+            tenses=constants.basic_tenses,
             name="Italian regular verbs, basic tenses",
+            lazy=True,
         ),
         build_verb_package_list(
-            verbs=irregular_verbs,
-            tenses=basic_tenses,
+            verbs=constants.irregular_verbs,
+            tenses=constants.basic_tenses,
             name="Italian irregular verbs, basic tenses",
+            lazy=True,
         ),
         # build_verb_package_list(
-        #     verbs=regular_verbs,
-        #     tenses=advanced_tenses,
+        #     verbs=constants.regular_verbs,
+        #     tenses=constants.advanced_tenses,
         #     name="Italian regular verbs, advanced tenses",
         # ),
         # build_verb_package_list(
-        #     verbs=irregular_verbs,
-        #     tenses=advanced_tenses,
+        #     verbs=constants.irregular_verbs,
+        #     tenses=constants.advanced_tenses,
         #     name="Italian irregular verbs, tenses",
         # ),
     ]
 
-    for verb_package_list_to_build in verb_package_lists_to_build:
-        write_deck(build_note_list(verb_package_list_to_build))
+
+def diff() -> None:
+    """
+    Print, for each deck, the cards the next incremental build would have to
+    generate, by comparing the content lists and prompts with its manifest.
+    """
+    from manifest import diff_deck
+
+    for verb_package_list in get_verb_package_lists_to_build():
+        deck_diff = diff_deck(verb_package_list)
+        print(
+            f"{deck_diff.name}: "
+            f"{len(deck_diff.added) + len(deck_diff.changed)} cards to generate "
+            f"({len(deck_diff.added)} new, {len(deck_diff.changed)} changed), "
+            f"{len(deck_diff.removed)} removed, {deck_diff.unchanged} unchanged"
+        )
+        for mark, keys in (
+            ("+", deck_diff.added),
+            ("~", deck_diff.changed),
+            ("-", deck_diff.removed),
+        ):
+            # One line per verb and tense, which is how cards are generated
+            persons: Dict[Tuple[str, str], int] = {}
+            for verb, tense, _ in keys:
+                persons[(verb, tense)] = persons.get((verb, tense), 0) + 1
+            for (verb, tense), count in persons.items():
+                print(f"  {mark} {verb}, {tense} ({count} persons)")
+
+
+def migrate() -> None:
+    """
+    Rewrite the conjugation store from the HTML tables of earlier versions.
+    """
+    from conjugation_store import migrate_conjugations
+
+    migrated, skipped = migrate_conjugations()
+    print(f"Migrated {migrated} conjugation tables, skipped {skipped} that don't parse")
+
+
+def warm(trace_path: Optional[str] = None) -> None:
+    """
+    Fill the conjugation store with every table the decks could need, so a
+    build that follows finds them all on disk.
+
+    Args:
+        trace_path (Optional[str], optional): Where to write a Chrome trace. Defaults to None.
+    """
+    from warm import all_verb_tenses, warm_conjugations
+
+    failed = warm_conjugations(all_verb_tenses())
+    report(trace_path)
+    if failed:
+        raise SystemExit(f"{failed} conjugation tables couldn't be filled")
+
+
+def plan(
+    use_async: bool = False,
+    use_batch: bool = False,
+    resume: bool = False,
+    incremental: bool = False,
+) -> None:
+    """
+    Print the requests, cost and time a build with these options would take,
+    without starting it.
+    """
+    from create_deck import MAX_CONCURRENCY, MAX_WORKERS
+    from plan import plan_build
+
+    build_plan = plan_build(
+        get_verb_package_lists_to_build(),
+        concurrency=MAX_CONCURRENCY if use_async else MAX_WORKERS,
+        resume=resume,
+        incremental=incremental,
+        batch=use_batch,
+    )
+    print(
+        f"{build_plan.cards} cards, "
+        f"{build_plan.cards - build_plan.cards_reused} to generate"
+    )
+    for stage in build_plan.stages.values():
+        print(
+            f"  {stage.name}: {stage.calls} requests ({stage.cached} cached), "
+            f"{stage.prompt_tokens} prompt + {stage.completion_tokens} completion "
+            f"tokens, {stage.characters} characters, ${stage.cost:.2f}"
+        )
+    print(f"Estimated cost: ${build_plan.cost:.2f}")
+    if build_plan.seconds is None:
+        print("Estimated time: up to 24 hours (Batch API)")
+    else:
+        print(f"Estimated time: {build_plan.seconds / 60:.1f} minutes")
+
+
+def go(
+    use_async: bool = False,
+    use_batch: bool = False,
+    resume: bool = False,
+    incremental: bool = False,
+    trace_path: Optional[str] = None,
+) -> None:
+    # Main execution
+    from create_deck import iter_note_lists, write_deck
+
+    verb_package_lists_to_build = get_verb_package_lists_to_build()
+
+    if use_batch:
+        from batch import OpenAIBatchEndpoint, build_note_lists_batch
+
+        for note_list in build_note_lists_batch(
+            verb_package_lists_to_build,
+            OpenAIBatchEndpoint(),
+            incremental=incremental,
+        ):
+            write_deck(note_list)
+        report(trace_path)
+        return
+
+    # All decks share one worker budget; each is written as soon as it's done
+    if use_async:
+        import asyncio
+        from create_deck import write_decks_async
+
+        asyncio.run(
+            write_decks_async(
+                verb_package_lists_to_build, resume=resume, incremental=incremental
+            )
+        )
+    else:
+        for note_list in iter_note_lists(
+            verb_package_lists_to_build, resume=resume, incremental=incremental
+        ):
+            write_deck(note_list)
+    report(trace_path)
+
+
+def report(trace_path: Optional[str] = None) -> None:
+    """
+    Print where the build's time went, and optionally export it as a trace.
+
+    Args:
+        trace_path (Optional[str], optional): Where to write a Chrome trace. Defaults to None.
+    """
+    from cascade import escalation_rates
+    from tracing import get_tracer
+
+    tracer = get_tracer()
+    print(tracer.summary())
+    for stage, rate in sorted(escalation_rates().items()):
+        print(f"Cascade escalation rate for {stage}: {rate:.1%}")
+    if trace_path is not None:
+        tracer.write_chrome_trace(trace_path)
+        print(f"Wrote trace to {trace_path}")
 
 
 if __name__ == "__main__":
-    go()
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Build cards on an asyncio event loop instead of a thread pool.",
+    )
+    parser.add_argument(
+        "--batch",
+        dest="use_batch",
+        action="store_true",
+        help="Send all prompts through the OpenAI Batch API (slow, but cheaper).",
+    )
+    parser.add_argument(
+        "--refresh",
+        type=float,
+        default=0,
+        metavar="PERCENT",
+        help="Regenerate this share of cached sentences instead of reusing them.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip cards journaled as finished by an interrupted earlier run.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only generate cards missing from each deck's last build manifest.",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Only print which cards an incremental build would generate.",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a Chrome trace (chrome://tracing, Perfetto) of the build to PATH.",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only print the requests, cost and time the build would take.",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Only fill the conjugation store with every table the decks need.",
+    )
+    parser.add_argument(
+        "--migrate-conjugations",
+        action="store_true",
+        help="Only rebuild the conjugation store from the HTML tables of earlier versions.",
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Try the cheap model first and only escalate replies that fail checks.",
+    )
+    args = parser.parse_args()
+    if args.cascade and args.use_batch:
+        parser.error("--cascade can't be combined with --batch")
+    from cascade import set_cascade
+
+    set_cascade(args.cascade)
+    if args.diff:
+        diff()
+    elif args.migrate_conjugations:
+        migrate()
+    elif args.warm:
+        warm(trace_path=args.trace)
+    elif args.plan:
+        plan(
+            use_async=args.use_async,
+            use_batch=args.use_batch,
+            resume=args.resume,
+            incremental=args.incremental,
+        )
+    else:
+        from sentence_cache import set_refresh_percent
+
+        set_refresh_percent(args.refresh)
+        go(
+            use_async=args.use_async,
+            use_batch=args.use_batch,
+            resume=args.resume,
+            incremental=args.incremental,
+            trace_path=args.trace,
+        )
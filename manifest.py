@@ -0,0 +1,359 @@
+"""
+Manifest of the cards in a built deck, written next to its .apkg.
+
+The manifest holds every finished VerbPackage of the last successful build
+of a deck, one JSON line per card, along with a hash of the note's content,
+the model and the version of the prompt it was generated with, and when it
+was created and last changed. An incremental build reuses the cards that
+are still current and only generates the rest; `diff_deck` reports which
+those are before any money is spent.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional, Set
+import create_content
+import utils
+from cascade import model_label
+from checkpoint import VERB_PACKAGE_FIELDS, CardKey, card_key
+from conjugator import PERSONS, conjugate
+from create_content import build_italian_sentences_prompt
+from data_types import DeckDiff, ManifestEntry, VerbPackage, VerbPackageList
+
+MANIFEST_SUFFIX = ".manifest.jsonl"
+
+# Bump when a change to how sentences are checked, regenerated or parsed
+# should make the cards of earlier builds stale. Prompts and note fields are
+# hashed as rendered, so editing their templates needs no bump
+CONTENT_VERSION = 1
+
+# The reply formats, budgets and attempts the prompts are sent with
+CONTENT_SETTINGS = (
+    CONTENT_VERSION,
+    create_content.SENTENCE_RESPONSE_FORMAT,
+    create_content.SENTENCES_RESPONSE_FORMAT,
+    create_content.SENTENCE_MAX_TOKENS,
+    create_content.SENTENCES_MAX_TOKENS,
+    create_content.REGENERATE_ATTEMPTS,
+    utils.CONJUGATED_RESPONSE_FORMAT,
+    utils.CONJUGATION_RESPONSE_FORMAT,
+    utils.CONJUGATED_MAX_TOKENS,
+    utils.CONJUGATION_MAX_TOKENS,
+)
+
+# The cards the templates are rendered for: a verb that gets the extra
+# instruction about past participles and one that doesn't, in persons with
+# and without a subject statement
+SAMPLE_FORMS = dict(zip(PERSONS, ["ho", "hai", "ha", "abbiamo", "avete", "hanno"]))
+SAMPLE_GROUPS = (
+    [
+        VerbPackage(
+            verb="avere",
+            tense="Presente Indicativo",
+            person=person,
+            subject="la musica",
+            verb_conjugated=form,
+        )
+        for person, form in SAMPLE_FORMS.items()
+    ],
+    [
+        VerbPackage(
+            verb="parlare",
+            tense="Presente Indicativo",
+            person="1st person singular",
+            subject="la musica",
+            verb_conjugated="parlo",
+        )
+    ],
+)
+SAMPLE_SENTENCE = "Io {{c1::ho}} una chitarra."
+SAMPLE_TRANSLATION = "I have a guitar."
+
+
+def content_hash(verb_package: VerbPackage) -> str:
+    """
+    A hash of the fields of a card's note.
+
+    Args:
+        verb_package (VerbPackage): The finished card.
+
+    Returns:
+        str: The hash.
+    """
+    content = f"{verb_package.flashcard_cloze}\x1f{verb_package.flashcard_extra}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def rendered_templates() -> Iterator[str]:
+    """
+    Render every prompt and note field template for the sample cards.
+
+    Returns:
+        Iterator[str]: The rendered prompts and fields.
+    """
+    for verb_packages in SAMPLE_GROUPS:
+        yield create_content.build_italian_sentences_prompt(verb_packages)
+        for verb_package in verb_packages:
+            yield create_content.build_italian_sentence_prompt(verb_package)
+            yield utils.build_conjugated_prompt(verb_package)
+            yield utils.build_conjugation_prompt(verb_package)
+            card = create_content.apply_italian_sentence(
+                replace(verb_package), SAMPLE_SENTENCE
+            )
+            card = create_content.format_flashcard_extra(
+                card, SAMPLE_TRANSLATION, SAMPLE_FORMS
+            )
+            yield card.flashcard_cloze
+            yield card.flashcard_extra
+    yield create_content.clean_sentence(SAMPLE_SENTENCE)
+
+
+@lru_cache(maxsize=None)
+def template_version() -> str:
+    """
+    A hash of every prompt and note field template, rendered for the sample
+    cards, and of the settings its requests are sent with. Changing what any
+    of them renders, or bumping CONTENT_VERSION, makes every card of the last
+    build stale; a change to a comment or docstring doesn't.
+
+    Returns:
+        str: The hash.
+    """
+    digest = hashlib.sha256()
+    for rendered in rendered_templates():
+        digest.update(rendered.encode("utf-8"))
+        digest.update(b"\x1f")
+    digest.update(json.dumps(CONTENT_SETTINGS, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def prompt_version(
+    verb_package: VerbPackage, verb_conjugated: Optional[str] = None
+) -> str:
+    """
+    A hash of the sentence prompt for a card, rendered on its own, and of the
+    templates behind its note. It changes whenever a template, the card's
+    subject or its conjugated form does.
+
+    Args:
+        verb_package (VerbPackage): The card.
+        verb_conjugated (Optional[str], optional): The conjugated form to use
+            if neither the card nor the rule engine has one. Defaults to None.
+
+    Returns:
+        str: The hash.
+    """
+    verb_conjugated = (
+        verb_package.verb_conjugated
+        or conjugate(verb_package.verb, verb_package.tense, verb_package.person)
+        or verb_conjugated
+    )
+    prompt = build_italian_sentences_prompt(
+        [replace(verb_package, verb_conjugated=verb_conjugated or "")]
+    )
+    content = f"{template_version()}\x1f{prompt}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def is_current(entry: ManifestEntry, verb_package: VerbPackage) -> bool:
+    """
+    Whether a card of the last build, or one journaled by an interrupted
+    run, can be reused for a card of this one: the same model (or cascade of
+    models), and the same prompt once rendered for the current card.
+
+    Args:
+        entry (ManifestEntry): The card in the last build's manifest or the
+            journal.
+        verb_package (VerbPackage): The card as this build would create it.
+
+    Returns:
+        bool: True if the card needn't be generated again.
+    """
+    return entry.model == model_label() and entry.prompt_version == prompt_version(
+        verb_package, entry.verb_package.verb_conjugated
+    )
+
+
+def new_entry(verb_package: VerbPackage, now: str = "") -> ManifestEntry:
+    """
+    The entry for a card this build has just finished, generated with the
+    current model and prompt.
+
+    Args:
+        verb_package (VerbPackage): The finished card.
+        now (str, optional): When it was finished. Defaults to "".
+
+    Returns:
+        ManifestEntry: The entry.
+    """
+    return ManifestEntry(
+        verb_package=verb_package,
+        content_hash=content_hash(verb_package),
+        model=model_label(),
+        prompt_version=prompt_version(verb_package),
+        created_at=now,
+        updated_at=now,
+    )
+
+
+class Manifest:
+    """
+    The manifest of one deck. A build writes it to a temporary file as cards
+    finish and only replaces the previous manifest once the deck is done.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.path = name + MANIFEST_SUFFIX
+        self._temp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._lock = threading.Lock()
+        self._previous: Dict[CardKey, ManifestEntry] = {}
+
+    def load(self) -> Dict[CardKey, ManifestEntry]:
+        """
+        Read back the cards of the last build.
+
+        Returns:
+            Dict[CardKey, ManifestEntry]: The cards, by card key. Empty if the
+            deck hasn't been built before.
+        """
+        entries: Dict[CardKey, ManifestEntry] = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as manifest_file:
+            for line in manifest_file:
+                record = json.loads(line)
+                verb_package = VerbPackage(
+                    **{
+                        key: value
+                        for key, value in record.items()
+                        if key in VERB_PACKAGE_FIELDS
+                    }
+                )
+                entries[card_key(verb_package)] = ManifestEntry(
+                    verb_package=verb_package,
+                    content_hash=record.get("content_hash", ""),
+                    model=record.get("model", ""),
+                    prompt_version=record.get("prompt_version", ""),
+                    created_at=record.get("created_at", ""),
+                    updated_at=record.get("updated_at", ""),
+                )
+        return entries
+
+    def begin(self) -> None:
+        """
+        Start writing the manifest of a new build. Cards whose content is
+        unchanged keep the timestamps of the last build.
+        """
+        with self._lock:
+            self._previous = self.load()
+            open(self._temp_path, "w", encoding="utf-8").close()
+
+    def _entry(self, verb_package: VerbPackage, now: str) -> ManifestEntry:
+        """
+        The manifest entry for a finished card.
+        """
+        entry = new_entry(verb_package, now)
+        previous = self._previous.get(card_key(verb_package))
+        if previous is not None:
+            entry.created_at = previous.created_at or now
+            if previous.content_hash == entry.content_hash:
+                entry.updated_at = previous.updated_at or now
+        return entry
+
+    def record(self, verb_packages: Iterable[VerbPackage]) -> None:
+        """
+        Add finished cards to the manifest being written.
+
+        Args:
+            verb_packages (Iterable[VerbPackage]): The finished cards.
+        """
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        lines = []
+        for verb_package in verb_packages:
+            entry = self._entry(verb_package, now)
+            record = asdict(entry.verb_package)
+            record.update(
+                content_hash=entry.content_hash,
+                model=entry.model,
+                prompt_version=entry.prompt_version,
+                created_at=entry.created_at,
+                updated_at=entry.updated_at,
+            )
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        with self._lock:
+            try:
+                with open(self._temp_path, "a", encoding="utf-8") as manifest_file:
+                    manifest_file.write("".join(lines))
+            except OSError:
+                self._remove_temp()
+                raise
+
+    def commit(self) -> None:
+        """
+        Replace the previous manifest with the one just written.
+        """
+        with self._lock:
+            try:
+                with open(self._temp_path, "a", encoding="utf-8") as manifest_file:
+                    manifest_file.flush()
+                    os.fsync(manifest_file.fileno())
+                os.replace(self._temp_path, self.path)
+            except OSError:
+                self._remove_temp()
+                raise
+            self._previous = {}
+
+    def discard(self) -> None:
+        """
+        Drop the manifest being written, keeping the previous one, when the
+        build of the deck fails.
+        """
+        with self._lock:
+            self._remove_temp()
+            self._previous = {}
+
+    def _remove_temp(self) -> None:
+        """
+        Remove the temporary file, if there is one.
+        """
+        try:
+            os.remove(self._temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def diff_deck(verb_package_list: VerbPackageList) -> DeckDiff:
+    """
+    Compare a deck as the current content lists and prompt templates would
+    build it against its last build's manifest, without calling any API.
+
+    Args:
+        verb_package_list (VerbPackageList): The deck as it would be built now.
+
+    Returns:
+        DeckDiff: The cards to add and regenerate, the cards no longer in the
+        deck, and the number that can be reused.
+    """
+    entries = Manifest(verb_package_list.name).load()
+    deck_diff = DeckDiff(
+        name=verb_package_list.name, added=[], changed=[], removed=[], unchanged=0
+    )
+    seen: Set[CardKey] = set()
+    for verb_package in verb_package_list.verb_packages:
+        key = card_key(verb_package)
+        seen.add(key)
+        entry = entries.get(key)
+        if entry is None:
+            deck_diff.added.append(key)
+        elif not is_current(entry, verb_package):
+            deck_diff.changed.append(key)
+        else:
+            deck_diff.unchanged += 1
+    deck_diff.removed = [key for key in entries if key not in seen]
+    return deck_diff
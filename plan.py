@@ -0,0 +1,316 @@
+"""
+Dry-run planner: what a build would cost before it starts.
+
+Walks the decks' VerbPackages the way a build would, consults every cache a
+build consults (the rule engine, the sentence cache, the conjugation store,
+the translation cache, and the checkpoint journal and manifest when resuming
+or updating), and counts the requests each stage of the pipeline still has to
+make. Tokens are counted with tiktoken when it's installed and estimated
+from the length of the prompt otherwise; cost and wall-clock time are then
+projected from the prices and rate limits in `constants`.
+"""
+
+from dataclasses import replace
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set
+from cascade import peek_sentence_cache
+from checkpoint import CardKey, Checkpoint, card_key
+from conjugation_store import get_conjugation_store
+from conjugator import PERSONS, conjugate
+from constants import (
+    BATCH_DISCOUNT,
+    DEFAULT_MODEL_PRICE,
+    DEFAULT_RATE_LIMIT,
+    EXPENSIVE_MODEL,
+    MODEL_PRICES,
+    RATE_LIMITS,
+    TRANSLATE_PRICE,
+)
+from create_content import (
+    apply_italian_sentences,
+    build_italian_sentences_prompt,
+    clean_sentence,
+)
+from create_deck import MAX_WORKERS, iter_verb_package_groups
+from data_types import (
+    BuildPlan,
+    ManifestEntry,
+    StagePlan,
+    VerbPackage,
+    VerbPackageList,
+)
+from llm import build_messages
+from manifest import Manifest, is_current
+from rate_limiter import estimate_tokens
+from translation import MAX_BATCH_BYTES, get_translation_cache
+from utils import build_conjugated_prompt, build_conjugation_prompt, parse_conjugated
+
+STAGES = ("conjugated", "sentences", "conjugation", "translation")
+
+# Completion tokens we expect for each kind of request
+CONJUGATED_COMPLETION_TOKENS = 5
+SENTENCE_COMPLETION_TOKENS = 40
+CONJUGATION_COMPLETION_TOKENS = 120
+
+# Typical seconds per request for each stage
+STAGE_LATENCY = {
+    "conjugated": 0.8,
+    "sentences": 4.0,
+    "conjugation": 3.0,
+    "translation": 0.5,
+}
+
+# Length we assume for a sentence that hasn't been generated yet
+ESTIMATED_SENTENCE_CHARACTERS = 60
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> Any:
+    """
+    The tiktoken encoding for a model, or None if tiktoken isn't installed.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = EXPENSIVE_MODEL) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Args:
+        text (str): The text.
+        model (str, optional): The model whose tokenizer to use. Defaults to EXPENSIVE_MODEL.
+
+    Returns:
+        int: The token count, exact with tiktoken and estimated without it.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+def count_prompt_tokens(prompt: str, model: str = EXPENSIVE_MODEL) -> int:
+    """
+    Count the prompt tokens of a request, system message included.
+
+    Args:
+        prompt (str): The user prompt.
+        model (str, optional): The model. Defaults to EXPENSIVE_MODEL.
+
+    Returns:
+        int: The token count.
+    """
+    # Each chat message carries a few tokens of framing
+    return sum(
+        count_tokens(message["content"], model) + 4
+        for message in build_messages(prompt)
+    )
+
+
+def _add_request(
+    stage: StagePlan,
+    prompt: str,
+    completion_tokens: int,
+    cached: bool,
+    planned: Set[str],
+) -> None:
+    """
+    Count a request on a stage, or a cache hit that saves one. A prompt
+    already planned counts as a hit, since its reply will be cached by then.
+    """
+    if cached or prompt in planned:
+        stage.cached += 1
+        return
+    planned.add(prompt)
+    stage.calls += 1
+    stage.prompt_tokens += count_prompt_tokens(prompt)
+    stage.completion_tokens += completion_tokens
+
+
+def _reusable(
+    verb_packages: List[VerbPackage],
+    completed: Dict[CardKey, ManifestEntry],
+    built: Dict[CardKey, ManifestEntry],
+) -> bool:
+    """
+    Whether a build would reuse a whole verb/tense group rather than
+    generate it.
+    """
+    for verb_package in verb_packages:
+        key = card_key(verb_package)
+        if not any(
+            entry is not None and is_current(entry, verb_package)
+            for entry in (completed.get(key), built.get(key))
+        ):
+            return False
+    return True
+
+
+def _plan_group(
+    verb_packages: List[VerbPackage],
+    stages: Dict[str, StagePlan],
+    planned: Set[str],
+) -> None:
+    """
+    Count the requests one verb/tense group would make, stage by stage.
+    """
+    # The conjugated forms, from the rule engine or the LLM
+    verb_packages = [replace(verb_package) for verb_package in verb_packages]
+    forms_known = True
+    for verb_package in verb_packages:
+        verb_conjugated = conjugate(
+            verb_package.verb, verb_package.tense, verb_package.person
+        )
+        if verb_conjugated is None:
+            prompt = build_conjugated_prompt(verb_package)
+            cached = peek_sentence_cache(prompt)
+            _add_request(
+                stages["conjugated"],
+                prompt,
+                CONJUGATED_COMPLETION_TOKENS,
+                cached is not None,
+                planned,
+            )
+            if cached is None:
+                forms_known = False
+                # Stand-in, so the sentence prompt can still be measured
+                verb_conjugated = verb_package.verb
+            else:
+                verb_conjugated = parse_conjugated(cached)
+        verb_package.verb_conjugated = verb_conjugated
+
+    # One sentence request for the group; its prompt depends on the forms
+    prompt = build_italian_sentences_prompt(verb_packages)
+    cached = peek_sentence_cache(prompt) if forms_known else None
+    sentences_known = False
+    if cached is not None:
+        try:
+            apply_italian_sentences(verb_packages, cached)
+            sentences_known = True
+        except (KeyError, TypeError, ValueError):
+            pass
+    _add_request(
+        stages["sentences"],
+        prompt,
+        SENTENCE_COMPLETION_TOKENS * len(verb_packages),
+        sentences_known,
+        planned,
+    )
+
+    # The conjugation table, once per verb and tense, unless the group's forms
+    # and the rule engine cover every person
+    verb_package = verb_packages[0]
+    group_persons = {verb_package.person for verb_package in verb_packages}
+    derivable = all(
+        person in group_persons
+        or conjugate(verb_package.verb, verb_package.tense, person) is not None
+        for person in PERSONS
+    )
+    _add_request(
+        stages["conjugation"],
+        build_conjugation_prompt(verb_package),
+        CONJUGATION_COMPLETION_TOKENS,
+        derivable
+        or (verb_package.verb, verb_package.tense) in get_conjugation_store(),
+        planned,
+    )
+
+    # Translations, batched per group
+    translation = stages["translation"]
+    if sentences_known:
+        translation_cache = get_translation_cache()
+        sentences = [
+            " ".join(clean_sentence(verb_package.sentence).split("\n"))
+            for verb_package in verb_packages
+        ]
+        missing = [s for s in sentences if translation_cache.get(s) is None]
+        missing_count = len(missing)
+        characters = sum(len(sentence) for sentence in missing)
+    else:
+        missing_count = len(verb_packages)
+        characters = ESTIMATED_SENTENCE_CHARACTERS * missing_count
+    translation.cached += len(verb_packages) - missing_count
+    if missing_count:
+        translation.calls += 1 + characters // MAX_BATCH_BYTES
+        translation.characters += characters
+
+
+def plan_build(
+    verb_package_lists: List[VerbPackageList],
+    concurrency: int = MAX_WORKERS,
+    resume: bool = False,
+    incremental: bool = False,
+    batch: bool = False,
+) -> BuildPlan:
+    """
+    Project the requests, cost and wall-clock time of building some decks,
+    without calling any API or changing any cache.
+
+    Args:
+        verb_package_lists (List[VerbPackageList]): The decks to build.
+        concurrency (int, optional): Groups in flight at once. Defaults to MAX_WORKERS.
+        resume (bool, optional): Count cards journaled by an earlier run as done. Defaults to False.
+        incremental (bool, optional): Count current cards of the last build as done. Defaults to False.
+        batch (bool, optional): Price the Batch API, whose time isn't projected. Defaults to False.
+
+    Returns:
+        BuildPlan: The plan.
+    """
+    stages = {name: StagePlan(name=name) for name in STAGES}
+    planned: Set[str] = set()
+    cards = 0
+    cards_reused = 0
+    for verb_package_list in verb_package_lists:
+        completed = Checkpoint(verb_package_list.name).load() if resume else {}
+        built = Manifest(verb_package_list.name).load() if incremental else {}
+        for verb_packages in iter_verb_package_groups(verb_package_list.verb_packages):
+            cards += len(verb_packages)
+            if _reusable(verb_packages, completed, built):
+                cards_reused += len(verb_packages)
+                continue
+            _plan_group(verb_packages, stages, planned)
+
+    prompt_price, completion_price = MODEL_PRICES.get(
+        EXPENSIVE_MODEL, DEFAULT_MODEL_PRICE
+    )
+    for stage in stages.values():
+        stage.seconds = stage.calls * STAGE_LATENCY[stage.name]
+        stage.cost = (
+            stage.prompt_tokens * prompt_price
+            + stage.completion_tokens * completion_price
+        ) / 1_000_000
+        if batch:
+            stage.cost *= BATCH_DISCOUNT
+        stage.cost += stage.characters * TRANSLATE_PRICE / 1_000_000
+
+    seconds: Optional[float] = None
+    if not batch:
+        # Bounded by the work spread over the workers, or by the rate limits
+        requests_per_minute, tokens_per_minute = RATE_LIMITS.get(
+            EXPENSIVE_MODEL, DEFAULT_RATE_LIMIT
+        )
+        llm_stages = [stage for stage in stages.values() if stage.name != "translation"]
+        requests = sum(stage.calls for stage in llm_stages)
+        tokens = sum(
+            stage.prompt_tokens + stage.completion_tokens for stage in llm_stages
+        )
+        seconds = max(
+            sum(stage.seconds for stage in stages.values()) / concurrency,
+            60 * requests / requests_per_minute,
+            60 * tokens / tokens_per_minute,
+        )
+
+    return BuildPlan(
+        cards=cards,
+        cards_reused=cards_reused,
+        stages=stages,
+        cost=sum(stage.cost for stage in stages.values()),
+        seconds=seconds,
+    )
@@ -0,0 +1,190 @@
+"""
+Client-side rate limiting for OpenAI requests.
+
+Each model gets a pair of token buckets, one for requests per minute and one
+for tokens per minute. Callers reserve capacity before sending a request and
+wait until both buckets can cover it, so we run at the limit rather than
+bouncing off 429s. The buckets are corrected from the x-ratelimit-* response
+headers and from the actual token usage of each response.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Mapping, Optional
+from constants import RATE_LIMITS, DEFAULT_RATE_LIMIT
+
+# Completion tokens we assume a request will use, before we see its usage
+ESTIMATED_COMPLETION_TOKENS = 200
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units that refills evenly over a minute.
+    The level may go negative: that debt is what later callers wait out.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """
+        Units refilled per second.
+        """
+        return self.capacity / 60
+
+    def refill(self, now: float) -> None:
+        """
+        Top the bucket up for the time elapsed since the last update.
+
+        Args:
+            now (float): The current monotonic time.
+        """
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float) -> float:
+        """
+        Take `amount` units from the bucket.
+
+        Args:
+            amount (float): The units to take.
+
+        Returns:
+            float: Seconds to wait before the units are actually available.
+        """
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+
+class ModelRateLimiter:
+    """
+    Paces requests to one model against its requests-per-minute and
+    tokens-per-minute limits. Safe to share between threads and coroutines.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserve one request and `tokens` tokens.
+
+        Args:
+            tokens (int): The estimated tokens the request will use.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return max(self.requests.take(1), self.tokens.take(tokens))
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Block until a request of `tokens` tokens may be sent.
+
+        Args:
+            tokens (int): The estimated tokens the request will use.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int) -> None:
+        """
+        Async variant of `acquire`.
+
+        Args:
+            tokens (int): The estimated tokens the request will use.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def record_usage(self, estimated: int, actual: int) -> None:
+        """
+        Correct the token bucket once we know what a request really used.
+
+        Args:
+            estimated (int): The tokens reserved for the request.
+            actual (int): The tokens the response reports it used.
+        """
+        with self._lock:
+            self.tokens.level += estimated - actual
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Adopt the limits and remaining capacity reported by the API, e.g.
+        `x-ratelimit-limit-requests` and `x-ratelimit-remaining-tokens`.
+
+        Args:
+            headers (Mapping[str, str]): The response headers.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = _int_header(headers, f"x-ratelimit-limit-{name}")
+                remaining = _int_header(headers, f"x-ratelimit-remaining-{name}")
+                bucket.refill(now)
+                if limit:
+                    bucket.capacity = limit
+                if remaining is not None:
+                    # The server's count already includes requests that are
+                    # in flight, so never let our view be more generous
+                    bucket.level = min(bucket.level, remaining)
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    """
+    Read an integer header, if present.
+    """
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the tokens in a piece of text (about four characters
+    per token for English and Italian).
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated token count.
+    """
+    return len(text) // 4 + 1
+
+
+_LIMITERS: Dict[str, ModelRateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    """
+    Return the process-wide rate limiter for a model.
+
+    Args:
+        model (str): The model name, e.g. EXPENSIVE_MODEL.
+
+    Returns:
+        ModelRateLimiter: The shared limiter.
+    """
+    with _LIMITERS_LOCK:
+        if model not in _LIMITERS:
+            requests_per_minute, tokens_per_minute = RATE_LIMITS.get(
+                model, DEFAULT_RATE_LIMIT
+            )
+            _LIMITERS[model] = ModelRateLimiter(requests_per_minute, tokens_per_minute)
+        return _LIMITERS[model]
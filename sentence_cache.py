@@ -0,0 +1,189 @@
+"""
+Persistent, content-addressed cache of generated sentences.
+
+Replies are stored on disk under a hash of the model name and the fully
+rendered prompt, so an unchanged prompt never has to be sent twice. The
+cache is bounded in size and evicts the least recently used entries; a
+refresh percentage lets a rebuild regenerate a random share of the
+sentences instead of reusing all of them.
+"""
+
+import hashlib
+import os
+import random
+import threading
+from typing import Optional
+from constants import (
+    SENTENCE_CACHE_DIR,
+    SENTENCE_CACHE_MAX_BYTES,
+    SENTENCE_CACHE_REFRESH_PERCENT,
+)
+from tracing import count
+
+
+class SentenceCache:
+    """
+    A directory of cached replies, one file per (model, prompt) hash. File
+    modification times double as the LRU order: hits touch the file.
+    """
+
+    def __init__(
+        self,
+        directory: str = SENTENCE_CACHE_DIR,
+        max_bytes: int = SENTENCE_CACHE_MAX_BYTES,
+        refresh_percent: float = SENTENCE_CACHE_REFRESH_PERCENT,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.refresh_percent = refresh_percent
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(
+            entry.stat().st_size for entry in os.scandir(directory) if entry.is_file()
+        )
+
+    def _path(self, model: str, prompt: str) -> str:
+        """
+        The file a (model, prompt) pair is cached in.
+        """
+        key = hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """
+        Look up the cached reply to a prompt.
+
+        Args:
+            model (str): The model the prompt is sent to.
+            prompt (str): The fully rendered prompt.
+
+        Returns:
+            Optional[str]: The reply, or None on a miss or when the entry is
+            picked for refreshing.
+        """
+        if self.refresh_percent and random.uniform(0, 100) < self.refresh_percent:
+            count("sentence_cache.refresh")
+            return None
+
+        path = self._path(model, prompt)
+        try:
+            with open(path, "r", encoding="utf-8") as cache_file:
+                content = cache_file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            count("sentence_cache.miss")
+            return None
+        count("sentence_cache.hit")
+        return content
+
+    def peek(self, model: str, prompt: str) -> Optional[str]:
+        """
+        Look up a cached reply without touching it or picking it for
+        refreshing, e.g. to plan a build.
+
+        Args:
+            model (str): The model the prompt is sent to.
+            prompt (str): The fully rendered prompt.
+
+        Returns:
+            Optional[str]: The reply, or None on a miss.
+        """
+        try:
+            with open(self._path(model, prompt), "r", encoding="utf-8") as cache_file:
+                return cache_file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, model: str, prompt: str, content: str) -> None:
+        """
+        Cache the reply to a prompt, evicting old entries if the cache is full.
+
+        Args:
+            model (str): The model the prompt was sent to.
+            prompt (str): The fully rendered prompt.
+            content (str): The reply.
+        """
+        path = self._path(model, prompt)
+        data = content.encode("utf-8")
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as cache_file:
+            cache_file.write(data)
+
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(temp_path, path)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def delete(self, model: str, prompt: str) -> None:
+        """
+        Drop a cached reply, e.g. one that no longer parses.
+
+        Args:
+            model (str): The model the prompt was sent to.
+            prompt (str): The fully rendered prompt.
+        """
+        path = self._path(model, prompt)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                return
+            self._size -= size
+
+    def _evict(self) -> None:
+        """
+        Remove least recently used entries until the cache is at 90% of its
+        limit, so we don't evict on every put. Called with the lock held.
+        """
+        entries = sorted(
+            (
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and not entry.name.endswith(".tmp")
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+
+
+_CACHE: Optional[SentenceCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_sentence_cache() -> SentenceCache:
+    """
+    Return the process-wide sentence cache.
+
+    Returns:
+        SentenceCache: The shared cache.
+    """
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = SentenceCache()
+        return _CACHE
+
+
+def set_refresh_percent(refresh_percent: float) -> None:
+    """
+    Regenerate roughly this share of cached sentences on the next build,
+    rather than reusing them all.
+
+    Args:
+        refresh_percent (float): 0 reuses everything, 100 refreshes everything.
+    """
+    get_sentence_cache().refresh_percent = refresh_percent
@@ -0,0 +1,112 @@
+"""
+Single-flight deduplication of concurrent calls.
+
+When several workers ask for the same key at the same time, only the first
+one runs the underlying function; the others wait for it and share its
+result (or its exception). `SingleFlight` is for threads, `AsyncSingleFlight`
+for coroutines on one event loop.
+"""
+
+import asyncio
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    """
+    A call that is currently in flight.
+    """
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Collapses concurrent calls for the same key into one.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call[T]] = {}
+
+    def do(self, key: Hashable, function: Callable[..., T], *args: Any) -> T:
+        """
+        Run `function(*args)` unless a call for `key` is already in flight,
+        in which case wait for that call and return its result.
+
+        Args:
+            key (Hashable): Identifies calls that would produce the same result.
+            function (Callable[..., T]): The function to run.
+
+        Returns:
+            T: The result of the (shared) call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+
+        try:
+            call.result = function(*args)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight(Generic[T]):
+    """
+    Collapses concurrent awaits for the same key into one task.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+    async def do(
+        self, key: Hashable, function: Callable[..., Awaitable[T]], *args: Any
+    ) -> T:
+        """
+        Await `function(*args)` unless a call for `key` is already in flight,
+        in which case await that call instead.
+
+        Args:
+            key (Hashable): Identifies calls that would produce the same result.
+            function (Callable[..., Awaitable[T]]): The coroutine function to run.
+
+        Returns:
+            T: The result of the (shared) call.
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(function(*args))
+            self._calls[key] = future
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shield the shared task so one cancelled waiter doesn't cancel it
+        # for everyone else
+        return await asyncio.shield(future)
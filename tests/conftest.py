@@ -0,0 +1,19 @@
+import pytest
+import conjugation_store
+import sentence_cache
+import translation
+from benchmark import FakeTranslateClient
+
+
+@pytest.fixture
+def build_dir(tmp_path, monkeypatch):
+    """
+    Run a build in an empty directory, with fresh process-wide stores and a
+    fake Translate client.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(conjugation_store, "_STORE", None)
+    monkeypatch.setattr(sentence_cache, "_CACHE", None)
+    monkeypatch.setattr(translation, "_CACHE", None)
+    monkeypatch.setattr(translation, "_CLIENT", FakeTranslateClient())
+    return tmp_path
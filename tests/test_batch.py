@@ -0,0 +1,77 @@
+import json
+import os
+from typing import Dict, List
+from batch import BATCH_DIR, FakeBatchEndpoint, build_note_lists_batch
+from benchmark import fake_reply
+from create_content import build_italian_sentences_prompt
+from create_deck import build_verb_package_list, iter_verb_package_groups
+
+TENSES = ["Presente Indicativo", "Imperfetto Indicativo"]
+
+
+def read_requests(name: str) -> List[Dict]:
+    path = os.path.join(BATCH_DIR, f"{name}.jsonl")
+    with open(path, "r", encoding="utf-8") as input_file:
+        return [json.loads(line) for line in input_file]
+
+
+def sentence_prompts(name: str) -> List[str]:
+    return [
+        request["body"]["messages"][-1]["content"]
+        for request in read_requests(name)
+        if request["custom_id"].startswith("sentences-")
+    ]
+
+
+def test_batch_groups_per_deck_with_the_regular_prompts(build_dir):
+    # "stare" is in both decks, and twice in the second, as in the content lists
+    key_verbs = build_verb_package_list("key", verbs=["avere", "stare"], tenses=TENSES)
+    irregular_verbs = build_verb_package_list(
+        "irregular", verbs=["stare", "dire", "stare"], tenses=TENSES
+    )
+    endpoint = FakeBatchEndpoint(lambda model, prompt: fake_reply(prompt))
+
+    note_lists = build_note_lists_batch(
+        [key_verbs, irregular_verbs], endpoint, poll_interval=0
+    )
+
+    assert [len(note_list.notes) for note_list in note_lists] == [24, 36]
+    prompts = sentence_prompts("content")
+    # One request per verb and tense; the decks' shared groups go out once
+    assert len(prompts) == len(set(prompts)) == 6
+    expected = {
+        build_italian_sentences_prompt(verb_package_group)
+        for verb_package_list in (key_verbs, irregular_verbs)
+        for verb_package_group in iter_verb_package_groups(
+            verb_package_list.verb_packages
+        )
+    }
+    assert set(prompts) == expected
+    # Every card got the sentence for its own person
+    for verb_package_list in (key_verbs, irregular_verbs):
+        for verb_package in verb_package_list.verb_packages:
+            assert verb_package.verb_conjugated in verb_package.sentence
+
+
+def test_batch_requests_an_unknown_conjugated_form_once(build_dir):
+    first = build_verb_package_list("first", verbs=["zzzare"], tenses=TENSES[:1])
+    second = build_verb_package_list("second", verbs=["zzzare"], tenses=TENSES[:1])
+    endpoint = FakeBatchEndpoint(lambda model, prompt: fake_reply(prompt))
+
+    build_note_lists_batch([first, second], endpoint, poll_interval=0)
+
+    assert len(read_requests("conjugated")) == 6
+    assert len(sentence_prompts("content")) == 1
+    for verb_package in first.verb_packages + second.verb_packages:
+        assert verb_package.verb_conjugated == "zzzare"
+
+
+def test_batch_requests_carry_output_budgets(build_dir):
+    deck = build_verb_package_list("deck", verbs=["parlare"], tenses=TENSES[:1])
+    endpoint = FakeBatchEndpoint(lambda model, prompt: fake_reply(prompt))
+
+    build_note_lists_batch([deck], endpoint, poll_interval=0)
+
+    for request in read_requests("content"):
+        assert request["body"]["max_tokens"] > 0
+        assert request["body"]["response_format"]["type"] == "json_schema"
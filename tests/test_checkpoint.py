@@ -0,0 +1,50 @@
+from checkpoint import Checkpoint
+from data_types import ManifestEntry, VerbPackage
+
+
+def journaled(person: str) -> ManifestEntry:
+    verb_package = VerbPackage(
+        verb="parlare",
+        tense="Presente Indicativo",
+        person=person,
+        subject="Marco",
+        verb_conjugated="parla",
+        sentence="Marco {{c1::parla}} italiano.",
+    )
+    return ManifestEntry(
+        verb_package=verb_package,
+        content_hash="hash",
+        model="gpt-4o",
+        prompt_version="version",
+        created_at="",
+        updated_at="",
+    )
+
+
+def test_journal_replays_up_to_a_torn_last_line(tmp_path):
+    checkpoint = Checkpoint("Key Verbs", directory=str(tmp_path))
+    checkpoint.record([journaled("1st person singular")])
+    checkpoint.record([journaled("3rd person singular")])
+    # The crash we're resuming after tore the last append
+    with open(checkpoint.path, "a", encoding="utf-8") as journal:
+        journal.write('{"verb": "parlare", "tense": "Presente')
+
+    completed = Checkpoint("Key Verbs", directory=str(tmp_path)).load()
+
+    assert [key[2] for key in completed] == [
+        "1st person singular",
+        "3rd person singular",
+    ]
+    assert completed[("parlare", "Presente Indicativo", "3rd person singular")] == (
+        journaled("3rd person singular")
+    )
+
+
+def test_cleared_journal_starts_afresh(tmp_path):
+    checkpoint = Checkpoint("Key Verbs", directory=str(tmp_path))
+    checkpoint.record([journaled("1st person singular")])
+
+    checkpoint.clear()
+
+    assert checkpoint.load() == {}
+    checkpoint.clear()
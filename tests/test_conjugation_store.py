@@ -0,0 +1,66 @@
+import json
+import pytest
+from conjugation_store import get_conjugation_store, parse_conjugation_html
+
+
+def table(*items: str) -> str:
+    lines = "".join(f"\n    <li>{item}</li>" for item in items)
+    return f"<p><ul>{lines}\n</ul></p>"
+
+
+@pytest.mark.parametrize(
+    "item, form",
+    [
+        ("io ho avuto", "ho avuto"),
+        ("(lui/lei/Lei) ha", "ha"),
+        ("che io sia", "sia"),
+        ("io mi sono lavato/lavata", "mi sono lavato/a"),
+        ("noi siamo stati/state", "siamo stati/e"),
+        ("noi siamo andati/e", "siamo andati/e"),
+        ("lui è stato / lei è stata", "è stato/a"),
+    ],
+)
+def test_parse_conjugation_html_reads_a_line(item, form):
+    forms, _ = parse_conjugation_html(table(*[item] * 6))
+
+    assert forms is not None
+    assert set(forms.values()) == {form}
+
+
+def test_parse_conjugation_html_rejects_unrelated_variants():
+    forms, odd_items = parse_conjugation_html(
+        table(
+            "io vado / io andrò",
+            "tu vai",
+            "lui va",
+            "noi andiamo",
+            "voi andate",
+            "loro vanno",
+        )
+    )
+
+    assert forms is None
+    assert odd_items == ["io vado / io andrò"]
+
+
+def test_store_migrates_the_legacy_file_on_first_use(build_dir, capsys):
+    presente = table(
+        "io ho", "tu hai", "lui/lei ha", "noi abbiamo", "voi avete", "loro hanno"
+    )
+    legacy = {
+        "avere": {"Presente Indicativo": presente},
+        "avere Presente Indicativo": presente,
+        "essere Presente Indicativo": table("io sono"),
+    }
+    with open("conjugations.txt", "w", encoding="utf-8") as legacy_file:
+        json.dump(legacy, legacy_file)
+
+    store = get_conjugation_store()
+
+    assert len(store) == 1
+    assert store.get("avere", "Presente Indicativo")["3rd person singular"] == "ha"
+    output = capsys.readouterr().out
+    assert "Migrating earlier versions' conjugation tables" in output
+    assert "avere, Presente Indicativo: stored more than once" in output
+    assert "essere, Presente Indicativo: skipped" in output
+    assert "Migrated 1 conjugation tables, skipped 1" in output
@@ -0,0 +1,424 @@
+"""
+Checks the rule-based conjugation engine against a reviewed sample of the
+legacy conjugations.txt: a regular verb of each conjugation class, two
+reflexives, and every key and irregular verb in the content lists.
+
+The legacy tables give both genders ("seduto/a"); the engine gives the
+masculine, so the sample does too. Where the legacy table was wrong the
+sample holds the corrected form:
+
+- "sedere" takes "essere" without a pronoun; the legacy "mi sono seduto/a"
+  is the reflexive "sedersi".
+- "piacere" in the Presente Condizionale, where the legacy table had
+  "io piacerebbe".
+"""
+
+import pytest
+from conjugator import PERSONS, conjugate
+
+# (verb, tense, the forms of PERSONS in order)
+LEGACY_SAMPLE = [
+    (
+        "parlare",
+        "Imperfetto Indicativo",
+        "parlavo, parlavi, parlava, parlavamo, parlavate, parlavano",
+    ),
+    (
+        "parlare",
+        "Passato Prossimo Indicativo",
+        "ho parlato, hai parlato, ha parlato, "
+        "abbiamo parlato, avete parlato, hanno parlato",
+    ),
+    (
+        "mangiare",
+        "Presente Indicativo",
+        "mangio, mangi, mangia, mangiamo, mangiate, mangiano",
+    ),
+    (
+        "mangiare",
+        "Passato Prossimo Indicativo",
+        "ho mangiato, hai mangiato, ha mangiato, "
+        "abbiamo mangiato, avete mangiato, hanno mangiato",
+    ),
+    (
+        "credere",
+        "Presente Indicativo",
+        "credo, credi, crede, crediamo, credete, credono",
+    ),
+    (
+        "credere",
+        "Passato Condizionale",
+        "avrei creduto, avresti creduto, avrebbe creduto, "
+        "avremmo creduto, avreste creduto, avrebbero creduto",
+    ),
+    (
+        "dormire",
+        "Presente Indicativo",
+        "dormo, dormi, dorme, dormiamo, dormite, dormono",
+    ),
+    (
+        "dormire",
+        "Passato Prossimo Indicativo",
+        "ho dormito, hai dormito, ha dormito, "
+        "abbiamo dormito, avete dormito, hanno dormito",
+    ),
+    (
+        "finire",
+        "Presente Condizionale",
+        "finirei, finiresti, finirebbe, finiremmo, finireste, finirebbero",
+    ),
+    (
+        "finire",
+        "Passato Prossimo Indicativo",
+        "ho finito, hai finito, ha finito, abbiamo finito, avete finito, hanno finito",
+    ),
+    (
+        "alzarsi",
+        "Imperfetto Indicativo",
+        "mi alzavo, ti alzavi, si alzava, ci alzavamo, vi alzavate, si alzavano",
+    ),
+    (
+        "alzarsi",
+        "Passato Prossimo Indicativo",
+        "mi sono alzato, ti sei alzato, si è alzato, "
+        "ci siamo alzati, vi siete alzati, si sono alzati",
+    ),
+    (
+        "divertirsi",
+        "Presente Indicativo",
+        "mi diverto, ti diverti, si diverte, ci divertiamo, vi divertite, si divertono",
+    ),
+    (
+        "divertirsi",
+        "Passato Condizionale",
+        "mi sarei divertito, ti saresti divertito, si sarebbe divertito, "
+        "ci saremmo divertiti, vi sareste divertiti, si sarebbero divertiti",
+    ),
+    (
+        "avere",
+        "Presente Condizionale",
+        "avrei, avresti, avrebbe, avremmo, avreste, avrebbero",
+    ),
+    (
+        "avere",
+        "Passato Prossimo Indicativo",
+        "ho avuto, hai avuto, ha avuto, abbiamo avuto, avete avuto, hanno avuto",
+    ),
+    (
+        "fare",
+        "Presente Condizionale",
+        "farei, faresti, farebbe, faremmo, fareste, farebbero",
+    ),
+    (
+        "fare",
+        "Passato Condizionale",
+        "avrei fatto, avresti fatto, avrebbe fatto, "
+        "avremmo fatto, avreste fatto, avrebbero fatto",
+    ),
+    (
+        "essere",
+        "Presente Indicativo",
+        "sono, sei, è, siamo, siete, sono",
+    ),
+    (
+        "essere",
+        "Passato Condizionale",
+        "sarei stato, saresti stato, sarebbe stato, "
+        "saremmo stati, sareste stati, sarebbero stati",
+    ),
+    (
+        "stare",
+        "Presente Condizionale",
+        "starei, staresti, starebbe, staremmo, stareste, starebbero",
+    ),
+    (
+        "stare",
+        "Passato Condizionale",
+        "sarei stato, saresti stato, sarebbe stato, "
+        "saremmo stati, sareste stati, sarebbero stati",
+    ),
+    (
+        "dire",
+        "Imperfetto Indicativo",
+        "dicevo, dicevi, diceva, dicevamo, dicevate, dicevano",
+    ),
+    (
+        "dire",
+        "Passato Prossimo Indicativo",
+        "ho detto, hai detto, ha detto, abbiamo detto, avete detto, hanno detto",
+    ),
+    (
+        "potere",
+        "Presente Indicativo",
+        "posso, puoi, può, possiamo, potete, possono",
+    ),
+    (
+        "potere",
+        "Passato Condizionale",
+        "avrei potuto, avresti potuto, avrebbe potuto, "
+        "avremmo potuto, avreste potuto, avrebbero potuto",
+    ),
+    (
+        "venire",
+        "Presente Condizionale",
+        "verrei, verresti, verrebbe, verremmo, verreste, verrebbero",
+    ),
+    (
+        "venire",
+        "Passato Prossimo Indicativo",
+        "sono venuto, sei venuto, è venuto, siamo venuti, siete venuti, sono venuti",
+    ),
+    (
+        "andare",
+        "Presente Indicativo",
+        "vado, vai, va, andiamo, andate, vanno",
+    ),
+    (
+        "andare",
+        "Passato Condizionale",
+        "sarei andato, saresti andato, sarebbe andato, "
+        "saremmo andati, sareste andati, sarebbero andati",
+    ),
+    (
+        "volere",
+        "Presente Condizionale",
+        "vorrei, vorresti, vorrebbe, vorremmo, vorreste, vorrebbero",
+    ),
+    (
+        "volere",
+        "Passato Condizionale",
+        "avrei voluto, avresti voluto, avrebbe voluto, "
+        "avremmo voluto, avreste voluto, avrebbero voluto",
+    ),
+    (
+        "sapere",
+        "Presente Indicativo",
+        "so, sai, sa, sappiamo, sapete, sanno",
+    ),
+    (
+        "sapere",
+        "Passato Prossimo Indicativo",
+        "ho saputo, hai saputo, ha saputo, abbiamo saputo, avete saputo, hanno saputo",
+    ),
+    (
+        "dare",
+        "Presente Indicativo",
+        "do, dai, dà, diamo, date, danno",
+    ),
+    (
+        "dare",
+        "Trapassato Prossimo Indicativo",
+        "avevo dato, avevi dato, aveva dato, avevamo dato, avevate dato, avevano dato",
+    ),
+    (
+        "vedere",
+        "Imperfetto Indicativo",
+        "vedevo, vedevi, vedeva, vedevamo, vedevate, vedevano",
+    ),
+    (
+        "vedere",
+        "Passato Prossimo Indicativo",
+        "ho visto, hai visto, ha visto, abbiamo visto, avete visto, hanno visto",
+    ),
+    (
+        "uscire",
+        "Presente Indicativo",
+        "esco, esci, esce, usciamo, uscite, escono",
+    ),
+    (
+        "uscire",
+        "Passato Condizionale",
+        "sarei uscito, saresti uscito, sarebbe uscito, "
+        "saremmo usciti, sareste usciti, sarebbero usciti",
+    ),
+    (
+        "bere",
+        "Presente Indicativo",
+        "bevo, bevi, beve, beviamo, bevete, bevono",
+    ),
+    (
+        "bere",
+        "Passato Prossimo Indicativo",
+        "ho bevuto, hai bevuto, ha bevuto, abbiamo bevuto, avete bevuto, hanno bevuto",
+    ),
+    (
+        "tenere",
+        "Imperfetto Indicativo",
+        "tenevo, tenevi, teneva, tenevamo, tenevate, tenevano",
+    ),
+    (
+        "tenere",
+        "Passato Prossimo Indicativo",
+        "ho tenuto, hai tenuto, ha tenuto, abbiamo tenuto, avete tenuto, hanno tenuto",
+    ),
+    (
+        "rimanere",
+        "Presente Indicativo",
+        "rimango, rimani, rimane, rimaniamo, rimanete, rimangono",
+    ),
+    (
+        "rimanere",
+        "Trapassato Prossimo Indicativo",
+        "ero rimasto, eri rimasto, era rimasto, "
+        "eravamo rimasti, eravate rimasti, erano rimasti",
+    ),
+    (
+        "scegliere",
+        "Presente Condizionale",
+        "sceglierei, sceglieresti, sceglierebbe, "
+        "sceglieremmo, scegliereste, sceglierebbero",
+    ),
+    (
+        "scegliere",
+        "Passato Prossimo Indicativo",
+        "ho scelto, hai scelto, ha scelto, abbiamo scelto, avete scelto, hanno scelto",
+    ),
+    (
+        "sedere",
+        "Presente Condizionale",
+        "siederei, siederesti, siederebbe, siederemmo, siedereste, siederebbero",
+    ),
+    (
+        "sedere",
+        "Passato Prossimo Indicativo",
+        "sono seduto, sei seduto, è seduto, siamo seduti, siete seduti, sono seduti",
+    ),
+    (
+        "salire",
+        "Imperfetto Indicativo",
+        "salivo, salivi, saliva, salivamo, salivate, salivano",
+    ),
+    (
+        "salire",
+        "Passato Prossimo Indicativo",
+        "sono salito, sei salito, è salito, siamo saliti, siete saliti, sono saliti",
+    ),
+    (
+        "spegnere",
+        "Imperfetto Indicativo",
+        "spegnevo, spegnevi, spegneva, spegnevamo, spegnevate, spegnevano",
+    ),
+    (
+        "spegnere",
+        "Passato Prossimo Indicativo",
+        "ho spento, hai spento, ha spento, abbiamo spento, avete spento, hanno spento",
+    ),
+    (
+        "tradurre",
+        "Imperfetto Indicativo",
+        "traducevo, traducevi, traduceva, traducevamo, traducevate, traducevano",
+    ),
+    (
+        "tradurre",
+        "Passato Prossimo Indicativo",
+        "ho tradotto, hai tradotto, ha tradotto, "
+        "abbiamo tradotto, avete tradotto, hanno tradotto",
+    ),
+    (
+        "morire",
+        "Presente Indicativo",
+        "muoio, muori, muore, moriamo, morite, muoiono",
+    ),
+    (
+        "morire",
+        "Passato Condizionale",
+        "sarei morto, saresti morto, sarebbe morto, "
+        "saremmo morti, sareste morti, sarebbero morti",
+    ),
+    (
+        "piacere",
+        "Presente Indicativo",
+        "piaccio, piaci, piace, piacciamo, piacete, piacciono",
+    ),
+    (
+        "piacere",
+        "Passato Condizionale",
+        "sarei piaciuto, saresti piaciuto, sarebbe piaciuto, "
+        "saremmo piaciuti, sareste piaciuti, sarebbero piaciuti",
+    ),
+    (
+        "produrre",
+        "Presente Condizionale",
+        "produrrei, produrresti, produrrebbe, produrremmo, produrreste, produrrebbero",
+    ),
+    (
+        "produrre",
+        "Passato Prossimo Indicativo",
+        "ho prodotto, hai prodotto, ha prodotto, "
+        "abbiamo prodotto, avete prodotto, hanno prodotto",
+    ),
+    (
+        "trarre",
+        "Presente Indicativo",
+        "traggo, trai, trae, traiamo, traete, traggono",
+    ),
+    (
+        "trarre",
+        "Passato Condizionale",
+        "avrei tratto, avresti tratto, avrebbe tratto, "
+        "avremmo tratto, avreste tratto, avrebbero tratto",
+    ),
+    (
+        "apparire",
+        "Presente Indicativo",
+        "appaio, appari, appare, appariamo, apparite, appaiono",
+    ),
+    (
+        "apparire",
+        "Passato Prossimo Indicativo",
+        "sono apparso, sei apparso, è apparso, "
+        "siamo apparsi, siete apparsi, sono apparsi",
+    ),
+    (
+        "vivere",
+        "Presente Indicativo",
+        "vivo, vivi, vive, viviamo, vivete, vivono",
+    ),
+    (
+        "vivere",
+        "Passato Prossimo Indicativo",
+        "ho vissuto, hai vissuto, ha vissuto, "
+        "abbiamo vissuto, avete vissuto, hanno vissuto",
+    ),
+    (
+        "cogliere",
+        "Imperfetto Indicativo",
+        "coglievo, coglievi, coglieva, coglievamo, coglievate, coglievano",
+    ),
+    (
+        "cogliere",
+        "Passato Prossimo Indicativo",
+        "ho colto, hai colto, ha colto, abbiamo colto, avete colto, hanno colto",
+    ),
+    (
+        "porre",
+        "Presente Indicativo",
+        "pongo, poni, pone, poniamo, ponete, pongono",
+    ),
+    (
+        "porre",
+        "Trapassato Prossimo Indicativo",
+        "avevo posto, avevi posto, aveva posto, "
+        "avevamo posto, avevate posto, avevano posto",
+    ),
+    (
+        "piacere",
+        "Presente Condizionale",
+        "piacerei, piaceresti, piacerebbe, piaceremmo, piacereste, piacerebbero",
+    ),
+    (
+        "sedere",
+        "Futuro Semplice Indicativo",
+        "siederò, siederai, siederà, siederemo, siederete, siederanno",
+    ),
+]
+
+
+@pytest.mark.parametrize("verb, tense, forms", LEGACY_SAMPLE)
+def test_conjugate_matches_legacy_sample(verb: str, tense: str, forms: str) -> None:
+    expected = forms.split(", ")
+    assert [conjugate(verb, tense, person) for person in PERSONS] == expected
+
+
+def test_conjugate_unknown_verb() -> None:
+    assert conjugate("xyzare", "Presente Indicativo", PERSONS[0]) is None
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import List
+import pytest
+import cascade
+import validation
+from create_content import (
+    REGENERATE_ATTEMPTS,
+    apply_italian_sentence,
+    validate_italian_sentences,
+    validate_italian_sentences_async,
+)
+from data_types import VerbPackage
+
+SENTENCE = "Spero che io {{c1::parli}} bene."
+
+
+class ThirdPersonMorph:
+    """
+    The features spaCy's Italian models give "parli", whichever person the
+    sentence uses it in.
+    """
+
+    FEATURES = {
+        "Person": ["3"],
+        "Number": ["Sing"],
+        "Mood": ["Sub"],
+        "Tense": ["Pres"],
+    }
+
+    def get(self, feature: str) -> List[str]:
+        if feature == "VerbForm":
+            return ["Fin"]
+        return self.FEATURES.get(feature, [])
+
+
+class AmbiguousToken:
+    pos_ = "VERB"
+    morph = ThirdPersonMorph()
+
+
+class AmbiguousDoc:
+    def char_span(self, start, end, alignment_mode):
+        return [AmbiguousToken()]
+
+
+def ambiguous_card() -> VerbPackage:
+    verb_package = VerbPackage(
+        verb="parlare",
+        tense="Presente Congiuntivo",
+        person="1st person singular",
+        subject="la musica",
+        verb_conjugated="parli",
+    )
+    return apply_italian_sentence(verb_package, SENTENCE)
+
+
+@pytest.fixture
+def requests(build_dir, monkeypatch) -> List[str]:
+    sent: List[str] = []
+
+    def chat_completion(prompt, model, response_format=None, max_tokens=None):
+        sent.append(prompt)
+        return json.dumps({"sentence": SENTENCE})
+
+    async def chat_completion_async(
+        prompt, model, response_format=None, max_tokens=None
+    ):
+        return chat_completion(prompt, model, response_format, max_tokens)
+
+    monkeypatch.setattr(cascade, "chat_completion", chat_completion)
+    monkeypatch.setattr(cascade, "chat_completion_async", chat_completion_async)
+    monkeypatch.setattr(validation, "_NLP", lambda text: AmbiguousDoc())
+    monkeypatch.setattr(validation, "_NLP_LOADED", True)
+    return sent
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_rebuild_reuses_a_sentence_that_never_passed(requests, use_async):
+    def validate(verb_packages):
+        if use_async:
+            return asyncio.run(validate_italian_sentences_async(verb_packages))
+        return validate_italian_sentences(verb_packages)
+
+    assert validation.check_sentence(ambiguous_card()) == "morphology"
+
+    validate([ambiguous_card()])
+    assert len(requests) == REGENERATE_ATTEMPTS
+
+    # The verdict is cached: no request, and the same sentence ships
+    requests.clear()
+    (verb_package,) = validate([ambiguous_card()])
+    assert requests == []
+    assert verb_package.sentence == SENTENCE
@@ -0,0 +1,162 @@
+import asyncio
+import os
+from typing import List
+import pytest
+import constants
+import create_deck
+import manifest
+from checkpoint import Checkpoint
+from create_deck import (
+    build_note_list,
+    build_note_list_async,
+    build_verb_package_list,
+    create_note,
+)
+from data_types import VerbPackage
+from manifest import Manifest
+
+TENSES = ["Presente Indicativo", "Imperfetto Indicativo"]
+
+
+def fake_card(verb_package: VerbPackage) -> None:
+    verb_package.flashcard_cloze = f"{{{{c1::{verb_package.person}}}}}"
+    verb_package.flashcard_extra = verb_package.subject
+
+
+@pytest.fixture
+def generated_groups(monkeypatch) -> List[List[VerbPackage]]:
+    groups: List[List[VerbPackage]] = []
+
+    def create_flashcard_group(verb_packages):
+        groups.append(verb_packages)
+        for verb_package in verb_packages:
+            fake_card(verb_package)
+        return verb_packages
+
+    async def create_flashcard_group_async(verb_packages):
+        return create_flashcard_group(verb_packages)
+
+    monkeypatch.setattr(create_deck, "create_flashcard_group", create_flashcard_group)
+    monkeypatch.setattr(
+        create_deck, "create_flashcard_group_async", create_flashcard_group_async
+    )
+    return groups
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_update_regenerates_a_partly_stale_group_whole(
+    build_dir, generated_groups, use_async
+):
+    deck = build_verb_package_list("deck", verbs=["avere"], tenses=TENSES)
+    build_note_list(deck)
+    assert len(generated_groups) == 2
+
+    # Drop one card of the first group from the manifest
+    manifest_path = Manifest("deck").path
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        lines = manifest_file.readlines()
+    with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+        manifest_file.writelines(lines[1:])
+    generated_groups.clear()
+
+    deck = build_verb_package_list("deck", verbs=["avere"], tenses=TENSES)
+    if use_async:
+        note_list = asyncio.run(build_note_list_async(deck, incremental=True))
+    else:
+        note_list = build_note_list(deck, incremental=True)
+
+    # The stale group goes out with all of its persons, as in a full build
+    assert [len(group) for group in generated_groups] == [6]
+    assert len(note_list.notes) == 12
+    assert len(Manifest("deck").load()) == 12
+
+
+def test_notes_are_unique_per_deck():
+    key_verbs = build_verb_package_list("key", verbs=["stare"], tenses=TENSES)
+    irregular_verbs = build_verb_package_list(
+        "irregular", verbs=["stare"], tenses=TENSES
+    )
+
+    guids = [
+        create_note(verb_package, verb_package_list.name).guid
+        for verb_package_list in (key_verbs, irregular_verbs)
+        for verb_package in verb_package_list.verb_packages
+    ]
+
+    assert len(set(guids)) == len(guids) == 24
+
+
+def test_content_lists_are_loaded_without_duplicates():
+    assert constants.irregular_verbs.count("trarre") == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_failed_build_keeps_the_last_manifest(
+    build_dir, generated_groups, monkeypatch, use_async
+):
+    deck = build_verb_package_list("deck", verbs=["avere"], tenses=TENSES)
+    build_note_list(deck)
+
+    def fail(verb_packages):
+        raise RuntimeError("API down")
+
+    async def fail_async(verb_packages):
+        fail(verb_packages)
+
+    monkeypatch.setattr(create_deck, "create_flashcard_group", fail)
+    monkeypatch.setattr(create_deck, "create_flashcard_group_async", fail_async)
+    deck = build_verb_package_list("deck", verbs=["avere", "stare"], tenses=TENSES)
+    with pytest.raises(Exception):
+        if use_async:
+            asyncio.run(build_note_list_async(deck, incremental=True))
+        else:
+            build_note_list(deck, incremental=True)
+
+    assert len(Manifest("deck").load()) == 12
+    assert not [path for path in os.listdir(build_dir) if path.endswith(".tmp")]
+
+
+def fail_second_tense(generated_groups, monkeypatch) -> None:
+    """
+    Interrupt a build: the first group finishes and is journaled, the second
+    one fails.
+    """
+    create_flashcard_group = create_deck.create_flashcard_group
+
+    def fail(verb_packages):
+        if verb_packages[0].tense == TENSES[1]:
+            raise RuntimeError("API down")
+        return create_flashcard_group(verb_packages)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(create_deck, "create_flashcard_group", fail)
+        with pytest.raises(RuntimeError):
+            build_note_list(build_verb_package_list("deck", ["avere"], TENSES))
+    generated_groups.clear()
+
+
+def test_resume_reuses_the_journal_and_clears_it_once_done(
+    build_dir, generated_groups, monkeypatch
+):
+    fail_second_tense(generated_groups, monkeypatch)
+    assert len(Checkpoint("deck").load()) == 6
+
+    deck = build_verb_package_list("deck", verbs=["avere"], tenses=TENSES)
+    note_list = build_note_list(deck, resume=True)
+
+    assert [group[0].tense for group in generated_groups] == [TENSES[1]]
+    assert len(note_list.notes) == 12
+    assert len(Manifest("deck").load()) == 12
+    assert Checkpoint("deck").load() == {}
+
+
+def test_resume_regenerates_journaled_cards_of_an_older_template(
+    build_dir, generated_groups, monkeypatch
+):
+    fail_second_tense(generated_groups, monkeypatch)
+
+    monkeypatch.setattr(manifest, "template_version", lambda: "edited")
+    deck = build_verb_package_list("deck", verbs=["avere"], tenses=TENSES)
+    build_note_list(deck, resume=True)
+
+    assert [len(group) for group in generated_groups] == [6, 6]
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+import pytest
+import llm
+from constants import MIN_TOKENS_PER_SECOND, REQUEST_TIMEOUT
+from llm import chat_completion, chat_completion_async
+
+REPLY = '{"sentence": "Io ho fame."}'
+
+
+class FakeRawResponse:
+    """
+    Like the SDK's raw response, for the sync and async clients alike:
+    `parse()` is a plain method.
+    """
+
+    headers: Dict[str, str] = {}
+
+    def parse(self) -> Any:
+        message = SimpleNamespace(content=REPLY)
+        choice = SimpleNamespace(message=message, finish_reason="stop")
+        return SimpleNamespace(
+            choices=[choice], usage=SimpleNamespace(total_tokens=42)
+        )
+
+
+class FakeLimiter:
+    def __init__(self) -> None:
+        self.usage: List[Tuple[int, int]] = []
+
+    def acquire(self, tokens: int) -> None:
+        pass
+
+    async def acquire_async(self, tokens: int) -> None:
+        pass
+
+    def update_from_headers(self, headers: Dict[str, str]) -> None:
+        pass
+
+    def record_usage(self, estimated: int, actual: int) -> None:
+        self.usage.append((estimated, actual))
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_chat_completion_sends_a_budget_and_records_usage(monkeypatch, use_async):
+    requests: List[Dict[str, Any]] = []
+    limiter = FakeLimiter()
+
+    def create(**kwargs: Any) -> FakeRawResponse:
+        requests.append(kwargs)
+        return FakeRawResponse()
+
+    async def create_async(**kwargs: Any) -> FakeRawResponse:
+        return create(**kwargs)
+
+    raw = SimpleNamespace(create=create_async if use_async else create)
+    client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw))
+    )
+    monkeypatch.setattr(llm, "get_client", lambda: client)
+    monkeypatch.setattr(llm, "get_async_client", lambda: client)
+    monkeypatch.setattr(llm, "get_rate_limiter", lambda model: limiter)
+
+    if use_async:
+        content = asyncio.run(chat_completion_async("prompt", max_tokens=100))
+    else:
+        content = chat_completion("prompt", max_tokens=100)
+
+    assert content == REPLY
+    assert requests[0]["max_tokens"] == 100
+    assert requests[0]["timeout"] == REQUEST_TIMEOUT + 100 / MIN_TOKENS_PER_SECOND
+    assert [actual for _, actual in limiter.usage] == [42]
@@ -0,0 +1,57 @@
+import pytest
+import create_content
+import manifest
+from data_types import VerbPackage
+from manifest import prompt_version
+
+
+def finished_card(person: str) -> VerbPackage:
+    return VerbPackage(
+        verb="avere",
+        tense="Presente Indicativo",
+        person=person,
+        subject="la musica",
+        flashcard_cloze="{{c1::ho}}",
+        flashcard_extra="",
+    )
+
+
+@pytest.fixture
+def fresh_templates():
+    """
+    Render the templates again for every prompt version, and once more after
+    the test.
+    """
+    manifest.template_version.cache_clear()
+    yield
+    manifest.template_version.cache_clear()
+
+
+def version_with_renderer(monkeypatch, render_conjugation) -> str:
+    with monkeypatch.context() as patch:
+        patch.setattr(create_content, "render_conjugation", render_conjugation)
+        manifest.template_version.cache_clear()
+        return prompt_version(finished_card("1st person singular"))
+
+
+def test_prompt_version_covers_the_renderers(monkeypatch, fresh_templates):
+    before = prompt_version(finished_card("1st person singular"))
+
+    def render_conjugation(verb_package, forms):
+        return "<table></table>"
+
+    assert version_with_renderer(monkeypatch, render_conjugation) != before
+
+
+def test_prompt_version_ignores_what_doesnt_render(monkeypatch, fresh_templates):
+    before = prompt_version(finished_card("1st person singular"))
+    original = create_content.render_conjugation
+
+    def render_conjugation(verb_package, forms):
+        """
+        A reworded docstring.
+        """
+        # And a new comment
+        return original(verb_package, forms)
+
+    assert version_with_renderer(monkeypatch, render_conjugation) == before
@@ -0,0 +1,60 @@
+import pytest
+import rate_limiter
+from rate_limiter import ModelRateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    A monotonic clock that only moves when the test moves it.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_refills_evenly_up_to_capacity(clock):
+    bucket = TokenBucket(60)
+    assert bucket.take(60) == 0.0
+
+    # One unit a second, and the debt is what the next caller waits out
+    assert bucket.take(3) == pytest.approx(3.0)
+    bucket.refill(clock[0] + 10)
+    assert bucket.level == pytest.approx(7.0)
+
+    bucket.refill(clock[0] + 1000)
+    assert bucket.level == 60
+
+
+def test_reserve_waits_for_the_scarcer_bucket(clock):
+    limiter = ModelRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    assert limiter.reserve(600) == 0.0
+
+    # The token bucket is empty: 100 tokens take 10 s at 10 tokens a second
+    assert limiter.reserve(100) == pytest.approx(10.0)
+
+    clock[0] += 10
+    limiter.record_usage(estimated=100, actual=40)
+    assert limiter.reserve(0) == 0.0
+    assert limiter.tokens.level == pytest.approx(60.0)
+
+
+def test_headers_lower_the_remaining_capacity_and_set_the_limit(clock):
+    limiter = ModelRateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    limiter.update_from_headers(
+        {
+            "x-ratelimit-limit-requests": "120",
+            "x-ratelimit-remaining-requests": "5",
+            "x-ratelimit-limit-tokens": "1200",
+            "x-ratelimit-remaining-tokens": "not a number",
+        }
+    )
+
+    assert limiter.requests.capacity == 120
+    assert limiter.requests.level == 5
+    assert limiter.tokens.capacity == 1200
+    assert limiter.tokens.level == 600
+
+    # A more generous count than ours is ignored
+    limiter.update_from_headers({"x-ratelimit-remaining-requests": "100"})
+    assert limiter.requests.level == 5
@@ -0,0 +1,47 @@
+import os
+from sentence_cache import SentenceCache
+
+MODEL = "gpt-4o"
+
+
+def test_reply_round_trips_per_model_and_prompt(tmp_path):
+    cache = SentenceCache(str(tmp_path), max_bytes=1000, refresh_percent=0)
+    cache.put(MODEL, "prompt", "Io {{c1::parlo}} italiano.")
+
+    assert cache.get(MODEL, "prompt") == "Io {{c1::parlo}} italiano."
+    assert cache.get("gpt-4o-mini", "prompt") is None
+    assert cache.get(MODEL, "another prompt") is None
+
+    # Entries outlive the process, and the size is counted on start up
+    reopened = SentenceCache(str(tmp_path), max_bytes=1000, refresh_percent=0)
+    assert reopened.peek(MODEL, "prompt") == "Io {{c1::parlo}} italiano."
+    assert reopened._size == len("Io {{c1::parlo}} italiano.")
+
+    reopened.delete(MODEL, "prompt")
+    assert reopened.get(MODEL, "prompt") is None
+    assert reopened._size == 0
+
+
+def test_full_cache_evicts_the_least_recently_used(tmp_path):
+    cache = SentenceCache(str(tmp_path), max_bytes=30, refresh_percent=0)
+    for age, prompt in enumerate(["old", "used", "new"]):
+        cache.put(MODEL, prompt, "x" * 10)
+        os.utime(cache._path(MODEL, prompt), (age, age))
+
+    # A hit makes "used" the most recent entry
+    assert cache.get(MODEL, "used") == "x" * 10
+    cache.put(MODEL, "newest", "x" * 10)
+
+    assert cache.peek(MODEL, "old") is None
+    assert cache.peek(MODEL, "new") is None
+    assert cache.peek(MODEL, "used") == "x" * 10
+    assert cache.peek(MODEL, "newest") == "x" * 10
+    assert cache._size == 20
+
+
+def test_refresh_percent_regenerates_cached_replies(tmp_path):
+    cache = SentenceCache(str(tmp_path), max_bytes=1000, refresh_percent=100)
+    cache.put(MODEL, "prompt", "reply")
+
+    assert cache.get(MODEL, "prompt") is None
+    assert cache.peek(MODEL, "prompt") == "reply"
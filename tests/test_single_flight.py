@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+import pytest
+import single_flight
+from single_flight import AsyncSingleFlight, SingleFlight
+
+WAITERS = 4
+
+
+class CountingEvent(threading.Event):
+    """
+    An event that counts the threads waiting on it.
+    """
+
+    waiting = 0
+    lock = threading.Lock()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with CountingEvent.lock:
+            CountingEvent.waiting += 1
+        return super().wait(timeout)
+
+
+@pytest.fixture
+def followers_joined(monkeypatch) -> Callable[[], None]:
+    """
+    Returns a function that blocks until every other caller waits on the leader.
+    """
+    monkeypatch.setattr(CountingEvent, "waiting", 0)
+    monkeypatch.setattr(single_flight.threading, "Event", CountingEvent)
+
+    def wait() -> None:
+        while CountingEvent.waiting < WAITERS - 1:
+            time.sleep(0.001)
+
+    return wait
+
+
+def run_concurrently(flight: SingleFlight[str], function) -> List[Future]:
+    with ThreadPoolExecutor(max_workers=WAITERS) as pool:
+        return [
+            pool.submit(flight.do, "ciao", function, "ciao") for _ in range(WAITERS)
+        ]
+
+
+def test_concurrent_callers_share_one_call(followers_joined):
+    flight: SingleFlight[str] = SingleFlight()
+    calls: List[str] = []
+
+    def fetch(key: str) -> str:
+        calls.append(key)
+        followers_joined()
+        return key.upper()
+
+    futures = run_concurrently(flight, fetch)
+
+    assert [future.result() for future in futures] == ["CIAO"] * WAITERS
+    assert calls == ["ciao"]
+
+    # Once the call lands, the next caller runs it again
+    assert flight.do("ciao", fetch, "ciao") == "CIAO"
+    assert calls == ["ciao", "ciao"]
+
+
+def test_concurrent_callers_share_the_error(followers_joined):
+    flight: SingleFlight[str] = SingleFlight()
+    calls: List[str] = []
+
+    def fail(key: str) -> str:
+        calls.append(key)
+        followers_joined()
+        raise RuntimeError("API down")
+
+    futures = run_concurrently(flight, fail)
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="API down"):
+            future.result()
+    assert calls == ["ciao"]
+
+
+def test_concurrent_awaits_share_one_task():
+    flight: AsyncSingleFlight[str] = AsyncSingleFlight()
+    calls: List[str] = []
+
+    async def fetch(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0)
+        return key.upper()
+
+    async def run() -> List[str]:
+        return await asyncio.gather(
+            *(flight.do("ciao", fetch, "ciao") for _ in range(WAITERS))
+        )
+
+    assert asyncio.run(run()) == ["CIAO"] * WAITERS
+    assert calls == ["ciao"]
+
+
+def test_concurrent_awaits_share_the_error():
+    flight: AsyncSingleFlight[str] = AsyncSingleFlight()
+    calls: List[str] = []
+
+    async def fail(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0)
+        raise RuntimeError("API down")
+
+    async def run() -> List[str]:
+        results = await asyncio.gather(
+            *(flight.do("ciao", fail, "ciao") for _ in range(WAITERS)),
+            return_exceptions=True,
+        )
+        return [repr(result) for result in results]
+
+    assert asyncio.run(run()) == ["RuntimeError('API down')"] * WAITERS
+    assert calls == ["ciao"]
+    assert flight._calls == {}
@@ -0,0 +1,42 @@
+from typing import Dict
+from benchmark import FakeTranslateClient
+from tracing import get_tracer
+from translation import set_translate_client, translate_many
+
+
+class LineJoiningTranslateClient(FakeTranslateClient):
+    """
+    Merges the lines of a multi-line request, as Translate sometimes does.
+    """
+
+    def translate_text(
+        self, Text: str, SourceLanguageCode: str, TargetLanguageCode: str
+    ) -> Dict[str, str]:
+        reply = super().translate_text(Text, SourceLanguageCode, TargetLanguageCode)
+        return {"TranslatedText": reply["TranslatedText"].replace("\n", " ")}
+
+
+def test_translate_many_sends_one_request(build_dir):
+    client = FakeTranslateClient()
+    set_translate_client(client)
+
+    translations = translate_many(["Io parlo.", "Tu parli.", "Io parlo."])
+
+    assert translations == ["[en] Io parlo.", "[en] Tu parli.", "[en] Io parlo."]
+    assert client.requests == 1
+    # Cached from now on
+    assert translate_many(["Tu parli."]) == ["[en] Tu parli."]
+    assert client.requests == 1
+
+
+def test_translate_many_logs_the_one_at_a_time_fallback(build_dir, capsys):
+    client = LineJoiningTranslateClient()
+    set_translate_client(client)
+    fallbacks = get_tracer().counters.get("translate.fallback", 0)
+
+    translations = translate_many(["Io parlo.", "Tu parli."])
+
+    assert translations == ["[en] Io parlo.", "[en] Tu parli."]
+    assert client.requests == 3
+    assert "translating them one at a time" in capsys.readouterr().out
+    assert get_tracer().counters["translate.fallback"] == fallbacks + 1
@@ -0,0 +1,228 @@
+"""
+Per-stage timing, retry and cache counters for the card pipeline.
+
+Stages are timed with the `traced` decorator or the `span` context manager;
+counters (cache hits and misses, tenacity retries) with `count`. Everything
+is collected by one process-wide Tracer, which can print a latency summary
+per stage and export the spans as a Chrome trace (load it in chrome://tracing
+or https://ui.perfetto.dev).
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _lane() -> int:
+    """
+    The trace lane for the current span: the asyncio task when there is one,
+    since tasks share a thread, and the thread otherwise.
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return id(task)
+    return threading.get_ident()
+
+
+class Tracer:
+    """
+    Collects timed spans and counters from every thread and task.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+
+    def record(self, name: str, start: float, end: float, **args: Any) -> None:
+        """
+        Record a finished span.
+
+        Args:
+            name (str): The stage.
+            start (float): perf_counter() when the span started.
+            end (float): perf_counter() when it ended.
+            **args: Extra details to attach to the span in the trace.
+        """
+        span = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self._start) * 1_000_000,
+            "dur": (end - start) * 1_000_000,
+            "pid": os.getpid(),
+            "tid": _lane(),
+            "args": args,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name (str): The counter, e.g. "sentence_cache.hit".
+            amount (int, optional): How much to add. Defaults to 1.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self) -> str:
+        """
+        Per-stage latency percentiles and the counters, as text.
+
+        Returns:
+            str: The summary.
+        """
+        with self._lock:
+            durations: Dict[str, List[float]] = {}
+            for span in self.spans:
+                durations.setdefault(span["name"], []).append(span["dur"] / 1000)
+            counters = dict(self.counters)
+
+        def percentile(values: List[float], share: float) -> float:
+            return values[min(len(values) - 1, int(share * len(values)))]
+
+        lines = ["stage: count, total, p50, p95, p99, max (ms)"]
+        for name, values in sorted(
+            durations.items(), key=lambda item: -sum(item[1])
+        ):
+            values.sort()
+            lines.append(
+                f"  {name}: {len(values)}, {sum(values):.0f}, "
+                f"{percentile(values, 0.5):.1f}, {percentile(values, 0.95):.1f}, "
+                f"{percentile(values, 0.99):.1f}, {values[-1]:.1f}"
+            )
+        if counters:
+            lines.append("counters:")
+            lines.extend(
+                f"  {name}: {value}" for name, value in sorted(counters.items())
+            )
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path: str) -> None:
+        """
+        Write the spans, and the counters as of now, as a Chrome trace.
+
+        Args:
+            path (str): The JSON file to write.
+        """
+        with self._lock:
+            events = list(self.spans)
+            end = (time.perf_counter() - self._start) * 1_000_000
+            events.extend(
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": end,
+                    "pid": os.getpid(),
+                    "args": {"value": value},
+                }
+                for name, value in self.counters.items()
+            )
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": events}, trace_file)
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far.
+        """
+        with self._lock:
+            self._start = time.perf_counter()
+            self.spans = []
+            self.counters = {}
+
+
+_TRACER = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """
+    Return the process-wide tracer.
+
+    Returns:
+        Tracer: The shared tracer.
+    """
+    return _TRACER
+
+
+def count(name: str, amount: int = 1) -> None:
+    """
+    Add to a counter of the process-wide tracer.
+
+    Args:
+        name (str): The counter.
+        amount (int, optional): How much to add. Defaults to 1.
+    """
+    _TRACER.count(name, amount)
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """
+    Time the enclosed block as a span of the process-wide tracer. Works
+    in coroutines too.
+
+    Args:
+        name (str): The stage.
+        **args: Extra details to attach to the span in the trace.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _TRACER.record(name, start, time.perf_counter(), **args)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorate a function or coroutine function so each call is a span.
+
+    Args:
+        name (str): The stage.
+
+    Returns:
+        Callable[[F], F]: The decorator.
+    """
+
+    def decorator(fn: F) -> F:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def record_retry(retry_state: Any) -> None:
+    """
+    A tenacity `before_sleep` callback counting the retries of each function.
+
+    Args:
+        retry_state (Any): tenacity's RetryCallState.
+    """
+    name = getattr(retry_state.fn, "__name__", "unknown")
+    count(f"retries.{name}")
@@ -0,0 +1,207 @@
+"""
+English translations of the generated sentences, via AWS Translate.
+
+All workers share one boto3 client, translations are cached on disk keyed by
+the cleaned Italian sentence, and many sentences are sent in one request by
+joining them with newlines (Translate keeps line breaks).
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from tenacity import (
+    retry,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from constants import WAIT_MAX, WAIT_MIN, STOP_AFTER
+from tracing import count, record_retry, traced
+
+TRANSLATIONS_LOG = "translations.jsonl"
+
+# AWS Translate accepts up to 10,000 bytes of text per request
+MAX_BATCH_BYTES = 9_000
+
+
+class TranslationCache:
+    """
+    An append-only log of translations with an in-memory index, keyed by the
+    Italian sentence.
+    """
+
+    def __init__(self, path: str = TRANSLATIONS_LOG) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as log_file:
+                for line in log_file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._index[record["sentence"]] = record["translation"]
+
+    def get(self, sentence: str) -> Optional[str]:
+        """
+        Look up the translation of a sentence.
+
+        Args:
+            sentence (str): The Italian sentence.
+
+        Returns:
+            Optional[str]: The translation, or None if it isn't cached.
+        """
+        return self._index.get(sentence)
+
+    def put_many(self, translations: Dict[str, str]) -> None:
+        """
+        Cache several translations with one append to the log.
+
+        Args:
+            translations (Dict[str, str]): Translations keyed by Italian sentence.
+        """
+        if not translations:
+            return
+        data = "".join(
+            json.dumps(
+                {"sentence": sentence, "translation": translation},
+                ensure_ascii=False,
+            )
+            + "\n"
+            for sentence, translation in translations.items()
+        ).encode("utf-8")
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self._index.update(translations)
+
+
+_CLIENT: Optional[Any] = None
+_CACHE: Optional[TranslationCache] = None
+_LOCK = threading.Lock()
+
+
+def get_translate_client() -> Any:
+    """
+    Return the shared AWS Translate client. boto3 clients are thread-safe,
+    so one is enough for every worker.
+
+    Returns:
+        Any: The boto3 Translate client.
+    """
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None:
+            import boto3
+
+            _CLIENT = boto3.client("translate")
+        return _CLIENT
+
+
+def set_translate_client(client: Any) -> None:
+    """
+    Replace the shared client, e.g. with a fake in tests and benchmarks.
+
+    Args:
+        client (Any): Anything with a boto3-style `translate_text` method.
+    """
+    global _CLIENT
+    with _LOCK:
+        _CLIENT = client
+
+
+def get_translation_cache() -> TranslationCache:
+    """
+    Return the process-wide translation cache.
+
+    Returns:
+        TranslationCache: The shared cache.
+    """
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = TranslationCache()
+        return _CACHE
+
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+def _translate_text(text: str) -> str:
+    """
+    Send one request to AWS Translate.
+    """
+    count("translate.requests")
+    return get_translate_client().translate_text(
+        Text=text, SourceLanguageCode="it", TargetLanguageCode="en"
+    )["TranslatedText"]
+
+
+def _chunk(sentences: List[str]) -> List[List[str]]:
+    """
+    Split sentences into chunks that fit in one Translate request.
+    """
+    chunks: List[List[str]] = []
+    size = MAX_BATCH_BYTES
+    for sentence in sentences:
+        sentence_size = len(sentence.encode("utf-8")) + 1
+        if size + sentence_size > MAX_BATCH_BYTES:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(sentence)
+        size += sentence_size
+    return chunks
+
+
+@traced("translate")
+def translate_many(sentences: List[str]) -> List[str]:
+    """
+    Translate Italian sentences into English, using the cache where possible
+    and sending the rest in as few requests as possible.
+
+    Args:
+        sentences (List[str]): The Italian sentences, without cloze syntax.
+
+    Returns:
+        List[str]: The English translations, in the same order.
+    """
+    cache = get_translation_cache()
+    # Newlines separate the sentences of a batch, so none may appear inside one
+    sentences = [" ".join(sentence.split("\n")) for sentence in sentences]
+    missing = list(dict.fromkeys(s for s in sentences if cache.get(s) is None))
+    count("translation_cache.miss", len(missing))
+    count("translation_cache.hit", len(sentences) - len(missing))
+
+    for chunk in _chunk(missing):
+        translated_lines = _translate_text("\n".join(chunk)).split("\n")
+        if len(translated_lines) != len(chunk):
+            # The line structure didn't survive; translate one at a time
+            print(
+                f"Translate returned {len(translated_lines)} lines for "
+                f"{len(chunk)} sentences, translating them one at a time"
+            )
+            count("translate.fallback")
+            translated_lines = [_translate_text(sentence) for sentence in chunk]
+        cache.put_many(dict(zip(chunk, translated_lines)))
+
+    return [str(cache.get(sentence)) for sentence in sentences]
+
+
+def translate(sentence: str) -> str:
+    """
+    Translate an Italian sentence into English with AWS Translate.
+
+    Args:
+        sentence (str): The Italian sentence, without cloze syntax.
+
+    Returns:
+        str: The English translation.
+    """
+    return translate_many([sentence])[0]
@@ -1,23 +1,59 @@
-import os
-import json
+from typing import Dict, Optional
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_random_exponential,
 )
-from constants import EXPENSIVE_MODEL, CLIENT, WAIT_MAX, WAIT_MIN, STOP_AFTER
+from cascade import complete, complete_async, from_sentence_cache
+from constants import WAIT_MAX, WAIT_MIN, STOP_AFTER
+from conjugator import PERSONS, SUBJECT_PRONOUNS, conjugate
+from conjugation_store import Forms, get_conjugation_store
 from data_types import VerbPackage
+from llm import (
+    chat_completion,
+    chat_completion_async,
+    json_schema_format,
+    parse_json_reply,
+    reply_string,
+)
+from single_flight import AsyncSingleFlight, SingleFlight
+from tracing import count, record_retry, traced
+from validation import check_conjugated
 
-CONJUGATIONS_FILE = "conjugations.txt"
+CONJUGATION_FLIGHTS: SingleFlight[Forms] = SingleFlight()
+ASYNC_CONJUGATION_FLIGHTS: AsyncSingleFlight[Forms] = AsyncSingleFlight()
 
+CONJUGATED_RESPONSE_FORMAT = json_schema_format(
+    "conjugated_form",
+    {
+        "type": "object",
+        "properties": {"form": {"type": "string"}},
+        "required": ["form"],
+        "additionalProperties": False,
+    },
+)
 
-@retry(
-    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
-    stop=stop_after_attempt(STOP_AFTER),
+CONJUGATION_RESPONSE_FORMAT = json_schema_format(
+    "conjugation_table",
+    {
+        "type": "object",
+        "properties": {person: {"type": "string"} for person in PERSONS},
+        "required": PERSONS,
+        "additionalProperties": False,
+    },
 )
+
+# Output budgets: a form is a few tokens, a table six of them, plus the JSON
+CONJUGATED_MAX_TOKENS = 30
+CONJUGATION_MAX_TOKENS = 150
+
+
+@traced("conjugate")
 def get_conjugated(verb_package: VerbPackage) -> VerbPackage:
     """
     Return the conjugation of a verb, given an infinitive, person, and tense.
+    Uses the local rule-based engine, falling back to the LLM for verbs it
+    doesn't know.
 
     Args:
         verb_package (VerbPackage): The verb package
@@ -25,71 +61,350 @@ def get_conjugated(verb_package: VerbPackage) -> VerbPackage:
     Returns:
         VerbPackage: The verb package with conjugated form added.
     """
-    get_conjugated_prompt = f"""
-        Return the {verb_package.person} {verb_package.tense} of {verb_package.verb}.
-        Only include the Italian conjugated verb. Do not include any other information.
-    """
-
-    response = CLIENT.chat.completions.create(
-        model=EXPENSIVE_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an Italian teacher.",
-            },
-            {
-                "role": "user",
-                "content": get_conjugated_prompt,
-            },
-        ],
+    verb_conjugated = conjugate(
+        verb_package.verb, verb_package.tense, verb_package.person
     )
-    verb_package.verb_conjugated = (
-        str(response.choices[0].message.content).lower().strip().replace(".", "")
+    if verb_conjugated is None:
+        count("conjugator.miss")
+        return get_conjugated_from_llm(verb_package)
+
+    count("conjugator.hit")
+    verb_package.verb_conjugated = verb_conjugated
+    return verb_package
+
+
+@traced("conjugate")
+async def get_conjugated_async(verb_package: VerbPackage) -> VerbPackage:
+    """
+    Async variant of `get_conjugated`.
+
+    Args:
+        verb_package (VerbPackage): The verb package
+
+    Returns:
+        VerbPackage: The verb package with conjugated form added.
+    """
+    verb_conjugated = conjugate(
+        verb_package.verb, verb_package.tense, verb_package.person
     )
+    if verb_conjugated is None:
+        count("conjugator.miss")
+        return await get_conjugated_from_llm_async(verb_package)
 
+    count("conjugator.hit")
+    verb_package.verb_conjugated = verb_conjugated
     return verb_package
 
 
-def get_conjugation_from_disk(verb_package: VerbPackage) -> str:
+def build_conjugated_prompt(verb_package: VerbPackage) -> str:
+    """
+    Build the prompt asking the LLM for a single conjugated form.
+
+    Args:
+        verb_package (VerbPackage): The verb package
+
+    Returns:
+        str: The prompt.
+    """
+    return f"""
+        Return the {verb_package.person} {verb_package.tense} of {verb_package.verb}.
+        Only include the Italian conjugated verb, in lower case, without a subject pronoun.
+
+        Respond with a JSON object like this:
+        {{"form": "..."}}
+    """
+
+
+def parse_conjugated(content: str) -> str:
+    """
+    Parse the LLM's reply to `build_conjugated_prompt`.
+
+    Args:
+        content (str): The JSON reply.
+
+    Returns:
+        str: The conjugated form.
+    """
+    return reply_string(parse_json_reply(content), "form")
+
+
+def apply_conjugated(verb_package: VerbPackage, content: str) -> VerbPackage:
+    """
+    Store the LLM's reply to `build_conjugated_prompt` on the VerbPackage.
+
+    Args:
+        verb_package (VerbPackage): The verb package
+        content (str): The raw reply.
+
+    Returns:
+        VerbPackage: The verb package with conjugated form added.
+    """
+    verb_package.verb_conjugated = parse_conjugated(content)
+    return verb_package
+
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+def get_conjugated_from_llm(verb_package: VerbPackage) -> VerbPackage:
+    """
+    Ask the LLM for the conjugation of a verb, given an infinitive, person, and tense.
+
+    Args:
+        verb_package (VerbPackage): The verb package
+
+    Returns:
+        VerbPackage: The verb package with conjugated form added.
+    """
+    # The conjugated form is cached like a sentence, since the sentence
+    # prompt that follows depends on it
+    prompt = build_conjugated_prompt(verb_package)
+    cached = from_sentence_cache(
+        prompt, lambda content: apply_conjugated(verb_package, content)
+    )
+    if cached is not None:
+        return cached
+    return complete(
+        prompt,
+        "conjugated",
+        lambda content: apply_conjugated(verb_package, content),
+        check_conjugated,
+        response_format=CONJUGATED_RESPONSE_FORMAT,
+        max_tokens=CONJUGATED_MAX_TOKENS,
+    )
+
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+async def get_conjugated_from_llm_async(verb_package: VerbPackage) -> VerbPackage:
+    """
+    Async variant of `get_conjugated_from_llm`.
+
+    Args:
+        verb_package (VerbPackage): The verb package
+
+    Returns:
+        VerbPackage: The verb package with conjugated form added.
+    """
+    # The conjugated form is cached like a sentence, since the sentence
+    # prompt that follows depends on it
+    prompt = build_conjugated_prompt(verb_package)
+    cached = from_sentence_cache(
+        prompt, lambda content: apply_conjugated(verb_package, content)
+    )
+    if cached is not None:
+        return cached
+    return await complete_async(
+        prompt,
+        "conjugated",
+        lambda content: apply_conjugated(verb_package, content),
+        check_conjugated,
+        response_format=CONJUGATED_RESPONSE_FORMAT,
+        max_tokens=CONJUGATED_MAX_TOKENS,
+    )
+
+
+@traced("conjugation_table")
+def get_conjugation_from_disk(
+    verb_package: VerbPackage, forms: Optional[Dict[str, str]] = None
+) -> Forms:
     """
     Looks to cached conjugation on disk to find a conjugation of a verb in a tense.
-    If the conjugation is not cached, it will consult LLM.
+    If the conjugation is not cached, it is assembled from the forms of each
+    person, and only if some are unknown will it consult the LLM. The table is
+    rendered as HTML by `render_conjugation`.
 
     Args:
         verb_package (VerbPackage): The package containing the verb and tense.
+        forms (Optional[Dict[str, str]], optional): Conjugated forms by person
+            already generated for this verb and tense. Defaults to None.
 
     Returns:
-        str: The conjugation
+        Forms: The form for each person.
+    """
+    conjugation = get_conjugation_store().get(verb_package.verb, verb_package.tense)
+    count(f"conjugation_store.{'miss' if conjugation is None else 'hit'}")
+    if conjugation is None:
+        # If this conjugation hasn't been cached, look it up and persist it.
+        # Concurrent misses for the same verb and tense share one lookup.
+        conjugation = CONJUGATION_FLIGHTS.do(
+            (verb_package.verb, verb_package.tense),
+            _fetch_and_store_conjugation,
+            verb_package,
+            forms,
+        )
+    return conjugation
+
+
+@traced("conjugation_table")
+async def get_conjugation_from_disk_async(
+    verb_package: VerbPackage, forms: Optional[Dict[str, str]] = None
+) -> Forms:
     """
-    conjugation = ""
-    conjugations = {}
-    verb_tense = verb_package.verb + " " + verb_package.tense
-
-    if os.path.exists(CONJUGATIONS_FILE):
-        with open(CONJUGATIONS_FILE, "r", encoding="utf-8") as json_file:
-            conjugations = json.load(json_file)
-        try:
-            conjugation = conjugations[verb_tense]
-        except (
-            KeyError
-        ):  # If this conjugation hasn't been cached, look it up and persist it
+    Async variant of `get_conjugation_from_disk`.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+        forms (Optional[Dict[str, str]], optional): Conjugated forms by person
+            already generated for this verb and tense. Defaults to None.
+
+    Returns:
+        Forms: The form for each person.
+    """
+    conjugation = get_conjugation_store().get(verb_package.verb, verb_package.tense)
+    count(f"conjugation_store.{'miss' if conjugation is None else 'hit'}")
+    if conjugation is None:
+        conjugation = await ASYNC_CONJUGATION_FLIGHTS.do(
+            (verb_package.verb, verb_package.tense),
+            _fetch_and_store_conjugation_async,
+            verb_package,
+            forms,
+        )
+    return conjugation
+
+
+def _fetch_and_store_conjugation(
+    verb_package: VerbPackage, forms: Optional[Dict[str, str]] = None
+) -> Forms:
+    """
+    Assemble a conjugation from its forms, or look it up from the LLM, and
+    persist it, unless another worker stored it while we were waiting to run.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+        forms (Optional[Dict[str, str]], optional): Conjugated forms by person. Defaults to None.
+
+    Returns:
+        Forms: The form for each person.
+    """
+    store = get_conjugation_store()
+    conjugation = store.get(verb_package.verb, verb_package.tense)
+    if conjugation is None:
+        conjugation = derive_conjugation(verb_package, forms)
+        if conjugation is None:
             conjugation = get_conjugation_from_llm(verb_package)
-            conjugations[verb_tense] = conjugation
-            with open(CONJUGATIONS_FILE, "w", encoding="utf-8") as json_file:
-                json.dump(conjugations, json_file)
-    else:
-        conjugation = get_conjugation_from_llm(verb_package)
-        conjugations[verb_package.verb] = {verb_package.tense: conjugation}
-        with open(CONJUGATIONS_FILE, "w", encoding="utf-8") as json_file:
-            json.dump(conjugations, json_file)
+        store.put(verb_package.verb, verb_package.tense, conjugation)
+    return conjugation
+
+
+async def _fetch_and_store_conjugation_async(
+    verb_package: VerbPackage, forms: Optional[Dict[str, str]] = None
+) -> Forms:
+    """
+    Async variant of `_fetch_and_store_conjugation`.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+        forms (Optional[Dict[str, str]], optional): Conjugated forms by person. Defaults to None.
+
+    Returns:
+        Forms: The form for each person.
+    """
+    store = get_conjugation_store()
+    conjugation = store.get(verb_package.verb, verb_package.tense)
+    if conjugation is None:
+        conjugation = derive_conjugation(verb_package, forms)
+        if conjugation is None:
+            conjugation = await get_conjugation_from_llm_async(verb_package)
+        store.put(verb_package.verb, verb_package.tense, conjugation)
     return conjugation
 
 
+def derive_conjugation(
+    verb_package: VerbPackage, forms: Optional[Dict[str, str]] = None
+) -> Optional[Forms]:
+    """
+    Assemble a conjugation table without the LLM, from forms already
+    generated for the verb and tense and the rule engine for the rest.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+        forms (Optional[Dict[str, str]], optional): Conjugated forms by person. Defaults to None.
+
+    Returns:
+        Optional[Forms]: The form for each person, or None if one is unknown.
+    """
+    forms = forms or {}
+    table: Forms = {}
+    for person in PERSONS:
+        form = forms.get(person) or conjugate(
+            verb_package.verb, verb_package.tense, person
+        )
+        if form is None:
+            return None
+        table[person] = form
+    count("conjugation_table.derived")
+    return table
+
+
+def build_conjugation_prompt(verb_package: VerbPackage) -> str:
+    """
+    Build the prompt asking the LLM for a full conjugation table.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+
+    Returns:
+        str: The prompt.
+    """
+    return f"""
+                    Return the conjugation of the verb {verb_package.verb} in {verb_package.tense}.
+                    Give the form for each person without the subject pronoun,
+                    as a JSON object like this:
+
+                    {{"1st person singular": "sono", "2nd person singular": "sei",
+                    "3rd person singular": "è", "1st person plural": "siamo",
+                    "2nd person plural": "siete", "3rd person plural": "sono"}}
+                """
+
+
+def render_conjugation(verb_package: VerbPackage, forms: Forms) -> str:
+    """
+    Render a conjugation table as the HTML used on the extra field.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+        forms (Forms): The form for each person.
+
+    Returns:
+        str: The conjugation
+    """
+    items = "".join(
+        f"<li>{pronoun} {forms[person]}</li>"
+        for pronoun, person in zip(SUBJECT_PRONOUNS, PERSONS)
+    )
+    return f"""
+            <p><strong>Coniugazione di "{verb_package.verb}" nel {verb_package.tense}:</strong></p>
+            <p><ul>{items}</ul></p>
+
+        """
+
+
+def parse_conjugation(content: str) -> Forms:
+    """
+    Parse the LLM's reply to `build_conjugation_prompt` into forms.
+
+    Args:
+        content (str): The JSON reply.
+
+    Returns:
+        Forms: The form for each person.
+    """
+    reply = parse_json_reply(content)
+    return {person: reply_string(reply, person) for person in PERSONS}
+
+
 @retry(
     wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
     stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
 )
-def get_conjugation_from_llm(verb_package: VerbPackage) -> str:
+def get_conjugation_from_llm(verb_package: VerbPackage) -> Forms:
     """
     In the absence of a cached conjugation, look one up from the LLM.
 
@@ -97,41 +412,39 @@ def get_conjugation_from_llm(verb_package: VerbPackage) -> str:
         verb_package (VerbPackage): The package containing the verb and tense.
 
     Returns:
-        str: The conjugation
+        Forms: The form for each person.
     """
-
-    response = CLIENT.chat.completions.create(
-        model=EXPENSIVE_MODEL,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an Italian teacher.",
-            },
-            {
-                "role": "user",
-                "content": f"""
-                    Return the conjugation of the verb {verb_package.verb} in {verb_package.tense}.
-                    It should look like this:
-                    
-                    <ul>
-                        <li>io sono</li>
-                        <li>tu sei</li>
-                        <li>lui/lei è</li>
-                        <li>noi siamo</li>
-                     p   <li>voi siete</li>
-                        <li>loro sono</li>
-                    </ul>
-                    Only provide the conjugated verbs, no other commentary.
-                """,
-            },
-        ],
+    return parse_conjugation(
+        chat_completion(
+            build_conjugation_prompt(verb_package),
+            response_format=CONJUGATION_RESPONSE_FORMAT,
+            max_tokens=CONJUGATION_MAX_TOKENS,
+        )
     )
-    final_output = f"""
-            <p><strong>Coniugazione di "{verb_package.verb}" nel {verb_package.tense}:</strong></p>
-            <p>{response.choices[0].message.content}</p>
 
-        """
-    return final_output
+
+@retry(
+    wait=wait_random_exponential(min=WAIT_MIN, max=WAIT_MAX),
+    stop=stop_after_attempt(STOP_AFTER),
+    before_sleep=record_retry,
+)
+async def get_conjugation_from_llm_async(verb_package: VerbPackage) -> Forms:
+    """
+    Async variant of `get_conjugation_from_llm`.
+
+    Args:
+        verb_package (VerbPackage): The package containing the verb and tense.
+
+    Returns:
+        Forms: The form for each person.
+    """
+    return parse_conjugation(
+        await chat_completion_async(
+            build_conjugation_prompt(verb_package),
+            response_format=CONJUGATION_RESPONSE_FORMAT,
+            max_tokens=CONJUGATION_MAX_TOKENS,
+        )
+    )
 
 
 def get_wikipedia_link_for_subject(verb_package: VerbPackage) -> str:
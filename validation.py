@@ -0,0 +1,275 @@
+"""
+Checks on the LLM's replies, so a reply from the cheap model can be accepted
+or escalated to the expensive one, and a bad sentence can be regenerated
+before it ships on a card.
+
+Each check returns None when a VerbPackage's generated content looks right,
+and a short reason otherwise ("cloze", "form", "language", "morphology"); the
+reasons end up in the cascade's and the validation stage's counters.
+
+The morphology check parses the sentence with a local spaCy Italian pipeline,
+loaded once and shared by every worker. Without spaCy or its model the check
+is skipped and the other checks still run.
+
+A change to what the checks accept should bump `manifest.CONTENT_VERSION`, so
+incremental builds regenerate the cards that were checked the old way.
+"""
+
+import re
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+from conjugator import COMPOUND_TENSES, PERSONS
+from data_types import VerbPackage
+
+SPACY_MODEL = "it_core_news_sm"
+
+CLOZE_PATTERN = re.compile(r"{{c\d+::(.*?)(?:::.*?)?}}")
+
+# A conjugated form is at most a pronoun, auxiliaries and a participle,
+# e.g. "mi sarei alzato"
+MAX_FORM_WORDS = 4
+FORM_WORD_PATTERN = re.compile(r"[a-zàèéìíòóùú']+")
+
+# English function words that never appear in an Italian sentence. Loanwords
+# such as "weekend" are fine, so only these count against a reply.
+ENGLISH_WORDS = frozenset(
+    {
+        "the",
+        "and",
+        "is",
+        "are",
+        "was",
+        "were",
+        "this",
+        "that",
+        "with",
+        "you",
+        "your",
+        "he",
+        "she",
+        "they",
+        "we",
+        "it",
+        "of",
+        "to",
+        "for",
+        "have",
+        "has",
+        "here",
+        "sentence",
+        "translation",
+    }
+)
+MAX_ENGLISH_WORDS = 1
+
+# Simple tense -> the (Mood, Tense) spaCy's Italian models tag its forms with.
+# Compound tenses are judged by their auxiliary, see COMPOUND_TENSES.
+TENSE_MORPHOLOGY = {
+    "Presente Indicativo": ("Ind", "Pres"),
+    "Imperfetto Indicativo": ("Ind", "Imp"),
+    "Passato Remoto Indicativo": ("Ind", "Past"),
+    "Futuro Semplice Indicativo": ("Ind", "Fut"),
+    "Presente Condizionale": ("Cnd", "Pres"),
+    "Presente Congiuntivo": ("Sub", "Pres"),
+    "Imperfetto Congiuntivo": ("Sub", "Imp"),
+}
+
+_NLP: Any = None
+_NLP_LOADED = False
+_NLP_LOCK = threading.Lock()
+
+
+def normalise_form(form: str) -> str:
+    """
+    Lower-case a conjugated form and collapse its whitespace, for comparison.
+
+    Args:
+        form (str): The form.
+
+    Returns:
+        str: The normalised form.
+    """
+    return " ".join(form.lower().split())
+
+
+def is_italian(text: str) -> bool:
+    """
+    Whether a reply is in Italian only, judged by the English function words
+    in it.
+
+    Args:
+        text (str): The reply, with or without cloze syntax.
+
+    Returns:
+        bool: False if the reply mixes in English.
+    """
+    words = re.findall(r"[a-z]+", CLOZE_PATTERN.sub(r"\1", text).lower())
+    return sum(word in ENGLISH_WORDS for word in words) <= MAX_ENGLISH_WORDS
+
+
+def get_nlp() -> Any:
+    """
+    Return the shared spaCy pipeline, loading it on first use.
+
+    Returns:
+        Any: The pipeline, or None if spaCy or SPACY_MODEL isn't installed.
+    """
+    global _NLP, _NLP_LOADED
+    if not _NLP_LOADED:
+        with _NLP_LOCK:
+            if not _NLP_LOADED:
+                try:
+                    import spacy
+
+                    # Only the tagger and morphologizer are needed
+                    _NLP = spacy.load(SPACY_MODEL, exclude=["parser", "ner"])
+                except (ImportError, OSError):
+                    print(
+                        f"spaCy model {SPACY_MODEL} isn't installed, "
+                        "skipping the morphology check"
+                    )
+                _NLP_LOADED = True
+    return _NLP
+
+
+def expected_morphology(person: str, tense: str) -> Dict[str, str]:
+    """
+    The morphological features the finite verb of a form should carry.
+
+    Args:
+        person (str): One of PERSONS.
+        tense (str): A simple or compound tense.
+
+    Returns:
+        Dict[str, str]: Feature -> value, e.g. {"Person": "1", "Mood": "Ind"}.
+        Empty for a person or tense we have no mapping for.
+    """
+    features: Dict[str, str] = {}
+    if person in PERSONS:
+        index = PERSONS.index(person)
+        features["Person"] = str(index % 3 + 1)
+        features["Number"] = "Sing" if index < 3 else "Plur"
+    morphology = TENSE_MORPHOLOGY.get(COMPOUND_TENSES.get(tense, tense))
+    if morphology is not None:
+        features["Mood"], features["Tense"] = morphology
+    return features
+
+
+def strip_cloze(sentence: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """
+    Remove the first cloze's syntax from a sentence, keeping its text.
+
+    Args:
+        sentence (str): The sentence.
+
+    Returns:
+        Tuple[str, Optional[Tuple[int, int]]]: The sentence, and the start and
+        end of the cloze's text in it, or None if there is no cloze.
+    """
+    match = CLOZE_PATTERN.search(sentence)
+    if match is None:
+        return sentence, None
+    text = sentence[: match.start()] + match.group(1) + sentence[match.end() :]
+    return text, (match.start(), match.start() + len(match.group(1)))
+
+
+def check_morphology(verb_package: VerbPackage) -> Optional[str]:
+    """
+    Check that the finite verb in the cloze is tagged with the card's person
+    and tense. Forms the pipeline can't analyse are given the benefit of the
+    doubt.
+
+    Args:
+        verb_package (VerbPackage): The package with its sentence added.
+
+    Returns:
+        Optional[str]: None if the morphology matches or can't be checked,
+        else "morphology".
+    """
+    nlp = get_nlp()
+    if nlp is None:
+        return None
+    text, cloze = strip_cloze(verb_package.sentence)
+    if cloze is None:
+        return None
+    # spaCy pipelines aren't guaranteed to be thread-safe
+    with _NLP_LOCK:
+        doc = nlp(text)
+    tokens = doc.char_span(cloze[0], cloze[1], alignment_mode="expand")
+    if tokens is None:
+        return None
+    finite = next(
+        (
+            token
+            for token in tokens
+            if token.pos_ in ("VERB", "AUX") and "Fin" in token.morph.get("VerbForm")
+        ),
+        None,
+    )
+    if finite is None:
+        return None
+    for feature, value in expected_morphology(
+        verb_package.person, verb_package.tense
+    ).items():
+        found = finite.morph.get(feature)
+        if found and value not in found:
+            return "morphology"
+    return None
+
+
+def check_sentence(verb_package: VerbPackage) -> Optional[str]:
+    """
+    Check a generated sentence: a single cloze, around the conjugated form,
+    in an Italian-only sentence, with the verb in the card's person and tense.
+
+    Args:
+        verb_package (VerbPackage): The package with its sentence added.
+
+    Returns:
+        Optional[str]: None if the sentence is fine, else the reason it isn't.
+    """
+    clozes = CLOZE_PATTERN.findall(verb_package.sentence)
+    if len(clozes) != 1:
+        return "cloze"
+    if normalise_form(clozes[0]) != normalise_form(verb_package.verb_conjugated):
+        return "form"
+    if not is_italian(verb_package.sentence):
+        return "language"
+    return check_morphology(verb_package)
+
+
+def check_sentences(verb_packages: Iterable[VerbPackage]) -> Optional[str]:
+    """
+    `check_sentence` for every package of a group.
+
+    Args:
+        verb_packages (Iterable[VerbPackage]): The packages with their sentences added.
+
+    Returns:
+        Optional[str]: None if every sentence is fine, else the first reason one isn't.
+    """
+    for verb_package in verb_packages:
+        reason = check_sentence(verb_package)
+        if reason is not None:
+            return reason
+    return None
+
+
+def check_conjugated(verb_package: VerbPackage) -> Optional[str]:
+    """
+    Check a conjugated form from the LLM: a few Italian words and nothing else.
+
+    Args:
+        verb_package (VerbPackage): The package with its conjugated form added.
+
+    Returns:
+        Optional[str]: None if the form is fine, else the reason it isn't.
+    """
+    words = verb_package.verb_conjugated.split()
+    if not 0 < len(words) <= MAX_FORM_WORDS:
+        return "form"
+    if not all(FORM_WORD_PATTERN.fullmatch(word) for word in words):
+        return "form"
+    if not is_italian(verb_package.verb_conjugated):
+        return "language"
+    return None
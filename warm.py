@@ -0,0 +1,87 @@
+"""
+Fill the conjugation store ahead of a build.
+
+Every (verb, tense) the content lists can produce is checked against the
+store, and the missing tables are filled by a bounded pool of workers, so
+that builds find every table on disk and never write to the store from
+their hot loop.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product
+from typing import Iterable, List, Tuple
+import constants
+from conjugation_store import get_conjugation_store
+from conjugator import PERSONS
+from create_deck import MAX_WORKERS
+from data_types import VerbPackage
+from tracing import traced
+from utils import get_conjugated, get_conjugation_from_disk
+
+
+def all_verb_tenses() -> List[Tuple[str, str]]:
+    """
+    Every (verb, tense) of the verb and tense lists the decks are built from.
+
+    Returns:
+        List[Tuple[str, str]]: The pairs, without duplicates, in list order.
+    """
+    verbs = constants.key_verbs + constants.regular_verbs + constants.irregular_verbs
+    tenses = constants.basic_tenses + constants.advanced_tenses
+    return list(dict.fromkeys(product(verbs, tenses)))
+
+
+@traced("warm")
+def warm_conjugation(verb: str, tense: str) -> None:
+    """
+    Store the conjugation table of a verb in a tense. The forms of each
+    person come from the rule engine, or the LLM for verbs it doesn't know,
+    and the table is assembled from them.
+
+    Args:
+        verb (str): The infinitive.
+        tense (str): The tense.
+    """
+    forms = {
+        person: get_conjugated(
+            VerbPackage(verb=verb, tense=tense, person=person, subject="")
+        ).verb_conjugated
+        for person in PERSONS
+    }
+    get_conjugation_from_disk(
+        VerbPackage(verb=verb, tense=tense, person="", subject=""), forms
+    )
+
+
+def warm_conjugations(
+    verb_tenses: Iterable[Tuple[str, str]], max_workers: int = MAX_WORKERS
+) -> int:
+    """
+    Fill the conjugation store with the tables it's missing.
+
+    Args:
+        verb_tenses (Iterable[Tuple[str, str]]): The (verb, tense) pairs to have tables for.
+        max_workers (int, optional): Tables filled at once. Defaults to MAX_WORKERS.
+
+    Returns:
+        int: The number of tables that couldn't be filled.
+    """
+    store = get_conjugation_store()
+    missing = [verb_tense for verb_tense in verb_tenses if verb_tense not in store]
+    print(f"{len(missing)} conjugation tables missing from the store")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(warm_conjugation, verb, tense): (verb, tense)
+            for verb, tense in missing
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            verb, tense = futures[future]
+            error = future.exception()
+            if error is not None:
+                failed += 1
+                print(f"Couldn't fill {verb}, {tense}: {error!r}")
+            elif done % 50 == 0 or done == len(missing):
+                print(f"{done}/{len(missing)} conjugation tables filled")
+    return failed